@@ -1,61 +1,377 @@
+import argparse
+import contextlib
+import datetime
+import json
+import math
 import os
+import platform
+import random
+import shutil
+import statistics
+import sys
 import time
 
-from bsbi import BSBIIndex
-from compression import EliasGammaPostings, VBEPostings, StandardPostings
+import numpy as np
+
+import compression
+from bsbi import BSBIIndex, Cleaner
+from index import InvertedIndexReader
+
+# Query default, termasuk query yang dipakai benchmark di README
+QUERIES = ["olahraga", "tumor", "hidup sehat", "jantung", "penyakit",
+           "kuat", "badan sehat", "olahraga teratur", "tidur cukup",
+           "olahraga jantung teratur sehat hidup", "tekanan darah tinggi", "kanker paru rokok"]
+
+# Codec default untuk benchmark indexing dan query
+INDEX_CODECS = ["StandardPostings", "VBEPostings", "EliasGammaPostings"]
+# Semua codec yang terdaftar, di-benchmark encode / decode-nya
+ALL_CODECS = [codec.__name__ for codec in compression.CODECS.values()]
+
+# File marker collection sintetis (parameter generator), agar collection yang
+# sama tidak dibuat ulang
+SYNTHETIC_MARKER = "synthetic.json"
+
+
+def summarize(latencies):
+    """Ringkasan latency (detik) dalam milidetik: mean, p50, p90, p99, dan max"""
+    if len(latencies) == 0:
+        return {'count': 0}
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)] * 1000
+
+    return {'count': len(ordered), 'mean_ms': statistics.fmean(ordered) * 1000,
+            'p50_ms': percentile(50), 'p90_ms': percentile(90), 'p99_ms': percentile(99),
+            'max_ms': ordered[-1] * 1000}
+
+
+def synthesize_collection(source_dir, target_dir, scale, seed=0):
+    """
+    Membuat collection sintetis scale kali ukuran collection source_dir di
+    target_dir, dengan struktur yang sama (sub-directory sebagai block,
+    banyaknya dokumen per block sama). Kata-kata setiap dokumen diambil acak
+    dari semua kata di source_dir (sehingga distribusi frekuensi kata, dan
+    pekerjaan cleaning / stemming, mirip collection asli), dengan panjang
+    dokumen yang diambil acak dari panjang dokumen asli.
+
+    Returns
+    -------
+    str
+        target_dir
+    """
+    params = {'source_dir': os.path.abspath(source_dir), 'scale': scale, 'seed': seed}
+    marker_path = os.path.join(target_dir, SYNTHETIC_MARKER)
+    if os.path.exists(marker_path):
+        with open(marker_path) as f:
+            if json.load(f) == params:
+                return target_dir
+    shutil.rmtree(target_dir, ignore_errors=True)
+
+    words, doc_lengths, block_sizes = [], [], []
+    for block_dir in sorted(next(os.walk(source_dir))[1]):
+        file_names = next(os.walk(os.path.join(source_dir, block_dir)))[2]
+        block_sizes.append(len(file_names))
+        for file_name in file_names:
+            with open(os.path.join(source_dir, block_dir, file_name)) as f:
+                doc_words = f.read().split()
+            words.extend(doc_words)
+            doc_lengths.append(len(doc_words))
+
+    generator = random.Random(seed)
+    n_blocks = 0
+    for _ in range(scale):
+        for block_size in block_sizes:
+            block_path = os.path.join(target_dir, str(n_blocks))
+            os.makedirs(block_path)
+            for doc in range(block_size):
+                with open(os.path.join(block_path, f"doc{n_blocks}_{doc}.txt"), "w") as f:
+                    f.write(" ".join(generator.choices(words, k=generator.choice(doc_lengths))))
+            n_blocks += 1
+    with open(marker_path, "w") as f:
+        json.dump(params, f)
+    return target_dir
+
+
+@contextlib.contextmanager
+def phase_timers(index):
+    """
+    Context yang mengukur waktu (detik) setiap fase index() milik index:
+    clean (Cleaner.clean_and_tokenize), parse (parse_block tanpa clean),
+    invert (invert_write), dan merge (merge_intermediate_indices). Yang
+    diberikan adalah dictionary fase -> waktu, terisi setelah context selesai.
+    """
+    totals = {'clean': 0.0, 'parse': 0.0, 'invert': 0.0, 'merge': 0.0}
+
+    def timed(phase, function):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                totals[phase] += time.perf_counter() - start
+        return wrapper
+
+    clean_and_tokenize = Cleaner.__dict__['clean_and_tokenize']
+    Cleaner.clean_and_tokenize = staticmethod(timed('clean', clean_and_tokenize.__func__))
+    index.parse_block = timed('parse', index.parse_block)
+    index.invert_write = timed('invert', index.invert_write)
+    index.merge_intermediate_indices = timed('merge', index.merge_intermediate_indices)
+    try:
+        yield totals
+    finally:
+        Cleaner.clean_and_tokenize = clean_and_tokenize
+        del index.parse_block, index.invert_write, index.merge_intermediate_indices
+        # clean dipanggil di dalam parse_block
+        totals['parse'] -= totals['clean']
+
+
+def index_sizes(output_dir, index_name="main_index"):
+    """Ukuran (bytes) file-file index: postings, dictionary, posisi, dan map / metadata lain"""
+    sizes = {'index_bytes': 0, 'dict_bytes': 0, 'positions_bytes': 0, 'other_bytes': 0}
+    for file_name in os.listdir(output_dir):
+        size = os.path.getsize(os.path.join(output_dir, file_name))
+        if file_name == index_name + '.index':
+            sizes['index_bytes'] += size
+        elif file_name == index_name + '.dict':
+            sizes['dict_bytes'] += size
+        elif file_name == index_name + '.pos':
+            sizes['positions_bytes'] += size
+        else:
+            sizes['other_bytes'] += size
+    return sizes
+
+
+def benchmark_indexing(data_dir, output_dir, codec, trials, with_positions):
+    """
+    Indexing data_dir sebanyak trials kali (setiap kali dari output_dir kosong
+    dan stem cache kosong). Waktu yang dilaporkan adalah median dari semua
+    trial, beserta throughput (dokumen dan token per detik), waktu per fase,
+    dan ukuran index.
+    """
+    durations, phases = [], []
+    for _ in range(trials):
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.makedirs(output_dir)
+        Cleaner.stem_cache.clear()
+        index = BSBIIndex(data_dir=data_dir, output_dir=output_dir, postings_encoding=codec,
+                          with_positions=with_positions)
+        with phase_timers(index) as totals:
+            start = time.perf_counter()
+            index.index()
+            duration = time.perf_counter() - start
+        totals['other'] = duration - sum(totals.values())
+        durations.append(duration)
+        phases.append(totals)
+
+    index = BSBIIndex(data_dir=data_dir, output_dir=output_dir, postings_encoding=codec)
+    index.load()
+    seconds = statistics.median(durations)
+    tokens = index.total_doc_length
+    return {'trials': trials, 'seconds': seconds, 'min_seconds': min(durations),
+            'docs': index.n_docs, 'tokens': tokens,
+            'docs_per_s': index.n_docs / seconds, 'tokens_per_s': tokens / seconds,
+            'phases_seconds': {phase: statistics.median(totals[phase] for totals in phases) for phase in phases[0]},
+            'sizes': index_sizes(output_dir)}
+
+
+def benchmark_queries(data_dir, output_dir, codec, queries, trials):
+    """
+    Latency per query (lihat summarize) untuk setiap jenis retrieval:
+    - cold: pemanggilan pertama setiap query setelah load(), dengan postings
+      cache kosong (page cache OS tidak dikosongkan)
+    - warm: trials pemanggilan berikutnya, postings sudah di cache
+    - result_cache: seperti warm, dengan result cache aktif
+    dan throughput retrieve_many untuk semua query sekaligus.
+    """
+    modes = {'and': lambda index, query: index.retrieve(query),
+             'bm25': lambda index, query: index.retrieve_bm25(query, 10),
+             'maxscore': lambda index, query: index.retrieve_maxscore(query, 10)}
+    results = {}
+    for mode, run in modes.items():
+        for label, result_cache_capacity in [('postings_cache', 0), ('result_cache', 4 * len(queries))]:
+            index = BSBIIndex(data_dir=data_dir, output_dir=output_dir, postings_encoding=codec,
+                              result_cache_capacity=result_cache_capacity)
+            index.load()
+            index.open_searcher()
+            latencies = {'cold': [], 'warm': []}
+            for trial in range(trials + 1):
+                for query in queries:
+                    start = time.perf_counter()
+                    run(index, query)
+                    latencies['cold' if trial == 0 else 'warm'].append(time.perf_counter() - start)
+            index.close_searcher()
+            if label == 'postings_cache':
+                results[mode] = {'cold': summarize(latencies['cold']), 'warm': summarize(latencies['warm'])}
+            else:
+                results[mode]['result_cache'] = summarize(latencies['warm'])
+
+    index = BSBIIndex(data_dir=data_dir, output_dir=output_dir, postings_encoding=codec, postings_cache_size=0)
+    index.load()
+    index.open_searcher()
+    start = time.perf_counter()
+    for _ in range(trials):
+        index.retrieve_many(queries)
+    seconds = time.perf_counter() - start
+    index.close_searcher()
+    results['and_batch'] = {'queries_per_s': trials * len(queries) / seconds}
+    return results
+
+
+def load_postings(output_dir, codec, index_name="main_index"):
+    """Semua (postings list, tf list) dari sebuah index"""
+    postings = []
+    with InvertedIndexReader(index_name, codec, directory=output_dir) as index:
+        for term in index.terms:
+            doc_ids, tf_list = index.get_postings_and_tf(term)
+            postings.append((list(doc_ids), list(tf_list)))
+    return postings
+
+
+def benchmark_codecs(postings, codec_names, trials):
+    """
+    Kecepatan encode / decode setiap codec untuk postings (list of
+    (docIDs, tf)), dalam MB/s data tanpa kompresi (4 bytes per integer),
+    beserta rata-rata bit per docID hasil encode. docIDs digeser agar dimulai
+    dari 1, karena Elias-Gamma tidak bisa meng-encode 0.
+    """
+    shift = 1 if any(doc_ids[0] == 0 for doc_ids, _ in postings if doc_ids) else 0
+    doc_id_lists = [[doc_id + shift for doc_id in doc_ids] for doc_ids, _ in postings]
+    tf_lists = [tf_list for _, tf_list in postings]
+    n_doc_ids = sum(len(doc_ids) for doc_ids in doc_id_lists)
+    n_tfs = sum(len(tf_list) for tf_list in tf_lists)
+
+    results = {}
+    for name in codec_names:
+        codec = getattr(compression, name)
+        result = {}
+        for kind, lists, encode, decode, count in [('doc_ids', doc_id_lists, codec.encode, codec.decode, n_doc_ids),
+                                                   ('tf', tf_lists, codec.encode_tf, codec.decode_tf, n_tfs)]:
+            encode_seconds, decode_seconds = [], []
+            for _ in range(trials):
+                start = time.perf_counter()
+                encoded = [encode(values) for values in lists]
+                encode_seconds.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                decoded = [decode(data) for data in encoded]
+                decode_seconds.append(time.perf_counter() - start)
+            assert all(list(values) == list(original) for values, original in zip(decoded, lists)), \
+                f"{name}: hasil decode {kind} salah"
+            megabytes = 4 * count / 1e6
+            result[kind] = {'encode_mb_s': megabytes / min(encode_seconds),
+                            'decode_mb_s': megabytes / min(decode_seconds),
+                            'bits_per_value': 8 * sum(len(data) for data in encoded) / count if count else 0.0}
+        results[name] = result
+    return results
+
+
+def flatten(results, prefix=""):
+    """Dictionary bersarang -> {'a.b.c': angka}, untuk membandingkan dua hasil benchmark"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline, results, threshold):
+    """
+    Mencetak metrik yang berubah lebih dari threshold (rasio) dibanding
+    baseline. Metrik throughput (_per_s, _mb_s) lebih baik jika naik, metrik
+    waktu (seconds, _ms) lebih baik jika turun.
+
+    Returns
+    -------
+    int
+        Banyaknya metrik yang memburuk
+    """
+    old, new = flatten(baseline['results']), flatten(results)
+    regressions = 0
+    for name in sorted(old.keys() & new.keys()):
+        if old[name] == 0:
+            continue
+        ratio = new[name] / old[name]
+        if name.endswith(('_per_s', '_mb_s')):
+            worse = ratio < 1 - threshold
+        elif name.endswith(('seconds', '_ms')) or '.phases_seconds.' in name:
+            worse = ratio > 1 + threshold
+        else:
+            continue
+        if worse or abs(ratio - 1) > threshold:
+            regressions += worse
+            print(f"{'REGRESI' if worse else 'lebih baik'}: {name} {old[name]:.4g} -> {new[name]:.4g} ({ratio:.2f}x)")
+    return regressions
+
+
+def print_summary(results):
+    for collection in results['collections'].values():
+        print(f"\nCollection {collection['data_dir']} (skala {collection['scale']}x)")
+        for name, result in collection['codecs'].items():
+            indexing, queries = result['indexing'], result['queries']
+            phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in indexing['phases_seconds'].items())
+            print(f"  {name}: indexing {indexing['seconds']:.2f}s ({indexing['docs_per_s']:.0f} docs/s, "
+                  f"{indexing['tokens_per_s']:.0f} tokens/s; {phases})")
+            print(f"    index {indexing['sizes']['index_bytes'] / 1024:.1f} KB, "
+                  f"dict {indexing['sizes']['dict_bytes'] / 1024:.1f} KB")
+            for mode in ['and', 'bm25', 'maxscore']:
+                cold, warm = queries[mode]['cold'], queries[mode]['warm']
+                print(f"    {mode}: cold p50 {cold['p50_ms']:.2f} ms, warm p50 {warm['p50_ms']:.2f} ms / "
+                      f"p99 {warm['p99_ms']:.2f} ms, result cache p50 {queries[mode]['result_cache']['p50_ms']:.3f} ms")
+            print(f"    retrieve_many: {queries['and_batch']['queries_per_s']:.0f} queries/s")
+    print("\nCodec (MB/s encode / decode docIDs, bit per docID)")
+    for name, result in results['codecs'].items():
+        doc_ids = result['doc_ids']
+        print(f"  {name}: {doc_ids['encode_mb_s']:.1f} / {doc_ids['decode_mb_s']:.1f} MB/s, "
+              f"{doc_ids['bits_per_value']:.2f} bit")
+
 
 if __name__ == '__main__':
-  TRIAL = 10
-  FILE_INDEX_NAME = "main_index"
-  OUTPUT_DIR = "index"
-  # POSTINGS = StandardPostings
-  POSTINGS = EliasGammaPostings
-  # POSTINGS = VBEPostings
-  # nltk.download('punkt')
-
-  total_time = 0
-  max_time = -1
-  min_time = -1
-  for j in range(TRIAL):
-
-    start = time.time()
-    BSBI_instance = BSBIIndex(data_dir='collection',
-                              postings_encoding=POSTINGS,
-                              output_dir='index')
-
-    BSBI_instance.index()  # memulai indexing!
-    end = time.time()
-    duration = end - start
-    if (max_time == -1):
-      max_time = min_time = duration
-    total_time += duration
-    max_time = max(duration, max_time)
-    min_time = min(duration, min_time)
-  print(
-    f"Average time indexing for {POSTINGS.__name__}: {(total_time / TRIAL):.5f} seconds")
-  # print(f"Min time for {POSTINGS.__name__}: {(min_time):.5f} seconds")
-  # print(f"Max time for {POSTINGS.__name__}: {(max_time):.5f} seconds")
-  dict_file = os.stat(os.path.join(OUTPUT_DIR, f"{FILE_INDEX_NAME}.dict"))
-  index_file = os.stat(os.path.join(OUTPUT_DIR, f"{FILE_INDEX_NAME}.index"))
-  print(
-    f"dict file size: {dict_file.st_size} Bytes = {dict_file.st_size / 1024} KB")
-  print(
-    f"index file size: {index_file.st_size} Bytes = {index_file.st_size / 1024} KB")
-
-  BSBI_instance = BSBIIndex(data_dir='collection',
-                            postings_encoding=POSTINGS,
-                            output_dir='index')
-
-  BSBI_instance.index()  # memulai indexing!
-  for j in range(TRIAL):
-    queries = ["olahraga", "tumor", "hidup sehat", "jantung", "penyakit",
-               "kuat", "badan sehat", "olahraga teratur", "tidur cukup"]
-    start = time.time()
-    for query in queries:
-      ans = sorted(BSBI_instance.retrieve(query))
-    end = time.time()
-    duration = end - start
-    total_time += duration
-
-  print(
-    f"Average time searching for {POSTINGS.__name__}: {(total_time / TRIAL):.5f} seconds")
+    parser = argparse.ArgumentParser(description="Benchmark indexing, retrieval, dan codec BSBIIndex")
+    parser.add_argument('--data-dir', default='collection')
+    parser.add_argument('--work-dir', default=os.path.join('tmp', 'benchmark'),
+                        help="directory untuk index dan collection sintetis")
+    parser.add_argument('--codecs', nargs='+', default=INDEX_CODECS, choices=ALL_CODECS)
+    parser.add_argument('--scales', nargs='+', type=int, default=[1],
+                        help="skala collection; skala > 1 memakai collection sintetis (misalnya 10 100 1000)")
+    parser.add_argument('--trials', type=int, default=3)
+    parser.add_argument('--positions', action='store_true', help="indexing dengan with_positions")
+    parser.add_argument('--output', default='benchmark.json', help="file hasil benchmark (JSON)")
+    parser.add_argument('--compare', help="hasil benchmark sebelumnya (JSON) sebagai baseline")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="perubahan relatif minimum yang dilaporkan oleh --compare")
+    args = parser.parse_args()
+
+    results = {'collections': {}, 'codecs': {}}
+    for scale in args.scales:
+        data_dir = args.data_dir
+        if scale > 1:
+            data_dir = synthesize_collection(args.data_dir, os.path.join(args.work_dir, f"collection_x{scale}"), scale)
+        collection = {'scale': scale, 'data_dir': data_dir, 'codecs': {}}
+        for name in args.codecs:
+            output_dir = os.path.join(args.work_dir, f"index_x{scale}_{name}")
+            codec = getattr(compression, name)
+            collection['codecs'][name] = {
+                'indexing': benchmark_indexing(data_dir, output_dir, codec, args.trials, args.positions),
+                'queries': benchmark_queries(data_dir, output_dir, codec, QUERIES, args.trials)}
+        results['collections'][f"x{scale}"] = collection
+    # postings untuk benchmark codec diambil dari collection dan codec pertama
+    postings = load_postings(os.path.join(args.work_dir, f"index_x{args.scales[0]}_{args.codecs[0]}"),
+                             getattr(compression, args.codecs[0]))
+    results['codecs'] = benchmark_codecs(postings, ALL_CODECS, args.trials)
+
+    report = {'meta': {'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+                       'python': sys.version.split()[0], 'numpy': np.__version__,
+                       'platform': platform.platform(), 'args': vars(args)},
+              'results': results}
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print_summary(results)
+    print(f"\nHasil lengkap: {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        sys.exit(1 if regressions > 0 else 0)
@@ -1,30 +1,118 @@
+import array
+import bisect
+import collections
+import math
 import os
 import pickle
+import sys
 import contextlib
 import heapq
+import itertools
+import json
+import operator
+import threading
 import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
 
 import nltk
 from nltk import word_tokenize
 
-from index import InvertedIndexReader, InvertedIndexWriter
-from util import IdMap, sorted_intersect
-from compression import StandardPostings, VBEPostings, EliasGammaPostings
+from index import InvertedIndexReader, InvertedIndexWriter, SegmentedIndexReader, TermDictionary, intersect_cursors
+from util import IdMap, LRUCache, DocIdBitmap, RoaringBitmap, intersect_many, phrase_match, minimum_window
+from compression import StandardPostings, VBEPostings, EliasGammaPostings, \
+    NumpyVBEPostings, NumpyEliasGammaPostings, CODECS
+from query import QueryEvaluator, analyze, is_boolean_query, normalize, parse_query
 from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+from Sastrawi.Stemmer.Filter import TextNormalizer
 from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
 from tqdm import tqdm
 
+# Banyaknya kata -> stem maksimum yang disimpan oleh Cleaner.stem_cache
+STEM_CACHE_CAPACITY = 100000
+
+# Batas memori default (bytes) untuk postings di memori pada indexing SPIMI
+SPIMI_MEMORY_BUDGET = 64 * 1024 * 1024
+# Perkiraan memori untuk setiap term baru di bucket SPIMI (dua objek array,
+# tuple, dan slot dict)
+SPIMI_BUCKET_OVERHEAD = 2 * sys.getsizeof(array.array('I')) + 128
+
+# Parameter default BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Tiered merge policy segment (lihat BSBIIndex.merge_segments): setiap
+# SEGMENT_MERGE_FACTOR segment berurutan di tier yang sama digabung menjadi
+# satu segment, dengan tier = floor(log_SEGMENT_MERGE_FACTOR(ukuran index file
+# / SEGMENT_MIN_SIZE)); segment yang lebih kecil dari SEGMENT_MIN_SIZE bytes
+# berada di tier 0
+SEGMENT_MERGE_FACTOR = 4
+SEGMENT_MIN_SIZE = 64 * 1024
+
+# Batas ukuran default (bytes) BSBIIndex.postings_cache, yang menyimpan
+# postings list (beserta tf) hasil decode
+POSTINGS_CACHE_SIZE = 64 * 1024 * 1024
+# Banyaknya hasil query maksimum di BSBIIndex.result_cache, 0 artinya result
+# cache tidak dipakai
+RESULT_CACHE_CAPACITY = 0
+# Ukuran sebuah objek int Python di list hasil decode
+INT_OBJECT_SIZE = sys.getsizeof(1 << 20)
+
+def postings_size(postings):
+    """Perkiraan ukuran (bytes) pasangan (postings list, tf list) hasil decode"""
+    return sum(sys.getsizeof(column) + (INT_OBJECT_SIZE * len(column) if isinstance(column, list) else 0)
+               for column in postings if column is not None)
+
 class Cleaner:
-    stemmer = StemmerFactory().create_stemmer()
+    # Stemmer Sastrawi tanpa ArrayCache bawaan (yang tidak terbatas ukurannya),
+    # caching kata -> stem dilakukan sendiri oleh stem_cache
+    stemmer = StemmerFactory().create_stemmer().delegatedStemmer
     stop_word_remover = StopWordRemoverFactory().create_stop_word_remover()
+    stem_cache = LRUCache(STEM_CACHE_CAPACITY)
+    # Jika tidak None, pasangan (kata, stem) yang baru di-stem (cache miss)
+    # ditambahkan ke list ini, lihat _parse_invert_write_block
+    new_stems = None
+
+    @staticmethod
+    def stem(word):
+        """Stem sebuah kata (yang sudah dinormalisasi) melalui stem_cache"""
+        stem = Cleaner.stem_cache.get(word)
+        if stem is None:
+            stem = Cleaner.stemmer.stem(word)
+            Cleaner.stem_cache.put(word, stem)
+            if Cleaner.new_stems is not None:
+                Cleaner.new_stems.append((word, stem))
+        return stem
 
     @staticmethod
     def clean_and_tokenize(uncleaned_sentence):
-        stemmed = Cleaner.stemmer.stem(uncleaned_sentence)
+        """
+        Tokenize dulu (normalisasi + split seperti yang dilakukan Sastrawi),
+        lalu stem setiap kata unik sekali saja. Hasilnya sama persis dengan
+        stemmer.stem(uncleaned_sentence) milik Sastrawi.
+        """
+        words = TextNormalizer.normalize_text(uncleaned_sentence).split(' ')
+        stems = {word: Cleaner.stem(word) for word in set(words)}
+        stemmed = ' '.join([stems[word] for word in words])
         cleaned_from_stopword = Cleaner.stop_word_remover.remove(stemmed)
         tokenized_words = word_tokenize(cleaned_from_stopword)
         return tokenized_words
 
+    @staticmethod
+    def save_stem_cache(path):
+        """Menyimpan isi stem_cache (urut dari LRU ke MRU, lihat LRUCache.snapshot) via pickle"""
+        with open(path, 'wb') as f:
+            pickle.dump(Cleaner.stem_cache.snapshot(), f)
+
+    @staticmethod
+    def load_stem_cache(path):
+        """Memuat stem_cache yang disimpan oleh save_stem_cache, jika ada"""
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            for word, stem in pickle.load(f):
+                Cleaner.stem_cache.put(word, stem)
+
 
 class BSBIIndex:
     """
@@ -38,33 +126,255 @@ class BSBIIndex:
     postings_encoding: Lihat di compression.py, kandidatnya adalah StandardPostings,
                     VBEPostings, dsb.
     index_name(str): Nama dari file yang berisi inverted index
+    use_mmap(bool): Jika True, main index dibaca lewat mmap saat retrieval
+    block_size(int): Banyaknya docID per block postings list (lihat
+                    InvertedIndexWriter), None artinya tanpa block
+    doc_length(array): Panjang (banyaknya token) setiap dokumen, index = docID
+    with_positions(bool): Jika True, posisi token ikut di-index (file .pos)
+                    untuk retrieve_phrase dan retrieve_proximity
+    segments(List[str]): Nama index-index (segment) yang bersama-sama membentuk
+                    index collection, terurut dari yang paling lama. Setelah
+                    index() hanya ada satu segment, yaitu index_name; update()
+                    menambah segment baru dan merge_segments() menggabungkannya.
+                    Disimpan di manifest segments.json.
+    documents(Dict[str, List[int]]): Signature [mtime_ns, size] setiap dokumen
+                    yang sudah di-index (path relatif terhadap data_dir), untuk
+                    mendeteksi dokumen baru / berubah di update()
+    deleted_doc_ids(DocIdBitmap): docIDs yang sudah tidak berlaku (dokumen
+                    yang dihapus atau diganti), diabaikan saat retrieval dan
+                    dibuang ketika segment-nya di-merge. Disimpan di
+                    docs.deleted.
+    postings_cache(LRUCache): (postings list, tf list) hasil decode per
+                    segment dan termID, dibatasi postings_cache_size bytes.
+                    None jika postings_cache_size 0.
+    result_cache(LRUCache): Hasil query per (generation, jenis query, query
+                    yang sudah dinormalisasi, parameter query), dibatasi
+                    result_cache_capacity entry. None jika
+                    result_cache_capacity 0.
+    generation(int): Naik setiap kali isi index berubah (indexing, load,
+                    segment baru, merge, atau dokumen dihapus), sehingga hasil
+                    query di result_cache dari generation sebelumnya tidak
+                    pernah dipakai lagi.
+    shard(Tuple[int, int]): (shard_id, n_shards) jika index ini adalah satu
+                    shard dari index yang dipartisi per dokumen (lihat
+                    shard.py): hanya dokumen yang in_shard(...) yang di-index
+                    dan di-scan. None artinya semua dokumen.
     """
-    def __init__(self, data_dir, output_dir, postings_encoding, index_name = "main_index"):
-        self.term_id_map = IdMap(one_indexed=(postings_encoding == EliasGammaPostings))
-        self.doc_id_map = IdMap(one_indexed=(postings_encoding == EliasGammaPostings))
+    def __init__(self, data_dir, output_dir, postings_encoding, index_name = "main_index", use_mmap = False,
+                 block_size = 128, with_positions = False, postings_cache_size = POSTINGS_CACHE_SIZE,
+                 result_cache_capacity = RESULT_CACHE_CAPACITY, shard = None):
+        self.term_id_map = IdMap(one_indexed=issubclass(postings_encoding, EliasGammaPostings))
+        self.doc_id_map = IdMap(one_indexed=issubclass(postings_encoding, EliasGammaPostings))
         self.data_dir = data_dir
         self.output_dir = output_dir
         self.index_name = index_name
         self.postings_encoding = postings_encoding
+        self.use_mmap = use_mmap
+        self.block_size = block_size
+        self.with_positions = with_positions
+        self.shard = shard
+        self.doc_length = array.array('I')
+        self.avg_doc_length = 0
 
         # Untuk menyimpan nama-nama file dari semua intermediate inverted index
         self.intermediate_indices = []
 
+        # InvertedIndexReader long-lived untuk main index, lihat open_searcher()
+        self.searcher = None
+
+        self.segments = [index_name]
+        self.next_segment = 0
+        self.documents = None
+        # docIDs di doc_id_map berasal dari nama file (index()) atau path
+        # relatif dokumen (indexing SPIMI)
+        self.keyed_by_path = False
+        self.deleted_doc_ids = DocIdBitmap()
+        self.total_doc_length = 0
+        self.update_lock = threading.Lock()
+        # melindungi segments, manifest, dan pergantian searcher
+        self.segments_lock = threading.RLock()
+        self.merge_lock = threading.Lock()
+        self.merge_thread = None
+
+        self.postings_cache = LRUCache(max_bytes=postings_cache_size, sizeof=postings_size) if postings_cache_size else None
+        self.result_cache = LRUCache(result_cache_capacity) if result_cache_capacity else None
+        self.generation = 0
+
     def save(self):
-        """Menyimpan doc_id_map and term_id_map ke output directory via pickle"""
+        """
+        Menyimpan doc_id_map dan term_id_map (lihat IdMap.save), doc_length
+        (via pickle), beserta stem cache milik Cleaner ke output directory
+        """
 
-        with open(os.path.join(self.output_dir, 'terms.dict'), 'wb') as f:
-            pickle.dump(self.term_id_map, f)
-        with open(os.path.join(self.output_dir, 'docs.dict'), 'wb') as f:
-            pickle.dump(self.doc_id_map, f)
+        self.term_id_map.save(os.path.join(self.output_dir, 'terms.dict'))
+        self.doc_id_map.save(os.path.join(self.output_dir, 'docs.dict'))
+        with open(os.path.join(self.output_dir, 'doclen.dict'), 'wb') as f:
+            pickle.dump(self.doc_length, f)
+        self.deleted_doc_ids.save(os.path.join(self.output_dir, 'docs.deleted'))
+        Cleaner.save_stem_cache(os.path.join(self.output_dir, 'stems.dict'))
+        self.update_collection_statistics()
 
     def load(self):
-        """Memuat doc_id_map and term_id_map dari output directory"""
+        """
+        Memuat doc_id_map, term_id_map, doc_length (dan stem cache serta
+        manifest segment) dari output directory. Jika index menyimpan codec
+        id, postings_encoding diganti dengan codec tersebut (kecuali
+        postings_encoding adalah subclass-nya), agar segment baru dan hasil
+        merge memakai codec yang sama dengan index yang sudah ada.
+        """
 
-        with open(os.path.join(self.output_dir, 'terms.dict'), 'rb') as f:
-            self.term_id_map = pickle.load(f)
-        with open(os.path.join(self.output_dir, 'docs.dict'), 'rb') as f:
-            self.doc_id_map = pickle.load(f)
+        self.term_id_map = IdMap.load(os.path.join(self.output_dir, 'terms.dict'))
+        self.doc_id_map = IdMap.load(os.path.join(self.output_dir, 'docs.dict'))
+        with open(os.path.join(self.output_dir, 'doclen.dict'), 'rb') as f:
+            self.doc_length = pickle.load(f)
+        self.deleted_doc_ids = DocIdBitmap.load(os.path.join(self.output_dir, 'docs.deleted'))
+        Cleaner.load_stem_cache(os.path.join(self.output_dir, 'stems.dict'))
+        self.load_manifest()
+        dictionary = TermDictionary(os.path.join(self.output_dir, self.segments[0] + '.dict'))
+        codec_id = dictionary.meta.get('codec')
+        dictionary.close()
+        if codec_id in CODECS and not issubclass(self.postings_encoding, CODECS[codec_id]):
+            self.postings_encoding = CODECS[codec_id]
+        self.update_collection_statistics()
+        self.invalidate_results()
+
+    def save_manifest(self):
+        """
+        Menyimpan manifest segments.json (segments dan signature dokumen).
+        File ditulis ke file sementara lalu di-rename, agar
+        manifest di disk selalu utuh.
+        """
+        with self.segments_lock:
+            manifest = {'segments': self.segments,
+                        'next_segment': self.next_segment,
+                        'keyed_by_path': self.keyed_by_path,
+                        'documents': self.documents}
+            manifest_path = os.path.join(self.output_dir, 'segments.json')
+            with open(manifest_path + '.tmp', 'w') as f:
+                json.dump(manifest, f)
+            os.replace(manifest_path + '.tmp', manifest_path)
+
+    def load_manifest(self):
+        """
+        Memuat manifest segments.json jika ada. Index lama tanpa manifest
+        dianggap terdiri dari satu segment index_name.
+        """
+        manifest_path = os.path.join(self.output_dir, 'segments.json')
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        with self.segments_lock:
+            self.segments = manifest['segments']
+            self.next_segment = manifest['next_segment']
+            self.keyed_by_path = manifest['keyed_by_path']
+            self.documents = manifest['documents']
+
+    def set_doc_length(self, doc_id, length):
+        """Mencatat panjang (banyaknya token) dokumen doc_id"""
+        if len(self.doc_length) <= doc_id:
+            self.doc_length.extend(itertools.repeat(0, doc_id + 1 - len(self.doc_length)))
+        self.doc_length[doc_id] = length
+
+    def update_collection_statistics(self):
+        """Menghitung banyaknya dokumen N dan rata-rata panjang dokumen untuk scoring"""
+        # docID 0 dipakai sebagai placeholder jika doc_id_map one-indexed
+        # dan dokumen yang sudah dihapus tidak dihitung
+        self.n_docs = (len(self.doc_id_map) - (1 if issubclass(self.postings_encoding, EliasGammaPostings) else 0)
+                       - len(self.deleted_doc_ids))
+        self.total_doc_length = sum(self.doc_length) - sum(self.doc_length[doc_id] for doc_id in self.deleted_doc_ids
+                                                           if doc_id < len(self.doc_length))
+        self.avg_doc_length = self.total_doc_length / self.n_docs if self.n_docs > 0 else 0
+
+    def open_searcher(self):
+        """
+        Membuka main index sekali (memuat dictionary dan membuka file postings)
+        untuk melayani banyak pemanggilan retrieve(...), termasuk dari beberapa
+        thread sekaligus, sampai close_searcher() dipanggil. Tanpa searcher,
+        retrieve(...) membuka dan menutup main index di setiap query.
+        """
+        if self.searcher is None:
+            self.searcher = self.open_index_reader()
+        return self.searcher
+
+    def close_searcher(self):
+        """Menutup searcher yang dibuka dengan open_searcher()"""
+        if self.searcher is not None:
+            self.searcher.close()
+            self.searcher = None
+
+    def refresh_searcher(self):
+        """
+        Membuka ulang searcher (jika sedang terbuka) setelah daftar segment
+        berubah. Searcher lama tidak ditutup secara eksplisit karena mungkin
+        masih dipakai query di thread lain; file-filenya tertutup sendiri
+        ketika searcher lama sudah tidak direferensikan.
+        """
+        if self.searcher is not None:
+            self.searcher = self.open_index_reader()
+
+    def open_index_reader(self):
+        """
+        Membuka semua segment: InvertedIndexReader jika hanya ada satu segment,
+        atau SegmentedIndexReader jika lebih. Reader harus ditutup dengan close().
+        """
+        # segment tidak boleh dihapus oleh merge_segments selama sedang dibuka
+        with self.segments_lock:
+            readers = [InvertedIndexReader(segment, self.postings_encoding, directory=self.output_dir,
+                                           use_mmap=self.use_mmap, postings_cache=self.postings_cache).open()
+                       for segment in self.segments]
+        return readers[0] if len(readers) == 1 else SegmentedIndexReader(readers)
+
+    def invalidate_results(self):
+        """
+        Dipanggil setiap kali isi index berubah, setelah perubahannya berlaku:
+        generation dinaikkan dan result_cache dikosongkan. Query yang sedang
+        berjalan memakai generation lama, sehingga hasilnya tidak akan
+        terbaca oleh query berikutnya. postings_cache tidak perlu dikosongkan
+        karena key-nya adalah segment (yang tidak pernah diubah) dan termID.
+        """
+        with self.segments_lock:
+            self.generation += 1
+        if self.result_cache is not None:
+            self.result_cache.clear()
+
+    def cached_result(self, key, compute):
+        """
+        Hasil query dari result_cache, atau compute() (yang lalu disimpan ke
+        cache) jika belum ada. key berisi jenis query, query yang sudah
+        dinormalisasi (cleaning dan stemming), dan parameter query lainnya.
+        """
+        if self.result_cache is None:
+            return compute()
+        key = (self.generation,) + key
+        result = self.result_cache.get(key)
+        if result is None:
+            result = compute()
+            self.result_cache.put(key, result)
+        # salinan, agar hasil di cache tidak ikut berubah oleh pemanggil
+        return list(result)
+
+    def cache_stats(self):
+        """Statistik (hits, misses, dst., lihat LRUCache.stats) postings_cache dan result_cache"""
+        return {name: cache.stats() for name, cache in [('postings', self.postings_cache), ('results', self.result_cache)]
+                if cache is not None}
+
+    @contextlib.contextmanager
+    def main_index_reader(self):
+        """
+        Context yang memberikan reader main index (semua segment): searcher
+        jika sudah dibuka dengan open_searcher(), atau reader sementara jika
+        belum.
+        """
+        searcher = self.searcher
+        if searcher is not None:
+            yield searcher
+        else:
+            merged_index = self.open_index_reader()
+            try:
+                yield merged_index
+            finally:
+                merged_index.close()
 
     def parse_block(self, block_dir_relative):
         """
@@ -100,20 +410,54 @@ class BSBIIndex:
         Harus menggunakan self.term_id_map dan self.doc_id_map untuk mendapatkan
         termIDs dan docIDs. Dua variable ini harus persis untuk semua pemanggilan
         parse_block(...).
+
+        Sebuah pasangan muncul sekali untuk setiap kemunculan term di dokumen,
+        sehingga term frequency bisa dihitung saat invert_write. Panjang setiap
+        dokumen dicatat di self.doc_length. Jika self.with_positions, yang
+        dikembalikan adalah <termID, docID, posisi> (posisi token setelah
+        stopword dibuang, dimulai dari 1).
         """
 
         block_path = os.path.join(self.data_dir, block_dir_relative)
 
-        td_pairs = []
         # print(f"Currently processing... {block_path}")
-        for doc_file_name in next(os.walk(block_path))[2]:
-            current_doc_id = self.doc_id_map[doc_file_name]
-            doc_path = os.path.join(block_path, doc_file_name)
-            with open(doc_path, "r") as f:
+        docs = [(self.doc_id_map[doc_file_name], os.path.join(block_dir_relative, doc_file_name))
+                for doc_file_name in self.block_documents(block_dir_relative)]
+        return self.parse_documents(docs)
+
+    def block_documents(self, block_dir_relative):
+        """Nama file dokumen-dokumen di sebuah block yang termasuk shard index ini"""
+        return [doc_file_name for doc_file_name in next(os.walk(os.path.join(self.data_dir, block_dir_relative)))[2]
+                if self.in_shard(os.path.join(block_dir_relative, doc_file_name))]
+
+    def in_shard(self, doc_path_relative):
+        """
+        True jika dokumen (path relatif terhadap data_dir) termasuk shard index
+        ini. Dokumen dipartisi berdasarkan CRC32 dari doc_key-nya, sehingga
+        pembagiannya merata, tidak bergantung pada struktur folder, dan stabil
+        di antara process (tidak seperti hash(...) string).
+        """
+        if self.shard is None:
+            return True
+        shard_id, n_shards = self.shard
+        return zlib.crc32(self.doc_key(doc_path_relative).encode('utf-8')) % n_shards == shard_id
+
+    def parse_documents(self, docs):
+        """
+        Parsing dokumen-dokumen docs (list of (docID, path dokumen relatif
+        terhadap data_dir)) menjadi td_pairs, seperti parse_block.
+        """
+        td_pairs = []
+        for current_doc_id, doc_path_relative in docs:
+            with open(os.path.join(self.data_dir, doc_path_relative), "r") as f:
                 tokenized_words = Cleaner.clean_and_tokenize(f.read())
-                for token in tokenized_words:
+                self.set_doc_length(current_doc_id, len(tokenized_words))
+                for position, token in enumerate(tokenized_words, 1):
                     current_term_id = self.term_id_map[token]
-                    td_pairs.append((current_term_id, current_doc_id))
+                    if self.with_positions:
+                        td_pairs.append((current_term_id, current_doc_id, position))
+                    else:
+                        td_pairs.append((current_term_id, current_doc_id))
 
         return td_pairs
 
@@ -126,7 +470,10 @@ class BSBIIndex:
         hanya di-mantain satu dictionary besar untuk keseluruhan block.
         Namun dalam teknik penyimpanannya digunakan srategi dari SPIMI
         yaitu penggunaan struktur data hashtable (dalam Python bisa
-        berupa Dictionary)
+        berupa Dictionary). Untuk setiap term disimpan dictionary docID ->
+        term frequency, sehingga tf ikut ditulis ke index. Jika
+        self.with_positions, td_pairs berisi <termID, docID, posisi> dan yang
+        disimpan adalah list posisi per docID (tf = banyaknya posisi).
 
         ASUMSI: td_pairs CUKUP di memori
 
@@ -138,14 +485,25 @@ class BSBIIndex:
             Inverted index pada disk (file) yang terkait dengan suatu "block"
         """
         term_dict = {}
+        if self.with_positions:
+            for term_id, doc_id, position in td_pairs:
+                if term_id not in term_dict:
+                    term_dict[term_id] = {}
+                term_dict[term_id].setdefault(doc_id, []).append(position)
+            for term_id in sorted(term_dict.keys()):
+                postings_list = sorted(term_dict[term_id])
+                positions_list = [term_dict[term_id][doc_id] for doc_id in postings_list]
+                index.append(term_id, postings_list, [len(positions) for positions in positions_list], positions_list)
+            return
         for term_id, doc_id in td_pairs:
             if term_id not in term_dict:
-                term_dict[term_id] = set()
-            term_dict[term_id].add(doc_id)
+                term_dict[term_id] = {}
+            term_dict[term_id][doc_id] = term_dict[term_id].get(doc_id, 0) + 1
         for term_id in sorted(term_dict.keys()):
-            index.append(term_id, sorted(list(term_dict[term_id])))
+            postings_list = sorted(term_dict[term_id])
+            index.append(term_id, postings_list, [term_dict[term_id][doc_id] for doc_id in postings_list])
 
-    def merge(self, indices, merged_index):
+    def merge(self, indices, merged_index, deleted_doc_ids=None):
         """
         Lakukan merging ke semua intermediate inverted indices menjadi
         sebuah single index.
@@ -162,17 +520,106 @@ class BSBIIndex:
         merged_index: InvertedIndexWriter
             Instance InvertedIndexWriter object yang merupakan hasil merging dari
             semua intermediate InvertedIndexWriter objects.
+
+        Merging dilakukan per term tanpa memuat seluruh postings list ke memori.
+        Yang di-merge (heap) hanyalah termIDs dari dictionary setiap index.
+        Karena setiap intermediate index berisi docIDs yang saling lepas dan
+        naik sesuai urutan indices, postings list gabungan cukup disusun
+        dengan urutan indices tersebut. Jika merged_index memakai block,
+        block-block penuh dari intermediate index disalin apa adanya tanpa
+        decode / encode ulang (lihat PostingsStream), sehingga memori yang
+        dipakai per term terbatas oleh block_size, bukan document frequency.
+        Region posisi (jika ada) juga disalin tanpa decode, lihat
+        InvertedIndexWriter.copy_positions.
+
+        Apakah postings list gabungan disimpan sebagai RoaringBitmap (lihat
+        InvertedIndexWriter.is_dense) diputuskan sebelum menulis, dari total
+        document frequency dan docID terakhir source terakhir. Postings list
+        yang dense langsung dibangun menjadi bitmap per block / container
+        (RoaringBitmap.from_sorted_chunks), tanpa list docIDs gabungan.
+
+        Jika deleted_doc_ids (DocIdBitmap) diberikan, postings (beserta
+        posisi) dari docID yang terhapus dibuang secara fisik. Hanya block
+        yang rentang docID-nya (dari skip table) memuat docID terhapus yang
+        di-decode, block lainnya tetap disalin apa adanya.
+        """
+        deleted = deleted_doc_ids.to_list() if deleted_doc_ids else []
+        term_streams = [zip(index.terms, itertools.repeat(index_order))
+                        for index_order, index in enumerate(indices)]
+        for term, group in itertools.groupby(heapq.merge(*term_streams), key=operator.itemgetter(0)):
+            sources = [indices[index_order] for _, index_order in group]
+            total_count = sum(index.postings_dict[term][1] for index in sources)
+            # rank dokumen terhapus di setiap source, untuk copy_positions
+            dropped_ranks = [set() for _ in sources]
+
+            if merged_index.block_size is None or total_count <= merged_index.block_size:
+                postings_list, tf_list = [], []
+                for index, dropped in zip(sources, dropped_ranks):
+                    postings, tfs = self.drop_deleted(*index.get_postings_and_tf(term), deleted_doc_ids, dropped)
+                    postings_list.extend(postings)
+                    tf_list.extend(tfs)
+                if len(postings_list) > 0:
+                    merged_index.append(term, postings_list, tf_list)
+            elif merged_index.is_dense(total_count, sources[-1].last_doc_id(term)):
+                tf_list = []
+                bitmap = RoaringBitmap.from_sorted_chunks(self.iter_kept_postings(term, sources, deleted_doc_ids,
+                                                                                  dropped_ranks, tf_list))
+                if len(tf_list) > 0:
+                    merged_index.append_bitmap(term, bitmap, tf_list)
+            else:
+                with merged_index.postings_stream(term) as stream:
+                    for index, dropped in zip(sources, dropped_ranks):
+                        if not index.is_blocked(term):
+                            stream.extend(*self.drop_deleted(*index.get_postings_and_tf(term), deleted_doc_ids, dropped))
+                            continue
+                        rank, previous_last = 0, -1
+                        for block in index.iter_blocks(term):
+                            encoded_block, encoded_tf_block, last_doc_id, count = block[:4]
+                            first_deleted = bisect.bisect_right(deleted, previous_last)
+                            if first_deleted < len(deleted) and deleted[first_deleted] <= last_doc_id:
+                                stream.extend(*self.drop_deleted(index.postings_encoding.decode(encoded_block),
+                                                                 index.decode_tf(encoded_tf_block, count),
+                                                                 deleted_doc_ids, dropped, rank))
+                            else:
+                                stream.add_block(*block)
+                            rank += count
+                            previous_last = last_doc_id
+
+            if merged_index.with_positions and term in merged_index.postings_dict:
+                merged_index.copy_positions(term, sources, dropped_ranks)
+
+    def iter_kept_postings(self, term, sources, deleted_doc_ids, dropped_ranks, tf_list):
+        """
+        Generator docIDs postings list term di sources (sesuai urutan) per
+        potongan (lihat InvertedIndexReader.iter_postings), tanpa docID di
+        deleted_doc_ids. tf docID yang disimpan ditambahkan ke tf_list.
         """
-        pre_value = -1
-        accumulated = []
-        for value in heapq.merge(*indices):
-            if(value[0] != pre_value):
-                if pre_value != -1: merged_index.append(pre_value, accumulated)
-                accumulated = []
-                pre_value = value[0]
-            accumulated.extend(value[1])
-        if pre_value != "":
-            merged_index.append(pre_value, accumulated)
+        for index, dropped in zip(sources, dropped_ranks):
+            rank = 0
+            for doc_ids, tfs in index.iter_postings(term):
+                count = len(doc_ids)
+                doc_ids, tfs = self.drop_deleted(doc_ids, tfs, deleted_doc_ids, dropped, rank)
+                rank += count
+                tf_list.extend(tfs)
+                yield doc_ids
+
+    @staticmethod
+    def drop_deleted(doc_ids, tf_list, deleted_doc_ids, dropped, rank=0):
+        """
+        (docIDs, tf) tanpa docID di deleted_doc_ids. Rank docID yang dibuang
+        (urutan di postings list source, dengan doc_ids dimulai dari rank)
+        ditambahkan ke dropped.
+        """
+        if not deleted_doc_ids:
+            return doc_ids, tf_list
+        kept_doc_ids, kept_tf_list = [], []
+        for i, (doc_id, tf) in enumerate(zip(doc_ids, tf_list)):
+            if doc_id in deleted_doc_ids:
+                dropped.add(rank + i)
+            else:
+                kept_doc_ids.append(doc_id)
+                kept_tf_list.append(tf)
+        return kept_doc_ids, kept_tf_list
 
     def retrieve(self, query):
         """
@@ -189,6 +636,12 @@ class BSBIIndex:
             contoh: Query "universitas indonesia depok" artinya adalah
                     boolean query "universitas AND indonesia AND depok"
 
+            Query yang memakai operator AND / OR / NOT atau kurung
+            dievaluasi dengan retrieve_boolean jika sesuai grammar-nya
+            (lihat query.is_boolean_query); jika tidak, misalnya
+            "jantung (sehat", query tetap diperlakukan sebagai AND implisit
+            dari kata-katanya.
+
         Result
         ------
         List[str]
@@ -197,35 +650,518 @@ class BSBIIndex:
 
         JANGAN LEMPAR ERROR/EXCEPTION untuk terms yang TIDAK ADA di collection.
         """
+        if is_boolean_query(query):
+            return self.retrieve_boolean(query)
         tokenized_query = Cleaner.clean_and_tokenize(query)
-        lists_of_query_postings = []
-
-        with InvertedIndexReader(self.index_name, self.postings_encoding, self.output_dir) as merged_index:
-            for token in tokenized_query:
-                if token not in self.term_id_map: continue
-                current_postings = merged_index.get_postings_list(self.term_id_map[token])
-                lists_of_query_postings.append(current_postings)
-        # print(lists_of_query_postings)
-        # for i in lists_of_query_postings:
-        #     for j in i:
-        #         print(self.doc_id_map[j], end=" ")
-        #     print()
-        #     print()
-        len_postings = len(lists_of_query_postings)
-        if len_postings == 0: return []
-        lists_of_query_postings.sort(key=len)
-
-        result = lists_of_query_postings[0]
-        for i in range(1, len_postings):
-            # print(result, lists_of_query_postings[i])
-            result = sorted_intersect(result, lists_of_query_postings[i])
-            # for tmp in result: print(tmp, self.doc_id_map[tmp])
-            # print()
+        return self.cached_result(('and', frozenset(tokenized_query)),
+                                  lambda: self.retrieve_conjunction(tokenized_query))
+
+    def retrieve_boolean(self, query):
+        """
+        Boolean retrieval dengan operator AND, OR, NOT (huruf besar) dan
+        kurung, misalnya "jantung (olahraga OR lari) NOT rokok"; kata yang
+        berurutan tanpa operator di-AND-kan (lihat query.parse_query). Setiap
+        kata di-preprocess sama seperti indexing; kata yang terbuang
+        (stopword) diabaikan, sedangkan term yang tidak ada di collection
+        tidak cocok dengan dokumen apa pun.
+
+        Query dievaluasi dengan rencana berbasis document frequency (lihat
+        query.QueryEvaluator): operand AND dari yang terkecil, NOT sebagai
+        selisih himpunan, dan evaluasi berhenti begitu hasil sementara
+        kosong, sebelum postings list lain dibaca.
+
+        Returns
+        -------
+        List[str]
+            Daftar dokumen terurut berdasarkan docID
+
+        Raises
+        ------
+        ValueError jika query tidak sesuai grammar
+        """
+        node = normalize(analyze(parse_query(query), self.analyze_word))
+        if node is None:
+            return []
+        return self.cached_result(('boolean', node), lambda: self.evaluate_boolean(node))
+
+    def analyze_word(self, word):
+        """termIDs (None untuk term yang tidak ada di collection) dari sebuah kata query boolean"""
+        return [self.term_id_map[token] if token in self.term_id_map else None
+                for token in Cleaner.clean_and_tokenize(word)]
+
+    def evaluate_boolean(self, node):
+        """Nama dokumen (terurut berdasarkan docID) hasil query boolean node (lihat retrieve_boolean)"""
+        # docID 0 dipakai sebagai placeholder jika doc_id_map one-indexed
+        first_doc_id = 1 if issubclass(self.postings_encoding, EliasGammaPostings) else 0
+        with self.main_index_reader() as merged_index:
+            result = QueryEvaluator(merged_index, range(first_doc_id, len(self.doc_id_map))).evaluate(node)
+        return [self.doc_id_map[doc_id] for doc_id in self.remove_deleted_doc_ids(result)]
+
+    def retrieve_conjunction(self, tokenized_query):
+        """
+        Nama dokumen (terurut berdasarkan docID) yang mengandung semua query
+        tokens. Term yang dense (postings list-nya disimpan sebagai
+        RoaringBitmap) di-AND-kan dahulu per word; hasilnya dipakai untuk
+        menyaring postings list terpendek dari term lainnya dengan test bit,
+        lalu sisa kandidat dicek di semua term lain sekaligus (lihat
+        index.intersect_cursors).
+        """
+        with self.main_index_reader() as merged_index:
+            term_ids = self.query_term_ids(tokenized_query, merged_index)
+            if len(term_ids) == 0: return []
+            # Urutkan berdasarkan document frequency dari dictionary: hanya postings
+            # list terpendek yang di-decode penuh, term lain dicek lewat skip table
+            term_ids = sorted(term_ids, key=merged_index.document_frequency)
+            bitmap = None
+            sparse_term_ids = []
+            for term_id in term_ids:
+                term_bitmap = merged_index.get_postings_bitmap(term_id)
+                if term_bitmap is None:
+                    sparse_term_ids.append(term_id)
+                else:
+                    bitmap = term_bitmap if bitmap is None else bitmap & term_bitmap
+
+            if len(sparse_term_ids) == 0:
+                result = self.remove_deleted_doc_ids(bitmap.to_list())
+            else:
+                result = self.remove_deleted_doc_ids(merged_index.get_postings_list(sparse_term_ids[0]))
+                if bitmap is not None:
+                    result = bitmap.intersect_sorted(result)
+                # semua cursor term lain dicek sekaligus untuk setiap kandidat
+                result = intersect_cursors(result, [merged_index.get_postings_cursor(term_id)
+                                                    for term_id in sparse_term_ids[1:]])
 
         return [self.doc_id_map[doc_id] for doc_id in result]
 
+    def retrieve_many(self, queries):
+        """
+        Boolean retrieval seperti retrieve(...) untuk banyak query sekaligus.
+        Semua query di-clean terlebih dahulu, lalu termIDs dari semua query
+        digabung tanpa duplikat dan postings list-nya dibaca sekali, terurut
+        berdasarkan posisinya di index file (lihat
+        InvertedIndexReader.get_postings_lists). Setiap query kemudian
+        dievaluasi terhadap postings list bersama tersebut, sehingga term yang
+        muncul di banyak query hanya dibaca dan di-decode sekali. Query yang
+        sama (setelah dinormalisasi) hanya dievaluasi sekali.
+
+        Parameters
+        ----------
+        queries: List[str]
+            Query-query dengan format yang sama seperti retrieve(...)
+
+        Returns
+        -------
+        List[List[str]]
+            Hasil retrieve(...) untuk setiap query, sesuai urutan queries
+        """
+        if any(is_boolean_query(query) for query in queries):
+            # query boolean dievaluasi satu per satu, sisanya tetap di-batch
+            plain_results = iter(self.retrieve_many([query for query in queries if not is_boolean_query(query)]))
+            return [self.retrieve_boolean(query) if is_boolean_query(query) else next(plain_results)
+                    for query in queries]
+        keys = [('and', frozenset(Cleaner.clean_and_tokenize(query))) for query in queries]
+        generation = self.generation
+        results = {}
+        if self.result_cache is not None:
+            for key in keys:
+                result = self.result_cache.get((generation,) + key)
+                if result is not None:
+                    results[key] = result
+
+        pending = [key for key in dict.fromkeys(keys) if key not in results]
+        if len(pending) > 0:
+            with self.main_index_reader() as merged_index:
+                query_term_ids = {key: self.query_term_ids(key[1], merged_index) for key in pending}
+                all_term_ids = set().union(*query_term_ids.values())
+                # term yang dense dicek lewat bitmap-nya (lihat retrieve_conjunction),
+                # sehingga postings list-nya tidak perlu di-decode
+                bitmaps = {term_id: merged_index.get_postings_bitmap(term_id) for term_id in all_term_ids}
+                bitmaps = {term_id: bitmap for term_id, bitmap in bitmaps.items() if bitmap is not None}
+                postings_lists = merged_index.get_postings_lists(all_term_ids.difference(bitmaps))
+
+            # postings list term-term lain di sebuah query di-intersect sekaligus
+            # (util.intersect_many), lalu disaring dengan AND bitmap term dense
+            for key in pending:
+                term_ids = query_term_ids[key]
+                result = []
+                if len(term_ids) > 0:
+                    bitmap = None
+                    for term_id in term_ids:
+                        if term_id in bitmaps:
+                            bitmap = bitmaps[term_id] if bitmap is None else bitmap & bitmaps[term_id]
+                    sparse_lists = [postings_lists[term_id] for term_id in term_ids if term_id not in bitmaps]
+                    if len(sparse_lists) == 0:
+                        result = bitmap.to_list()
+                    else:
+                        result = intersect_many(sparse_lists)
+                        if bitmap is not None:
+                            result = bitmap.intersect_sorted(result)
+                    result = self.remove_deleted_doc_ids(result)
+                results[key] = [self.doc_id_map[doc_id] for doc_id in result]
+                if self.result_cache is not None:
+                    self.result_cache.put((generation,) + key, results[key])
+
+        return [list(results[key]) for key in keys]
+
+    def retrieve_phrase(self, query):
+        """
+        Phrase query: dokumen yang mengandung token-token query (setelah
+        pre-processing yang sama dengan indexing, termasuk stopword removal)
+        secara berurutan dan bersebelahan. Membutuhkan index dengan
+        with_positions.
+
+        Returns
+        -------
+        List[str]
+            Daftar dokumen terurut berdasarkan docID, [] jika tidak ada yang match
+        """
+        tokenized_query = Cleaner.clean_and_tokenize(query)
+        return self.cached_result(('phrase', tuple(tokenized_query)), lambda: self.retrieve_positional(
+            tokenized_query, lambda term_ids, positions: phrase_match([positions[term_id] for term_id in term_ids])))
+
+    def retrieve_proximity(self, query, window):
+        """
+        Proximity query: dokumen yang mengandung semua token query di dalam
+        jendela window token, yaitu posisi kemunculan pertama dan terakhir dari
+        token-token tersebut berselisih paling banyak window (urutan bebas).
+        Membutuhkan index dengan with_positions.
+
+        Returns
+        -------
+        List[str]
+            Daftar dokumen terurut berdasarkan docID, [] jika tidak ada yang match
+        """
+        tokenized_query = Cleaner.clean_and_tokenize(query)
+        return self.cached_result(('proximity', frozenset(tokenized_query), window), lambda: self.retrieve_positional(
+            tokenized_query, lambda term_ids, positions: minimum_window(list(positions.values())) <= window))
+
+    def retrieve_positional(self, tokenized_query, match):
+        """
+        Boolean AND seperti retrieve(...), lalu untuk setiap docID hasil
+        intersection saja, posisi setiap term di dokumen tersebut dibaca dari
+        file posisi dan dokumen dipertahankan jika
+        match(termIDs query, termID -> list posisi) bernilai True.
+        """
+        if len(tokenized_query) == 0: return []
+        if any(token not in self.term_id_map for token in tokenized_query): return []
+        term_ids = [self.term_id_map[token] for token in tokenized_query]
+
+        with self.main_index_reader() as merged_index:
+            if not merged_index.with_positions:
+                raise ValueError(f"index {self.index_name} tidak menyimpan posisi, lakukan indexing dengan with_positions")
+            if any(merged_index.document_frequency(term_id) == 0 for term_id in term_ids): return []
+            unique_term_ids = sorted(set(term_ids), key=merged_index.document_frequency)
+
+            result = self.remove_deleted_doc_ids(merged_index.get_postings_list(unique_term_ids[0]))
+            for term_id in unique_term_ids[1:]:
+                if len(result) == 0: break
+                result = merged_index.get_postings_cursor(term_id).intersect(result)
+
+            cursors = {term_id: merged_index.get_postings_cursor(term_id) for term_id in unique_term_ids}
+            matches = []
+            for doc_id in result:
+                positions = {}
+                for term_id, cursor in cursors.items():
+                    cursor.advance(doc_id)
+                    positions[term_id] = merged_index.get_positions(term_id, cursor.rank())
+                if match(term_ids, positions):
+                    matches.append(doc_id)
+
+        return [self.doc_id_map[doc_id] for doc_id in matches]
+
+    def query_term_ids(self, tokenized_query, merged_index):
+        """termIDs unik dari query tokens yang ada di index; token lain diabaikan"""
+        return {self.term_id_map[token] for token in tokenized_query
+                if token in self.term_id_map and merged_index.document_frequency(self.term_id_map[token]) > 0}
+
+    def retrieve_term_at_a_time(self, tokenized_query, k, term_weight, tf_weight):
+        """
+        Ranked retrieval term-at-a-time: postings list (beserta tf) setiap
+        term di tokenized_query dibaca satu per satu, dan skor
+
+            score(D) = sum_t term_weight(df(t)) * tf_weight(tf(t, D), docID)
+
+        diakumulasi di dictionary docID -> skor. Hanya top-k yang diambil
+        dengan heap (heapq.nlargest), tanpa sorting semua dokumen yang match.
+
+        Returns
+        -------
+        List[Tuple[float, str]]
+            Paling banyak k pasangan (skor, nama dokumen), terurut menurun
+            berdasarkan skor.
+        """
+        scores = {}
+        with self.main_index_reader() as merged_index:
+            for term_id in self.query_term_ids(tokenized_query, merged_index):
+                df = self.document_frequency(term_id, merged_index)
+                if df == 0:
+                    continue
+                weight = term_weight(df)
+                postings_list, tf_list = merged_index.get_postings_and_tf(term_id)
+                for doc_id, tf in zip(postings_list, tf_list):
+                    scores[doc_id] = scores.get(doc_id, 0) + weight * tf_weight(tf, doc_id)
+        scores = self.remove_deleted(scores)
+        top_k = heapq.nlargest(k, scores.items(), key=operator.itemgetter(1))
+        return [(score, self.doc_id_map[doc_id]) for doc_id, score in top_k]
+
+    def document_frequency(self, term_id, merged_index):
+        """
+        df sebuah term tanpa postings dokumen yang sudah dihapus tetapi belum
+        dibuang secara fisik oleh merge, sehingga df <= n_docs dan
+        log(N / df) tidak pernah negatif. Postings yang terhapus dihitung
+        dengan intersection list docID terhapus (di-cache oleh
+        DocIdBitmap.to_list) terhadap cursor term tersebut: bitmap cukup
+        test bit, dan hanya block yang mungkin berisi docID terhapus yang
+        di-decode.
+        """
+        df = merged_index.document_frequency(term_id)
+        if len(self.deleted_doc_ids) > 0 and df > 0:
+            df -= len(merged_index.get_postings_cursor(term_id).intersect(self.deleted_doc_ids.to_list()))
+        return df
+
+    def remove_deleted_doc_ids(self, doc_ids):
+        """
+        doc_ids tanpa docID yang sudah dihapus. Dipakai pada postings list
+        terpendek sebelum intersection, sehingga docID terhapus tidak pernah
+        dicari di postings list lain.
+        """
+        deleted_doc_ids = self.deleted_doc_ids
+        if len(deleted_doc_ids) == 0:
+            return doc_ids
+        return [doc_id for doc_id in doc_ids if doc_id not in deleted_doc_ids]
+
+    def remove_deleted(self, scores):
+        """scores (docID -> skor) tanpa docID yang sudah dihapus"""
+        deleted_doc_ids = self.deleted_doc_ids
+        if len(deleted_doc_ids) == 0:
+            return scores
+        return {doc_id: score for doc_id, score in scores.items() if doc_id not in deleted_doc_ids}
+
+    def retrieve_tfidf(self, query, k=10):
+        """
+        Ranked retrieval dengan skema TF-IDF:
+
+            w(t, D) = (1 + log tf(t, D)) * log(N / df(t))
+
+        Lakukan pre-processing yang sama dengan indexing. Term yang tidak ada
+        di collection diabaikan.
+
+        Returns
+        -------
+        List[Tuple[float, str]]
+            Top-k pasangan (skor, nama dokumen), terurut menurun berdasarkan skor
+        """
+        tokenized_query = Cleaner.clean_and_tokenize(query)
+
+        # statistik collection dibaca setelah generation (lihat cached_result)
+        def compute():
+            n_docs = self.n_docs
+            if n_docs == 0:
+                return []
+            return self.retrieve_term_at_a_time(tokenized_query, k,
+                                                lambda df: math.log(n_docs / df),
+                                                lambda tf, doc_id: 1 + math.log(tf))
+
+        return self.cached_result(('tfidf', frozenset(tokenized_query), k), compute)
+
+    def retrieve_bm25(self, query, k=10, k1=BM25_K1, b=BM25_B):
+        """
+        Ranked retrieval dengan skema BM25 (Okapi):
+
+            w(t, D) = log(N / df(t)) * (k1 + 1) tf(t, D) /
+                      (k1 ((1 - b) + b dl(D) / avdl) + tf(t, D))
+
+        dengan dl(D) panjang dokumen dan avdl rata-rata panjang dokumen.
+
+        Returns
+        -------
+        List[Tuple[float, str]]
+            Top-k pasangan (skor, nama dokumen), terurut menurun berdasarkan skor
+        """
+        tokenized_query = Cleaner.clean_and_tokenize(query)
+
+        def compute():
+            n_docs, avg_doc_length, doc_length = self.n_docs, self.avg_doc_length, self.doc_length
+            if n_docs == 0:
+                return []
+            return self.retrieve_term_at_a_time(
+                tokenized_query, k,
+                lambda df: math.log(n_docs / df),
+                lambda tf, doc_id: (k1 + 1) * tf / (k1 * ((1 - b) + b * doc_length[doc_id] / avg_doc_length) + tf))
+
+        return self.cached_result(('bm25', frozenset(tokenized_query), k, k1, b), compute)
 
-    def index(self):
+    def retrieve_maxscore(self, query, k=10, k1=BM25_K1, b=BM25_B):
+        """
+        Ranked retrieval BM25 (OR query, hasil sama dengan retrieve_bm25)
+        dengan dynamic pruning berdasarkan upper bound skor, agar tidak semua
+        dokumen di semua postings list di-score.
+
+        Upper bound sebuah term adalah bobot BM25 dari (max_tf, min_dl) terbaik
+        di antara block-block-nya; upper bound sebuah block dihitung dari
+        (max_tf, min_dl) block tersebut di skip table. Term diproses dari
+        upper bound terbesar (biasanya term yang paling jarang), dan threshold
+        adalah skor (parsial) terbesar ke-k sejauh ini:
+        1. Selama threshold <= jumlah upper bound term-term yang tersisa,
+           dokumen baru masih mungkin masuk top-k, sehingga postings list
+           di-score penuh seperti retrieve_term_at_a_time.
+        2. Setelah itu, hanya dokumen yang sudah punya skor dan skornya +
+           upper bound term tersisa >= threshold yang dicek ke postings list
+           term berikutnya lewat PostingsCursor. Dokumen yang skornya + upper
+           bound block tempat ia mungkin berada tidak bisa melewati threshold
+           dilompati tanpa decode block tersebut, sehingga block yang tidak
+           berisi kandidat tidak pernah di-decode.
+
+        Returns
+        -------
+        List[Tuple[float, str]]
+            Top-k pasangan (skor, nama dokumen), terurut menurun berdasarkan skor
+        """
+        if k <= 0: return []
+        tokenized_query = Cleaner.clean_and_tokenize(query)
+        return self.cached_result(('maxscore', frozenset(tokenized_query), k, k1, b),
+                                  lambda: self.maxscore_top_k(tokenized_query, k, k1, b))
+
+    def maxscore_top_k(self, tokenized_query, k, k1, b):
+        """Top-k BM25 untuk tokenized_query dengan dynamic pruning, lihat retrieve_maxscore"""
+        n_docs, avg_doc_length, doc_length = self.n_docs, self.avg_doc_length, self.doc_length
+        if n_docs == 0:
+            return []
+
+        def tf_weight(tf, dl):
+            return (k1 + 1) * tf / (k1 * ((1 - b) + b * dl / avg_doc_length) + tf)
+
+        scores = {}
+        with self.main_index_reader() as merged_index:
+            # (upper bound, idf, termID, cursor)
+            terms = []
+            for term_id in self.query_term_ids(tokenized_query, merged_index):
+                df = self.document_frequency(term_id, merged_index)
+                if df == 0:
+                    continue
+                cursor = merged_index.get_postings_cursor(term_id)
+                idf = math.log(n_docs / df)
+                upper_bound = idf * max(tf_weight(max_tf, min_dl) for max_tf, min_dl in zip(cursor.max_tfs, cursor.min_dls))
+                terms.append((upper_bound, idf, term_id, cursor))
+            terms.sort(key=operator.itemgetter(0), reverse=True)
+
+            remaining_bound = sum(term[0] for term in terms)
+            threshold = -math.inf
+            for upper_bound, idf, term_id, cursor in terms:
+                remaining_bound -= upper_bound
+                if threshold <= upper_bound + remaining_bound:
+                    postings_list, tf_list = merged_index.get_postings_and_tf(term_id)
+                    for doc_id, tf in zip(postings_list, tf_list):
+                        scores[doc_id] = scores.get(doc_id, 0) + idf * tf_weight(tf, doc_length[doc_id])
+                    scores = self.remove_deleted(scores)
+                else:
+                    minimum = threshold - upper_bound - remaining_bound
+                    scores = {doc_id: score for doc_id, score in scores.items() if score >= minimum}
+                    for doc_id in sorted(scores):
+                        bounds = cursor.block_bounds(doc_id)
+                        if bounds is None: break
+                        _, max_tf, min_dl = bounds
+                        if scores[doc_id] + idf * tf_weight(max_tf, min_dl) + remaining_bound < threshold: continue
+                        if cursor.advance(doc_id) == doc_id:
+                            scores[doc_id] += idf * tf_weight(cursor.tf(), doc_length[doc_id])
+                if len(scores) >= k:
+                    threshold = heapq.nlargest(k, scores.values())[-1]
+
+        top_k = heapq.nlargest(k, scores.items(), key=operator.itemgetter(1))
+        return [(score, self.doc_id_map[doc_id]) for doc_id, score in top_k]
+
+    def iter_documents(self):
+        """
+        Generator path semua file di bawah data_dir (rekursif, relatif terhadap
+        data_dir) yang termasuk shard index ini, terurut berdasarkan directory
+        lalu nama file.
+        """
+        for dir_path, dir_names, file_names in os.walk(self.data_dir):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                doc_path_relative = os.path.relpath(os.path.join(dir_path, file_name), self.data_dir)
+                if self.in_shard(doc_path_relative):
+                    yield doc_path_relative
+
+    def write_run(self, buckets):
+        """
+        Menulis buckets (termID -> (array of docIDs terurut, array of tf[,
+        array of posisi semua docID berurutan])) sebagai sebuah intermediate
+        index baru.
+        """
+        index_id = 'intermediate_index_run_' + str(len(self.intermediate_indices))
+        self.intermediate_indices.append(index_id)
+        with InvertedIndexWriter(index_id, self.postings_encoding, directory = self.output_dir,
+                                 block_size = self.block_size, with_tf = True,
+                                 doc_length = self.doc_length, with_positions = self.with_positions) as index:
+            for term_id in sorted(buckets):
+                if not self.with_positions:
+                    index.append(term_id, *buckets[term_id])
+                    continue
+                doc_ids, tf_list, positions = buckets[term_id]
+                positions_list = [positions[end - tf:end] for tf, end in zip(tf_list, itertools.accumulate(tf_list))]
+                index.append(term_id, doc_ids, tf_list, positions_list)
+
+    def index_spimi(self, memory_budget=SPIMI_MEMORY_BUDGET):
+        """
+        Indexing dengan skema SPIMI (single-pass in-memory indexing) dengan
+        batas memori, tidak bergantung pada struktur folder collection.
+
+        Semua dokumen di bawah data_dir (rekursif, lihat iter_documents)
+        diproses satu per satu; docIDs berasal dari path dokumen relatif
+        terhadap data_dir. docID dari setiap dokumen langsung ditambahkan ke
+        bucket (array uint32) milik setiap term di dokumen tersebut. Karena
+        docIDs di-assign naik, bucket selalu terurut tanpa perlu sorting atau
+        td_pairs. Term frequency disimpan di array kedua yang sejajar, dan
+        jika self.with_positions, posisi-posisi term di setiap dokumen
+        disambung di array ketiga. Ketika perkiraan memori buckets mencapai
+        memory_budget, buckets ditulis sebagai sebuah run (intermediate index)
+        lalu dikosongkan. Setelah semua dokumen selesai, semua run di-merge.
+
+        Parameters
+        ----------
+        memory_budget: int
+            Batas (perkiraan) memori dalam bytes untuk buckets postings
+        """
+        self.keyed_by_path = True
+        buckets = {}
+        memory_used = 0
+        for doc_path_relative in tqdm(self.iter_documents()):
+            doc_id = self.doc_id_map[doc_path_relative]
+            with open(os.path.join(self.data_dir, doc_path_relative), "r") as f:
+                tokenized_words = Cleaner.clean_and_tokenize(f.read())
+            self.set_doc_length(doc_id, len(tokenized_words))
+            term_frequencies = collections.Counter(self.term_id_map[token] for token in tokenized_words)
+            if self.with_positions:
+                term_positions = {}
+                for position, token in enumerate(tokenized_words, 1):
+                    term_positions.setdefault(self.term_id_map[token], []).append(position)
+            for term_id, tf in term_frequencies.items():
+                bucket = buckets.get(term_id)
+                if bucket is None:
+                    if self.with_positions:
+                        bucket = buckets[term_id] = (array.array('I'), array.array('I'), array.array('I'))
+                        memory_used += SPIMI_BUCKET_OVERHEAD + sys.getsizeof(bucket[2])
+                    else:
+                        bucket = buckets[term_id] = (array.array('I'), array.array('I'))
+                        memory_used += SPIMI_BUCKET_OVERHEAD
+                bucket[0].append(doc_id)
+                bucket[1].append(tf)
+                memory_used += 2 * bucket[0].itemsize
+                if self.with_positions:
+                    bucket[2].extend(term_positions[term_id])
+                    memory_used += tf * bucket[2].itemsize
+            # run hanya di-flush di antara dokumen
+            if memory_used >= memory_budget:
+                self.write_run(buckets)
+                buckets = {}
+                memory_used = 0
+        if len(buckets) > 0:
+            self.write_run(buckets)
+        self.save()
+        self.merge_intermediate_indices()
+
+    def index(self, processes=1, memory_budget=None):
         """
         Base indexing code
         BAGIAN UTAMA untuk melakukan Indexing dengan skema BSBI (blocked-sort
@@ -234,22 +1170,422 @@ class BSBIIndex:
         Method ini scan terhadap semua data di collection, memanggil parse_block
         untuk parsing dokumen dan memanggil invert_write yang melakukan inversion
         di setiap block dan menyimpannya ke index yang baru.
+
+        Parameters
+        ----------
+        processes: int
+            Banyaknya worker process untuk parsing + inversion block. Jika
+            lebih dari 1, block-block diproses paralel dengan index_parallel.
+            termIDs dan docIDs yang dihasilkan tetap sama persis dengan
+            indexing serial.
+        memory_budget: int
+            Jika tidak None, indexing dilakukan dengan index_spimi dengan batas
+            memori memory_budget bytes (processes diabaikan).
+
+        Setelah indexing, main index menjadi satu-satunya segment (lihat
+        update untuk incremental indexing).
         """
+        # stem cache dari indexing sebelumnya (jika ada) membuat cleaning lebih cepat
+        Cleaner.load_stem_cache(os.path.join(self.output_dir, 'stems.dict'))
+        self.keyed_by_path = False
+        self.deleted_doc_ids = DocIdBitmap()
+        if memory_budget is not None:
+            self.index_spimi(memory_budget)
+            return
+        if processes is None or processes > 1:
+            self.index_parallel(processes)
+            return
+
         # loop untuk setiap sub-directory di dalam folder collection (setiap block)
         for block_dir_relative in tqdm(sorted(next(os.walk(self.data_dir))[1])):
             # print(block_dir_relative)
             td_pairs = self.parse_block(block_dir_relative)
             index_id = 'intermediate_index_'+block_dir_relative
             self.intermediate_indices.append(index_id)
-            with InvertedIndexWriter(index_id, self.postings_encoding, directory = self.output_dir) as index:
+            with InvertedIndexWriter(index_id, self.postings_encoding, directory = self.output_dir,
+                                     block_size = self.block_size, with_tf = True,
+                                     doc_length = self.doc_length, with_positions = self.with_positions) as index:
                 self.invert_write(td_pairs, index)
         self.save()
+        self.merge_intermediate_indices()
 
-        with InvertedIndexWriter(self.index_name, self.postings_encoding, directory = self.output_dir) as merged_index:
+    def merge_intermediate_indices(self):
+        """
+        Merge semua self.intermediate_indices menjadi self.index_name, yang
+        menjadi satu-satunya segment. Segment-segment lama (hasil update)
+        dihapus.
+        """
+        # searcher yang terbuka menunjuk ke main index lama
+        self.close_searcher()
+        self.merge_indices(self.intermediate_indices, self.index_name)
+        with self.segments_lock:
+            obsolete_segments = []
+            manifest_path = os.path.join(self.output_dir, 'segments.json')
+            if os.path.exists(manifest_path):
+                with open(manifest_path) as f:
+                    obsolete_segments = [segment for segment in json.load(f)['segments'] if segment != self.index_name]
+            self.segments = [self.index_name]
+            self.documents = self.scan_documents()
+            self.save_manifest()
+            self.invalidate_results()
+        self.remove_segment_files(obsolete_segments)
+
+    def merge_indices(self, index_ids, index_name, deleted_doc_ids=None):
+        """
+        Merge index-index index_ids (docIDs saling lepas dan naik sesuai
+        urutan index_ids) menjadi index baru index_name, tanpa postings
+        docID di deleted_doc_ids (lihat merge)
+        """
+        with InvertedIndexWriter(index_name, self.postings_encoding, directory = self.output_dir,
+                                 block_size = self.block_size, with_tf = True,
+                                 doc_length = self.doc_length, with_positions = self.with_positions) as merged_index:
             with contextlib.ExitStack() as stack:
                 indices = [stack.enter_context(InvertedIndexReader(index_id, self.postings_encoding, directory=self.output_dir))
-                           for index_id in self.intermediate_indices]
-                self.merge(indices, merged_index)
+                           for index_id in index_ids]
+                self.merge(indices, merged_index, deleted_doc_ids)
+
+    def scan_documents(self):
+        """
+        Signature [mtime_ns, size] setiap dokumen di collection, path relatif
+        terhadap data_dir -> signature. Dokumen yang di-scan sama dengan yang
+        di-index: file di setiap sub-directory data_dir, atau semua file di
+        bawah data_dir (rekursif) untuk indexing SPIMI.
+        """
+        if self.keyed_by_path:
+            doc_paths = self.iter_documents()
+        else:
+            doc_paths = (os.path.join(block_dir_relative, doc_file_name)
+                         for block_dir_relative in sorted(next(os.walk(self.data_dir))[1])
+                         for doc_file_name in sorted(self.block_documents(block_dir_relative)))
+        return self.scan_signatures(doc_paths)
+
+    def doc_key(self, doc_path_relative):
+        """Key doc_id_map untuk sebuah dokumen (nama file, atau path relatif untuk SPIMI)"""
+        return doc_path_relative if self.keyed_by_path else os.path.basename(doc_path_relative)
+
+    def delete_documents(self, doc_paths):
+        """
+        Menghapus dokumen-dokumen (path relatif terhadap data_dir, atau nama
+        file) dari index tanpa indexing ulang: docID-nya ditandai di bitmap
+        deleted_doc_ids (tombstone), yang langsung berlaku untuk retrieval
+        dan disimpan per byte ke docs.deleted, sehingga biayanya sebanding
+        dengan banyaknya dokumen yang dihapus, bukan ukuran collection.
+        Postings-nya baru dibuang secara fisik ketika segment-nya di-merge
+        (lihat merge_segments).
+
+        Dokumen yang file-nya masih ada tetap terhapus sampai file tersebut
+        berubah dan di-index ulang (update / update_documents).
+
+        Returns
+        -------
+        int
+            Banyaknya dokumen yang baru dihapus
+        """
+        with self.update_lock:
+            doc_ids = [self.doc_id_map[self.doc_key(path)] for path in doc_paths if self.doc_key(path) in self.doc_id_map]
+            return self.mark_deleted(doc_ids)
+
+    def mark_deleted(self, doc_ids):
+        """Menandai doc_ids di deleted_doc_ids (beserta docs.deleted dan statistik collection)"""
+        deleted_path = os.path.join(self.output_dir, 'docs.deleted')
+        n_deleted = 0
+        for doc_id in doc_ids:
+            if self.deleted_doc_ids.add(doc_id):
+                self.deleted_doc_ids.save_bit(deleted_path, doc_id)
+                self.total_doc_length -= self.doc_length[doc_id]
+                n_deleted += 1
+        self.n_docs -= n_deleted
+        self.avg_doc_length = self.total_doc_length / self.n_docs if self.n_docs > 0 else 0
+        if n_deleted > 0:
+            self.invalidate_results()
+        return n_deleted
+
+    def update_documents(self, doc_paths, background_merge=True):
+        """
+        Mengganti dokumen-dokumen doc_paths (path relatif terhadap data_dir)
+        dengan isi file-nya saat ini, atau menambahkannya jika belum ada di
+        index: dokumen-dokumen tersebut di-index ke sebuah segment baru
+        (lihat add_segment) dan versi lamanya ditandai terhapus, tanpa
+        menyentuh dokumen lain.
+
+        Returns
+        -------
+        str
+            Nama segment baru, atau None jika doc_paths kosong
+        """
+        with self.update_lock:
+            if self.documents is None:
+                raise ValueError(f"{self.output_dir} belum punya manifest segments.json, lakukan index() dulu")
+            segment = self.add_segment(sorted(set(doc_paths)))
+            documents = dict(self.documents)
+            documents.update(self.scan_signatures(doc_paths))
+            with self.segments_lock:
+                self.documents = documents
+                self.save()
+                self.save_manifest()
+        self.schedule_merge(background_merge)
+        return segment
+
+    def update(self, background_merge=True):
+        """
+        Incremental indexing: hanya dokumen yang baru atau berubah (mtime atau
+        ukurannya berbeda dengan signature di manifest) di collection yang
+        di-parse dan di-index, ke sebuah segment baru (lihat add_segment).
+        Dokumen yang sudah tidak ada di collection dihapus (lihat
+        delete_documents). Setelah itu merge_segments dijalankan untuk
+        menggabungkan segment-segment kecil.
+
+        Biaya parsing dan inversion sebanding dengan banyaknya dokumen yang
+        berubah; yang tetap dilakukan untuk seluruh collection hanyalah stat
+        setiap file dan penyimpanan ulang term_id_map / doc_id_map.
+
+        Harus dipanggil setelah index() atau load() dari index yang dibuat
+        dengan index().
+
+        Parameters
+        ----------
+        background_merge: bool
+            Jika True, merge_segments dijalankan di thread background (lihat
+            wait_for_merges), jika False dijalankan sebelum update selesai.
+
+        Returns
+        -------
+        str
+            Nama segment baru, atau None jika tidak ada dokumen baru / berubah
+        """
+        with self.update_lock:
+            if self.documents is None:
+                raise ValueError(f"{self.output_dir} belum punya manifest segments.json, lakukan index() dulu")
+            documents = self.scan_documents()
+            changed = [path for path in sorted(documents) if self.documents.get(path) != documents[path]]
+            removed = [path for path in self.documents if path not in documents]
+            if len(changed) == 0 and len(removed) == 0:
+                return None
+
+            self.mark_deleted([self.doc_id_map[self.doc_key(path)] for path in removed])
+            segment = self.add_segment(changed)
+            with self.segments_lock:
+                self.documents = documents
+                self.save()
+                self.save_manifest()
+        self.schedule_merge(background_merge)
+        return segment
+
+    def add_segment(self, doc_paths):
+        """
+        Meng-index dokumen-dokumen doc_paths (path relatif terhadap data_dir)
+        ke sebuah segment baru dengan term_id_map dan doc_id_map yang sudah
+        ada. Dokumen baru mendapat docID baru; dokumen yang sudah pernah
+        di-index juga mendapat docID baru (IdMap.renew) dan docID lamanya
+        ditandai terhapus, tepat ketika segment baru mulai berlaku. Searcher
+        yang terbuka dibuka ulang, sehingga segment baru langsung bisa dicari.
+
+        Returns
+        -------
+        str
+            Nama segment baru, atau None jika doc_paths kosong
+        """
+        if len(doc_paths) == 0:
+            return None
+        replaced_doc_ids = []
+        docs = []
+        for path in doc_paths:
+            key = self.doc_key(path)
+            if key in self.doc_id_map:
+                replaced_doc_ids.append(self.doc_id_map[key])
+                docs.append((self.doc_id_map.renew(key), path))
+            else:
+                docs.append((self.doc_id_map[key], path))
+
+        with self.segments_lock:
+            segment = self.index_name + '_segment_' + str(self.next_segment)
+            self.next_segment += 1
+        td_pairs = self.parse_documents(docs)
+        with InvertedIndexWriter(segment, self.postings_encoding, directory = self.output_dir,
+                                 block_size = self.block_size, with_tf = True,
+                                 doc_length = self.doc_length, with_positions = self.with_positions) as index:
+            self.invert_write(td_pairs, index)
+
+        # segment baru dan docID yang diganti berlaku bersamaan
+        with self.segments_lock:
+            self.mark_deleted(replaced_doc_ids)
+            self.segments.append(segment)
+            self.refresh_searcher()
+            self.invalidate_results()
+        return segment
+
+    def scan_signatures(self, doc_paths):
+        """Signature [mtime_ns, size] dokumen-dokumen doc_paths (lihat scan_documents)"""
+        documents = {}
+        for doc_path_relative in doc_paths:
+            stat = os.stat(os.path.join(self.data_dir, doc_path_relative))
+            documents[doc_path_relative] = [stat.st_mtime_ns, stat.st_size]
+        return documents
+
+    def segment_tier(self, segment):
+        """Tier sebuah segment berdasarkan ukuran index file-nya (lihat SEGMENT_MERGE_FACTOR)"""
+        size = os.path.getsize(os.path.join(self.output_dir, segment + '.index'))
+        return int(math.log(max(size, SEGMENT_MIN_SIZE) / SEGMENT_MIN_SIZE, SEGMENT_MERGE_FACTOR))
+
+    def find_merge_run(self):
+        """
+        SEGMENT_MERGE_FACTOR segment berurutan dengan tier yang sama, dicari
+        dari segment terbaru, atau None jika tidak ada. Hanya segment yang
+        berurutan yang digabung agar docIDs antar segment tetap naik.
+        """
+        tiers = [self.segment_tier(segment) for segment in self.segments]
+        for end in range(len(tiers), SEGMENT_MERGE_FACTOR - 1, -1):
+            run = tiers[end - SEGMENT_MERGE_FACTOR:end]
+            if all(tier == run[0] for tier in run):
+                return self.segments[end - SEGMENT_MERGE_FACTOR:end]
+        return None
+
+    def merge_segments(self):
+        """
+        Tiered merge policy: selama ada SEGMENT_MERGE_FACTOR segment berurutan
+        di tier yang sama, segment-segment tersebut di-merge (lihat merge)
+        menjadi satu segment baru yang menggantikan mereka di manifest, lalu
+        file-file segment lama dihapus. Segment yang baru terbentuk bisa naik
+        tier dan ikut di-merge lagi, sehingga setiap posting di-merge ulang
+        paling banyak O(log N) kali. Query tetap bisa berjalan selama merge.
+        Postings dokumen yang sudah dihapus (deleted_doc_ids) dibuang secara
+        fisik ketika segment-nya di-merge.
+        """
+        with self.merge_lock:
+            while True:
+                with self.segments_lock:
+                    run = self.find_merge_run()
+                    if run is None:
+                        return
+                    merged_segment = self.index_name + '_segment_' + str(self.next_segment)
+                    self.next_segment += 1
+                    # salinan, agar dokumen yang dihapus selama merge tidak
+                    # hanya terbuang dari sebagian postings list
+                    deleted_doc_ids = DocIdBitmap(self.deleted_doc_ids.bits)
+                self.merge_indices(run, merged_segment, deleted_doc_ids)
+                with self.segments_lock:
+                    start = self.segments.index(run[0])
+                    self.segments[start:start + len(run)] = [merged_segment]
+                    self.save_manifest()
+                    self.refresh_searcher()
+                    self.invalidate_results()
+                self.remove_segment_files(run)
+
+    def schedule_merge(self, background_merge):
+        """merge_segments di thread background (lihat start_background_merge) atau langsung"""
+        if background_merge:
+            self.start_background_merge()
+        else:
+            self.merge_segments()
+
+    def start_background_merge(self):
+        """
+        Menjalankan merge_segments di thread background, jika belum ada yang
+        berjalan. Segment yang ditambahkan ketika thread tersebut hampir
+        selesai akan di-merge paling lambat pada update berikutnya.
+        """
+        if self.merge_thread is None or not self.merge_thread.is_alive():
+            self.merge_thread = threading.Thread(target=self.merge_segments)
+            self.merge_thread.start()
+
+    def wait_for_merges(self):
+        """Menunggu merge_segments di background (jika ada) selesai"""
+        if self.merge_thread is not None:
+            self.merge_thread.join()
+
+    def remove_segment_files(self, segments):
+        """Menghapus file-file (.index, .dict, .pos) segment-segment yang sudah tidak dipakai"""
+        for segment in segments:
+            for extension in ['.index', '.dict', '.pos']:
+                # file yang tidak ada (.pos) atau masih dibuka (di Windows) dibiarkan
+                with contextlib.suppress(OSError):
+                    os.remove(os.path.join(self.output_dir, segment + extension))
+
+    def index_parallel(self, processes=None):
+        """
+        Sama seperti index(), tetapi parse_block + invert_write untuk setiap
+        block dikerjakan oleh process pool. Setiap worker menulis sendiri file
+        intermediate_index_<block>-nya.
+
+        Agar termIDs dan docIDs identik dengan indexing serial:
+        1. docIDs di-assign di awal oleh main process, dengan urutan yang sama
+           seperti parse_block (urutan block, lalu urutan file di block).
+           Setiap worker hanya menerima list (docID, path dokumen) block-nya.
+        2. Worker memakai term_id_map lokal. Setelah worker selesai, termIDs
+           lokal dipetakan ke self.term_id_map global sesuai urutan block
+           (urutan kemunculan pertama di dalam block sama dengan indexing
+           serial), lalu hanya metadata (.dict) intermediate index yang
+           ditulis ulang. Isi file .index tidak perlu disentuh karena
+           postings list-nya berisi docIDs global.
+
+        Setiap worker process memuat stems.dict sekali ketika dimulai, dan
+        stem baru yang dihitung worker dikembalikan lalu dimasukkan ke
+        Cleaner.stem_cache main process, sehingga ikut tersimpan di
+        stems.dict seperti indexing serial.
+
+        Parameters
+        ----------
+        processes: int
+            Banyaknya worker process, None artinya os.cpu_count()
+        """
+        block_dirs = sorted(next(os.walk(self.data_dir))[1])
+        block_docs = [[(self.doc_id_map[doc_file_name], os.path.join(block_dir_relative, doc_file_name))
+                       for doc_file_name in self.block_documents(block_dir_relative)]
+                      for block_dir_relative in block_dirs]
+
+        with ProcessPoolExecutor(max_workers=processes, initializer=Cleaner.load_stem_cache,
+                                 initargs=(os.path.join(self.output_dir, 'stems.dict'),)) as executor:
+            jobs = [executor.submit(_parse_invert_write_block, self.data_dir, self.output_dir,
+                                    self.postings_encoding, self.block_size, self.with_positions,
+                                    block_dir_relative, docs)
+                    for block_dir_relative, docs in zip(block_dirs, block_docs)]
+            for block_dir_relative, job in tqdm(zip(block_dirs, jobs), total=len(jobs)):
+                index_id, local_terms, doc_lengths, new_stems = job.result()
+                global_term_ids = [self.term_id_map[term] for term in local_terms]
+                for doc_id, length in doc_lengths:
+                    self.set_doc_length(doc_id, length)
+                for word, stem in new_stems:
+                    Cleaner.stem_cache.put(word, stem)
+                self.intermediate_indices.append(index_id)
+                metadata_file_path = os.path.join(self.output_dir, index_id+'.dict')
+                dictionary = TermDictionary(metadata_file_path)
+                postings_dict = {global_term_ids[local_term_id]: entry
+                                 for local_term_id, entry in dictionary.items()}
+                extra_columns = {name: {global_term_ids[local_term_id]: value
+                                        for local_term_id, value in dictionary.extra_items(name)}
+                                 for name in dictionary.extra_columns}
+                dictionary.close()
+                TermDictionary.write(metadata_file_path, postings_dict, dictionary.meta, extra_columns)
+        self.save()
+        self.merge_intermediate_indices()
+
+
+def _parse_invert_write_block(data_dir, output_dir, postings_encoding, block_size, with_positions,
+                              block_dir_relative, docs):
+    """
+    Worker untuk BSBIIndex.index_parallel. Melakukan parse_documents untuk
+    docs (list of (docID, path dokumen relatif terhadap data_dir) di block
+    block_dir_relative) dan invert_write dengan term_id_map lokal, lalu
+    mengembalikan nama intermediate index, daftar term lokal (index list =
+    termID lokal), pasangan (docID, panjang dokumen) di block tersebut, dan
+    pasangan (kata, stem) yang baru di-stem oleh worker.
+    """
+    worker = BSBIIndex(data_dir, output_dir, postings_encoding, block_size = block_size,
+                       with_positions = with_positions)
+    worker.term_id_map = IdMap()
+    Cleaner.new_stems = []
+    try:
+        td_pairs = worker.parse_documents(docs)
+        new_stems = Cleaner.new_stems
+    finally:
+        Cleaner.new_stems = None
+    index_id = 'intermediate_index_'+block_dir_relative
+    with InvertedIndexWriter(index_id, postings_encoding, directory = output_dir, block_size = block_size,
+                             with_tf = True, doc_length = worker.doc_length,
+                             with_positions = with_positions) as index:
+        worker.invert_write(td_pairs, index)
+    return (index_id, [worker.term_id_map[term_id] for term_id in range(len(worker.term_id_map))],
+            [(doc_id, worker.doc_length[doc_id]) for doc_id, _ in docs], new_stems)
 
 
 if __name__ == "__main__":
@@ -262,9 +1598,115 @@ if __name__ == "__main__":
     BSBI_instance = BSBIIndex(data_dir = 'collection',
                               # postings_encoding = VBEPostings,
                               # postings_encoding = StandardPostings,
+                              # postings_encoding = NumpyEliasGammaPostings,
                               postings_encoding = EliasGammaPostings,
                               output_dir = 'index')
 
+    # BSBI_instance.index(processes = os.cpu_count()) # indexing paralel
+    # BSBI_instance.index(memory_budget = SPIMI_MEMORY_BUDGET) # indexing SPIMI
     BSBI_instance.index() # memulai indexing!
     end = time.time()
     print(f"Indexing time: {(end-start):.5f} seconds")
+
+    # ranked retrieval setelah dokumen dihapus: df tidak menghitung postings
+    # dokumen terhapus yang belum di-merge, dan tanpa dokumen hidup hasilnya []
+    import tempfile
+    with tempfile.TemporaryDirectory() as test_directory:
+        test_data_dir = os.path.join(test_directory, 'collection')
+        os.makedirs(os.path.join(test_data_dir, '0'))
+        texts = {'a.txt': "jantung sehat olahraga", 'b.txt': "jantung sehat jantung",
+                 'c.txt': "jantung lari", 'd.txt': "olahraga teratur"}
+        for doc_name, text in texts.items():
+            with open(os.path.join(test_data_dir, '0', doc_name), 'w') as f:
+                f.write(text)
+        test_index = BSBIIndex(data_dir = test_data_dir, postings_encoding = VBEPostings,
+                               output_dir = test_directory, result_cache_capacity = 0)
+        test_index.index()
+        # query dengan operator / kurung yang tidak sesuai grammar menjadi AND implisit
+        invalid_queries = ["olahraga :)", "jantung (sehat", "penyakit jantung OR", "AND"]
+        for query in invalid_queries:
+            assert test_index.retrieve(query) == test_index.retrieve_conjunction(Cleaner.clean_and_tokenize(query))
+        assert sorted(test_index.retrieve("jantung (sehat")) == ['a.txt', 'b.txt'], "AND implisit salah"
+        assert test_index.retrieve_many(invalid_queries + ["jantung NOT sehat"]) == \
+            [test_index.retrieve(query) for query in invalid_queries] + [['c.txt']], "retrieve_many salah"
+        test_index.delete_documents(['0/a.txt', '0/b.txt'])
+        query = "jantung sehat olahraga"
+        for retrieve in [test_index.retrieve_tfidf, test_index.retrieve_bm25, test_index.retrieve_maxscore]:
+            results = retrieve(query)
+            assert sorted(doc for _, doc in results) == ['c.txt', 'd.txt'], "dokumen terhapus tidak boleh muncul"
+            assert all(score > 0 for score, _ in results), "idf setelah dokumen dihapus tidak boleh negatif"
+        assert test_index.retrieve_maxscore(query) == test_index.retrieve_bm25(query), "maxscore berbeda dengan bm25"
+        test_index.delete_documents(['0/c.txt', '0/d.txt'])
+        for retrieve in [test_index.retrieve_tfidf, test_index.retrieve_bm25, test_index.retrieve_maxscore]:
+            assert retrieve(query) == [], "index tanpa dokumen hidup harus mengembalikan []"
+
+    # indexing paralel menghasilkan file index yang identik dengan indexing
+    # serial, dan stem yang dihitung worker ikut tersimpan di stems.dict
+    with tempfile.TemporaryDirectory() as test_directory:
+        test_data_dir = os.path.join(test_directory, 'collection')
+        block_texts = [["jantung sehat olahraga", "lari pagi jantung"], ["olahraga teratur", "makan sayur sehat"],
+                       ["tidur cukup", "jantung berlari sayuran"]]
+        for block, texts in enumerate(block_texts):
+            os.makedirs(os.path.join(test_data_dir, str(block)))
+            for doc, text in enumerate(texts):
+                with open(os.path.join(test_data_dir, str(block), f'{block}-{doc}.txt'), 'w') as f:
+                    f.write(text)
+        index_files = ['main_index.index', 'main_index.dict', 'terms.dict', 'docs.dict', 'doclen.dict']
+        contents = []
+        for processes in [1, 2]:
+            test_output_dir = os.path.join(test_directory, f'index-{processes}')
+            os.makedirs(test_output_dir)
+            Cleaner.stem_cache.clear()
+            BSBIIndex(data_dir = test_data_dir, postings_encoding = VBEPostings,
+                      output_dir = test_output_dir).index(processes = processes)
+            file_contents = []
+            for file_name in index_files:
+                with open(os.path.join(test_output_dir, file_name), 'rb') as f:
+                    file_contents.append(f.read())
+            contents.append(file_contents)
+            with open(os.path.join(test_output_dir, 'stems.dict'), 'rb') as f:
+                assert dict(pickle.load(f)).get('berlari') == 'lari', "stem dari worker harus tersimpan di stems.dict"
+        assert contents[0] == contents[1], "indexing paralel harus identik dengan indexing serial"
+
+    # incremental indexing: dokumen baru, berubah, dan dihapus langsung
+    # berlaku lewat searcher yang terbuka, dan setiap SEGMENT_MERGE_FACTOR
+    # segment (tier 0) di-merge menjadi satu
+    with tempfile.TemporaryDirectory() as test_directory:
+        test_data_dir = os.path.join(test_directory, 'collection')
+        os.makedirs(os.path.join(test_data_dir, '0'))
+        def write_document(doc_name, text):
+            with open(os.path.join(test_data_dir, '0', doc_name), 'w') as f:
+                f.write(text)
+        write_document('a.txt', "jantung sehat")
+        write_document('b.txt', "olahraga teratur")
+        test_index = BSBIIndex(data_dir = test_data_dir, postings_encoding = VBEPostings, output_dir = test_directory)
+        test_index.index()
+        test_index.open_searcher()
+        live_docs, new_docs = {'a.txt', 'b.txt'}, []
+        for update_count in range(1, 7):
+            new_docs.append(f'new-{update_count}.txt')
+            write_document(new_docs[-1], "jantung lari " * update_count)
+            live_docs.add(new_docs[-1])
+            if update_count == 2:
+                write_document('a.txt', "sayur segar sekali")
+            if update_count == 3:
+                os.remove(os.path.join(test_data_dir, '0', 'b.txt'))
+                live_docs.remove('b.txt')
+            assert test_index.update() is not None, "update harus menambah segment baru"
+            assert new_docs[-1] in test_index.retrieve("lari"), "dokumen baru harus langsung bisa dicari"
+            test_index.wait_for_merges()
+            assert len(test_index.segments) == 1 + update_count % (SEGMENT_MERGE_FACTOR - 1), "tiered merge salah"
+            assert test_index.n_docs == len(live_docs), "n_docs setelah update / merge salah"
+            assert sorted(test_index.retrieve("lari")) == sorted(new_docs)
+            if update_count >= 2:
+                assert test_index.retrieve("sayur") == ['a.txt'], "dokumen yang berubah tidak boleh terduplikasi"
+                assert 'a.txt' not in test_index.retrieve("jantung"), "versi lama dokumen harus terhapus"
+                assert [doc for _, doc in test_index.retrieve_bm25("sayur")] == ['a.txt']
+            if update_count >= 3:
+                assert test_index.retrieve("olahraga") == [], "dokumen yang dihapus harus hilang"
+        assert test_index.update() is None, "tanpa perubahan tidak ada segment baru"
+        test_index.close_searcher()
+        loaded_index = BSBIIndex(data_dir = test_data_dir, postings_encoding = VBEPostings, output_dir = test_directory)
+        loaded_index.load()
+        assert loaded_index.segments == test_index.segments and loaded_index.n_docs == len(live_docs)
+        assert sorted(loaded_index.retrieve("lari")) == sorted(new_docs) and loaded_index.retrieve("olahraga") == []
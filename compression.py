@@ -1,9 +1,33 @@
 import array
 
 import bitarray as bitarray
+import numpy as np
 from bitarray.util import int2ba
 
+# Semua codec yang bisa dipakai untuk index: codec id -> class. Codec id
+# disimpan di metadata index (lihat InvertedIndexWriter), sehingga
+# InvertedIndexReader bisa memilih codec yang sesuai sendiri.
+CODECS = {}
 
+
+def register_codec(codec_id):
+    """
+    Decorator untuk class codec: mendaftarkan class tersebut di CODECS dengan
+    id codec_id (juga disimpan sebagai atribut codec_id). Subclass dari codec
+    yang terdaftar dianggap menghasilkan stream yang sama dengan parent-nya
+    (misalnya NumpyVBEPostings terhadap VBEPostings), sehingga boleh dipakai
+    untuk membaca index yang ditulis dengan parent-nya.
+    """
+    def register(codec):
+        if codec_id in CODECS:
+            raise ValueError(f"codec id {codec_id} sudah dipakai oleh {CODECS[codec_id].__name__}")
+        codec.codec_id = codec_id
+        CODECS[codec_id] = codec
+        return codec
+    return register
+
+
+@register_codec('standard')
 class StandardPostings:
     """
     Class dengan static methods, untuk mengubah representasi postings list
@@ -43,9 +67,10 @@ class StandardPostings:
 
         Parameters
         ----------
-        encoded_postings_list: bytes
+        encoded_postings_list: bytes-like (bytes, bytearray, memoryview)
             bytearray merepresentasikan encoded postings list sebagai keluaran
-            dari static method encode di atas.
+            dari static method encode di atas. Boleh berupa slice memoryview
+            dari index file yang di-mmap (tanpa copy).
 
         Returns
         -------
@@ -56,7 +81,22 @@ class StandardPostings:
         decoded_postings_list.frombytes(encoded_postings_list)
         return decoded_postings_list.tolist()
 
+    @staticmethod
+    def encode_tf(tf_list):
+        """
+        Encode list of term frequencies menjadi stream of bytes. Berbeda
+        dengan postings list, tf tidak terurut, jadi disimpan apa adanya
+        (bukan gap).
+        """
+        return StandardPostings.encode(tf_list)
+
+    @staticmethod
+    def decode_tf(encoded_tf_list):
+        """Decodes list of term frequencies dari sebuah stream of bytes"""
+        return StandardPostings.decode(encoded_tf_list)
+
 
+@register_codec('vbe')
 class VBEPostings:
     """
     Berbeda dengan StandardPostings, dimana untuk suatu postings list,
@@ -154,9 +194,10 @@ class VBEPostings:
 
         Parameters
         ----------
-        encoded_postings_list: bytes
+        encoded_postings_list: bytes-like (bytes, bytearray, memoryview)
             bytearray merepresentasikan encoded postings list sebagai keluaran
-            dari static method encode di atas.
+            dari static method encode di atas. Boleh berupa slice memoryview
+            dari index file yang di-mmap (tanpa copy).
 
         Returns
         -------
@@ -169,6 +210,20 @@ class VBEPostings:
             gap_based_list[i] += gap_based_list[i-1]
         return gap_based_list
 
+    @staticmethod
+    def encode_tf(tf_list):
+        """
+        Encode list of term frequencies dengan Variable-Byte Encoding. tf
+        tidak terurut dan umumnya kecil, jadi langsung di-encode tanpa gap.
+        """
+        return VBEPostings.vb_encode(tf_list)
+
+    @staticmethod
+    def decode_tf(encoded_tf_list):
+        """Decodes list of term frequencies dari sebuah stream of bytes"""
+        return VBEPostings.vb_decode(encoded_tf_list)
+
+@register_codec('eliasgamma')
 class EliasGammaPostings:
     """
     Coding $\gamma$ untuk suatu bilangan bulat positif $k$ terdiri dari dua
@@ -264,9 +319,10 @@ class EliasGammaPostings:
 
         Parameters
         ----------
-        encoded_postings_list: bytes
+        encoded_postings_list: bytes-like (bytes, bytearray, memoryview)
             bytearray merepresentasikan encoded postings list sebagai keluaran
-            dari static method encode di atas.
+            dari static method encode di atas. Boleh berupa slice memoryview
+            dari index file yang di-mmap (tanpa copy).
 
         Returns
         -------
@@ -279,15 +335,521 @@ class EliasGammaPostings:
             gap_based_list[i] += gap_based_list[i-1]
         return gap_based_list
 
+    @staticmethod
+    def encode_tf(tf_list):
+        """
+        Encode list of term frequencies dengan Elias Gamma. tf selalu >= 1
+        dan kebanyakan bernilai 1 (cukup 1 bit), jadi langsung di-encode
+        tanpa gap.
+        """
+        return EliasGammaPostings.eliasgamma_encode(tf_list)
+
+    @staticmethod
+    def decode_tf(encoded_tf_list):
+        """Decodes list of term frequencies dari sebuah stream of bytes"""
+        return EliasGammaPostings.eliasgamma_decode(encoded_tf_list)
+
+# Di bawah ukuran ini, overhead memanggil NumPy lebih besar daripada loop
+# Python biasa, sehingga codec Numpy* memakai versi aslinya: encode
+# membandingkan banyaknya docID, decode membandingkan panjang stream (bytes)
+NUMPY_MIN_POSTINGS = 128
+NUMPY_MIN_BYTES = 128
+
+
+def numpy_to_array(np_array):
+    """
+    Mengubah NumPy array integer menjadi array.array('q') dengan satu kali
+    copy memori, jauh lebih murah daripada .tolist() untuk postings yang
+    panjang.
+    """
+    return array.array('q', np_array.astype(np.int64).tobytes())
+
+
+@register_codec('numpy-vbe')
+class NumpyVBEPostings(VBEPostings):
+    """
+    Sama persis dengan VBEPostings (bytestream yang dihasilkan identik, jadi
+    index yang sudah ada tetap bisa dibaca), tetapi encode/decode dilakukan
+    secara vectorized dengan NumPy, bukan byte per byte di Python:
+    - decode: cari semua byte terminator (bit awal = 1) sekaligus, susun
+      setiap angka dari byte-byte sebelum terminatornya, lalu rekonstruksi
+      docID dari gap dengan cumsum.
+    - encode: hitung banyaknya byte setiap gap, lalu isi byte ke-j dari semua
+      angka sekaligus.
+
+    decode mengembalikan array.array('q'), bukan list, agar tidak perlu
+    membuat satu Python int per docID sekaligus.
+    """
+
+    @staticmethod
+    def encode(postings_list):
+        if len(postings_list) < NUMPY_MIN_POSTINGS: return VBEPostings.encode(postings_list)
+
+        gaps = np.diff(np.asarray(postings_list, dtype=np.int64), prepend=0)
+        n_bytes = np.ones(len(gaps), dtype=np.int64)
+        rest = gaps >> 7
+        while rest.any():
+            n_bytes += rest > 0
+            rest >>= 7
+
+        ends = np.cumsum(n_bytes)
+        starts = ends - n_bytes
+        encoded = np.zeros(ends[-1], dtype=np.uint8)
+        for j in range(n_bytes.max()):
+            selected = n_bytes > j
+            encoded[starts[selected] + j] = (gaps[selected] >> (7 * (n_bytes[selected] - 1 - j))) & 127
+        encoded[ends - 1] |= 128
+        return encoded.tobytes()
+
+    @staticmethod
+    def decode(encoded_postings_list):
+        if len(encoded_postings_list) < NUMPY_MIN_BYTES:
+            return array.array('q', VBEPostings.decode(encoded_postings_list))
+
+        encoded = np.frombuffer(encoded_postings_list, dtype=np.uint8)
+        ends = np.flatnonzero(encoded >= 128)
+        if len(ends) == 0: return array.array('q')
+
+        payload = (encoded & 127).astype(np.int64)
+        n_bytes = np.diff(ends, prepend=-1)
+        gap_based_list = payload[ends]
+        for j in range(1, n_bytes.max()):
+            selected = n_bytes > j
+            gap_based_list[selected] += payload[ends[selected] - j] << (7 * j)
+        return numpy_to_array(np.cumsum(gap_based_list))
+
+
+@register_codec('numpy-eliasgamma')
+class NumpyEliasGammaPostings(EliasGammaPostings):
+    """
+    Sama persis dengan EliasGammaPostings (bitstream identik), tetapi
+    encode/decode dilakukan secara vectorized dengan NumPy.
+
+    decode:
+    1. Bitstream di-unpack sekaligus. Untuk setiap posisi bit p dihitung
+       next_one[p], posisi bit 1 pertama mulai dari p (dengan np.repeat
+       atas posisi semua bit 1). Jika sebuah kode dimulai di p, unary prefix
+       berisi next_one[p] - p buah bit 0, dan kode berikutnya dimulai di
+       jump[p] = 2 * next_one[p] - p + 1.
+    2. Posisi awal semua kode adalah rantai 0, jump[0], jump[jump[0]], ...
+       Rantai ini dicari dengan pointer doubling: jump^(2^k) dihitung untuk
+       semua posisi sekaligus, loop Python hanya mengikuti jump^(2^k)
+       (satu langkah per 2^k angka), lalu posisi di antaranya diisi lagi
+       dengan jump secara vectorized.
+    3. Body semua angka diambil sekaligus dari window 8 byte di sekitar
+       posisinya, dan docID direkonstruksi dari gap dengan cumsum.
+
+    Berbeda dengan VBE, batas antar kode Elias-gamma hanya bisa diketahui
+    secara berantai, sehingga decode tetap membutuhkan beberapa pass NumPy
+    sepanjang jumlah bit (bukan jumlah angka).
+
+    encode: panjang setiap kode dihitung sekaligus, lalu bit ke-j dari body
+    semua angka ditulis sekaligus dan di-pack dengan np.packbits.
+
+    decode mengembalikan array.array('q'), bukan list.
+    """
+
+    # rantai awal kode diikuti per 2^JUMP_LEVELS angka oleh loop Python
+    JUMP_LEVELS = 3
+
+    @staticmethod
+    def encode(postings_list):
+        if len(postings_list) < NUMPY_MIN_POSTINGS: return EliasGammaPostings.encode(postings_list)
+
+        gaps = np.diff(np.asarray(postings_list, dtype=np.int64), prepend=0)
+        if not (gaps > 0).all():
+            raise ValueError("Elias-gamma hanya bisa meng-encode docID yang naik dan dimulai dari 1")
+        # banyaknya bit dari gap, exact karena docID < 2^53
+        n_bits = np.frexp(gaps.astype(np.float64))[1].astype(np.int64)
+        code_lengths = 2 * n_bits - 1
+        ends = np.cumsum(code_lengths)
+        body_starts = ends - n_bits
+
+        bits = np.zeros(ends[-1], dtype=np.uint8)
+        for j in range(n_bits.max()):
+            selected = n_bits > j
+            bits[body_starts[selected] + j] = (gaps[selected] >> (n_bits[selected] - 1 - j)) & 1
+        return np.packbits(bits).tobytes()
+
+    @staticmethod
+    def decode(encoded_postings_list):
+        if len(encoded_postings_list) < NUMPY_MIN_BYTES:
+            return array.array('q', EliasGammaPostings.decode(encoded_postings_list))
+
+        encoded = np.frombuffer(encoded_postings_list, dtype=np.uint8)
+        bits = np.unpackbits(encoded).view(np.bool_)
+        ones = np.flatnonzero(bits)
+        if len(ones) == 0: return array.array('q')
+
+        # hanya posisi sebelum bit 1 terakhir yang bisa menjadi awal kode,
+        # sisanya adalah padding. Posisi end dipakai sebagai sentinel.
+        end = int(ones[-1]) + 1
+        index_type = np.int32 if 2 * end < 1 << 31 else np.int64
+        ones = ones.astype(index_type)
+        jump = np.empty(end + 1, dtype=index_type)
+        jump[:end] = np.repeat(2 * ones + 1, np.diff(ones, prepend=index_type(-1)))
+        jump[:end] -= np.arange(end, dtype=index_type)
+        np.minimum(jump, end, out=jump)
+        jump[end] = end
+
+        far_jump = jump
+        for _ in range(NumpyEliasGammaPostings.JUMP_LEVELS):
+            far_jump = far_jump[far_jump]
+
+        checkpoints = []
+        position = 0
+        while position < end:
+            checkpoints.append(position)
+            position = far_jump.item(position)
+
+        chain = [np.array(checkpoints, dtype=index_type)]
+        for _ in range((1 << NumpyEliasGammaPostings.JUMP_LEVELS) - 1):
+            chain.append(jump[chain[-1]])
+        starts = np.stack(chain, axis=1).ravel()
+        starts = starts[starts < end].astype(np.int64)
+
+        # awal body = next_one = (jump + start - 1) / 2, kecuali kode terakhir
+        # yang jump-nya mungkin terpotong oleh sentinel
+        body_starts = (jump[starts] + starts - 1) >> 1
+        body_starts[-1] = ones[np.searchsorted(ones, starts[-1])]
+
+        # body (paling banyak 54 bit untuk docID < 2^53) dibaca dari window
+        # big-endian 8 byte yang dimulai di byte tempat body tersebut berada
+        padded = np.concatenate((encoded, np.zeros(8, dtype=np.uint8)))
+        windows = np.ndarray((len(encoded),), dtype='>u8', buffer=padded, strides=(1,))
+        gap_based_list = windows[body_starts >> 3].astype(np.uint64)
+        gap_based_list <<= (body_starts & 7).astype(np.uint64)
+        gap_based_list >>= (63 - body_starts + starts).astype(np.uint64)
+        return numpy_to_array(np.cumsum(gap_based_list))
+
+
+def bit_lengths(values):
+    """Banyaknya bit setiap integer di NumPy array values (0 untuk 0), exact untuk < 2^53"""
+    return np.frexp(values.astype(np.float64))[1].astype(np.int64)
+
+
+def check_range(values, limit):
+    """ValueError jika ada integer di NumPy array values yang negatif atau >= limit"""
+    if values.min() < 0 or values.max() >= limit:
+        raise ValueError(f"integer harus di rentang [0, {limit}), didapat [{values.min()}, {values.max()}]")
+
+
+def pack_count(count):
+    """Header banyaknya integer codec ArrayPostings (varint, 1 byte untuk < 128)"""
+    return VBEPostings.vb_encode_number(count)
+
+
+def unpack_count(data):
+    """(banyaknya integer, panjang header) dari header hasil pack_count"""
+    count = 0
+    for length, byte in enumerate(data, 1):
+        count = (count << 7) | (byte & 127)
+        if byte >= 128:
+            return count, length
+
+
+def byte_windows(data, dtype):
+    """
+    View little-endian berukuran dtype (np.uint32 atau np.uint64) yang dimulai
+    di setiap byte data (NumPy array uint8), sehingga integer yang bit-nya
+    tersebar di beberapa byte bisa dibaca sekaligus untuk banyak posisi
+    """
+    itemsize = np.dtype(dtype).itemsize
+    padded = np.concatenate((data, np.zeros(itemsize, dtype=np.uint8)))
+    # window di posisi len(data) (isinya padding) untuk integer 0 bit di akhir data
+    return np.ndarray((len(data) + 1,), dtype=np.dtype(dtype).newbyteorder('<'), buffer=padded, strides=(1,))
+
+
+class ArrayPostings:
+    """
+    Basis codec yang meng-encode seluruh postings list sekaligus dengan
+    operasi NumPy array. Subclass cukup mengimplementasikan pack(values) dan
+    unpack(data) untuk NumPy array integer >= 0 yang tidak terurut: postings
+    list di-encode sebagai gap (docID pertama apa adanya), tf apa adanya.
+
+    Semua format diawali banyaknya integer (pack_count), dan decode
+    mengembalikan array.array('q'), bukan list. Overhead NumPy per
+    pemanggilan (puluhan mikrodetik) membuat codec-codec ini lebih lambat
+    daripada VBEPostings untuk postings list yang sangat pendek.
+    """
+
+    @classmethod
+    def encode(cls, postings_list):
+        return cls.pack(np.diff(np.asarray(postings_list, dtype=np.int64), prepend=0))
+
+    @classmethod
+    def decode(cls, encoded_postings_list):
+        return numpy_to_array(np.cumsum(cls.unpack(encoded_postings_list)))
+
+    @classmethod
+    def encode_tf(cls, tf_list):
+        return cls.pack(np.asarray(tf_list, dtype=np.int64))
+
+    @classmethod
+    def decode_tf(cls, encoded_tf_list):
+        return numpy_to_array(cls.unpack(encoded_tf_list))
+
+
+@register_codec('pfor')
+class PForDeltaPostings(ArrayPostings):
+    """
+    Patched Frame-of-Reference (PForDelta) dengan pemilihan bit width per
+    block seperti OptPFor. Integer dibagi menjadi block berisi PFOR_BLOCK_SIZE
+    integer; setiap block disimpan dengan bit width b yang sama, dan integer
+    yang butuh lebih dari b bit menjadi exception: b bit terbawahnya tetap di
+    frame, posisi (1 byte) dan sisa bit-nya (uint32) disimpan terpisah. b
+    dipilih per block agar ukuran frame + exception minimum.
+
+    Format:
+        count | b per block (uint8) | banyaknya exception per block
+        (uint8) | frame setiap block (count_block * b bit, little-endian,
+        dibulatkan ke byte) | posisi exception (uint8) | sisa bit exception
+        (uint32)
+
+    Karena semua header ada di depan, decode tidak butuh loop per block:
+    offset bit setiap integer dihitung sekaligus, lalu semua integer dibaca
+    dari window 8 byte di offset tersebut. Integer harus < 2^32.
+    """
+
+    # Bytes per exception: posisi (uint8) dan sisa bit (uint32)
+    EXCEPTION_BYTES = 5
+
+    @staticmethod
+    def pack(values):
+        count = len(values)
+        if count == 0: return pack_count(0)
+        check_range(values, 1 << 32)
+
+        block = np.arange(count) // PFOR_BLOCK_SIZE
+        n_blocks = int(block[-1]) + 1
+        block_sizes = np.bincount(block, minlength=n_blocks)
+        bits = bit_lengths(values)
+        # exceptions[i, b] = banyaknya integer block i yang butuh lebih dari b bit
+        histogram = np.bincount(block * 33 + bits, minlength=n_blocks * 33).reshape(n_blocks, 33)
+        exceptions = block_sizes[:, None] - np.cumsum(histogram, axis=1)
+        cost = (block_sizes[:, None] * np.arange(33) + 7) // 8 + PForDeltaPostings.EXCEPTION_BYTES * exceptions
+        widths = np.argmin(cost, axis=1)
+        n_exceptions = exceptions[np.arange(n_blocks), widths]
+
+        frame_bytes = (block_sizes * widths + 7) // 8
+        frame_starts = np.cumsum(frame_bytes) - frame_bytes
+        value_widths = widths[block]
+        offsets = frame_starts[block] * 8 + (np.arange(count) % PFOR_BLOCK_SIZE) * value_widths
+        frame = np.zeros(int(frame_bytes.sum()) * 8, dtype=np.uint8)
+        for j in range(int(widths.max())):
+            selected = value_widths > j
+            frame[offsets[selected] + j] = (values[selected] >> j) & 1
+
+        is_exception = bits > value_widths
+        positions = (np.flatnonzero(is_exception) % PFOR_BLOCK_SIZE).astype(np.uint8)
+        high_bits = (values[is_exception] >> value_widths[is_exception]).astype('<u4')
+        return b"".join([pack_count(count), widths.astype(np.uint8).tobytes(),
+                         n_exceptions.astype(np.uint8).tobytes(), np.packbits(frame, bitorder='little').tobytes(),
+                         positions.tobytes(), high_bits.tobytes()])
+
+    @staticmethod
+    def unpack(data):
+        count, start = unpack_count(data)
+        if count == 0: return np.zeros(0, dtype=np.int64)
+        encoded = np.frombuffer(data, dtype=np.uint8)
+
+        n_blocks = (count + PFOR_BLOCK_SIZE - 1) // PFOR_BLOCK_SIZE
+        widths = encoded[start:start + n_blocks].astype(np.int64)
+        n_exceptions = encoded[start + n_blocks:start + 2 * n_blocks].astype(np.int64)
+        block_sizes = np.full(n_blocks, PFOR_BLOCK_SIZE)
+        block_sizes[-1] = count - PFOR_BLOCK_SIZE * (n_blocks - 1)
+        frame_bytes = (block_sizes * widths + 7) // 8
+        frame_starts = start + 2 * n_blocks + np.cumsum(frame_bytes) - frame_bytes
+
+        block = np.arange(count) // PFOR_BLOCK_SIZE
+        value_widths = widths[block].astype(np.uint64)
+        offsets = frame_starts[block] * 8 + (np.arange(count) % PFOR_BLOCK_SIZE) * widths[block]
+        values = byte_windows(encoded, np.uint64)[offsets >> 3] >> (offsets & 7).astype(np.uint64)
+        values &= (np.uint64(1) << value_widths) - np.uint64(1)
+
+        n_total = int(n_exceptions.sum())
+        if n_total > 0:
+            exceptions_start = int(frame_starts[-1] + frame_bytes[-1])
+            exception_blocks = np.repeat(np.arange(n_blocks), n_exceptions)
+            positions = exception_blocks * PFOR_BLOCK_SIZE + encoded[exceptions_start:exceptions_start + n_total]
+            high_bits = np.frombuffer(data, dtype='<u4', count=n_total, offset=exceptions_start + n_total)
+            values[positions] |= high_bits.astype(np.uint64) << value_widths[positions]
+        return values.astype(np.int64)
+
+
+@register_codec('simple8b')
+class Simple8bPostings(ArrayPostings):
+    """
+    Simple-8b: setiap word 64 bit berisi selector 4 bit (bit teratas) dan 60
+    bit data, yang menampung n integer berukuran b bit sesuai
+    SIMPLE8B_SELECTORS[selector] = (n, b). Encode memilih secara greedy
+    selector dengan n terbesar yang cukup untuk integer-integer berikutnya
+    (word terakhir boleh tidak penuh). Untuk setiap b, panjang run integer
+    <= b bit yang dimulai di setiap posisi dihitung sekaligus, sehingga loop
+    Python hanya satu iterasi per word.
+
+    Format: count | word (uint64 little-endian) * n_words
+
+    decode: selector semua word dibaca sekaligus, lalu integer ke-k di word
+    w diambil dengan shift k * b_w untuk semua integer sekaligus. Integer
+    harus < 2^53.
+    """
+
+    @staticmethod
+    def pack(values):
+        count = len(values)
+        if count == 0: return pack_count(0)
+        check_range(values, 1 << 53)
+
+        bits = bit_lengths(values)
+        indices = np.arange(count)
+        runs = {}
+        for _, width in SIMPLE8B_SELECTORS:
+            if width not in runs:
+                # posisi integer pertama > width mulai dari setiap posisi
+                breaks = np.where(bits > width, indices, count)
+                runs[width] = (np.minimum.accumulate(breaks[::-1])[::-1] - indices).tolist()
+
+        starts, selectors = [], []
+        position = 0
+        while position < count:
+            for selector, (n, width) in enumerate(SIMPLE8B_SELECTORS):
+                if runs[width][position] >= min(n, count - position):
+                    break
+            starts.append(position)
+            selectors.append(selector)
+            position += n
+
+        starts = np.array(starts)
+        selectors = np.array(selectors, dtype=np.uint64)
+        word_of = np.repeat(np.arange(len(starts)), np.diff(starts, append=count))
+        widths = SIMPLE8B_WIDTHS[selectors.astype(np.int64)]
+        shifts = ((indices - starts[word_of]) * widths[word_of]).astype(np.uint64)
+        words = np.add.reduceat(values.astype(np.uint64) << shifts, starts)
+        words |= selectors << np.uint64(60)
+        return pack_count(count) + words.astype('<u8').tobytes()
+
+    @staticmethod
+    def unpack(data):
+        count, start = unpack_count(data)
+        if count == 0: return np.zeros(0, dtype=np.int64)
+        words = np.frombuffer(data, dtype='<u8', offset=start).astype(np.uint64)
+
+        selectors = (words >> np.uint64(60)).astype(np.int64)
+        counts = SIMPLE8B_COUNTS[selectors]
+        widths = SIMPLE8B_WIDTHS[selectors]
+        word_of = np.repeat(np.arange(len(words)), counts)[:count]
+        shifts = ((np.arange(count) - (np.cumsum(counts) - counts)[word_of]) * widths[word_of]).astype(np.uint64)
+        values = words[word_of] >> shifts
+        values &= (np.uint64(1) << widths[word_of].astype(np.uint64)) - np.uint64(1)
+        return values.astype(np.int64)
+
+
+@register_codec('streamvbyte')
+class StreamVBytePostings(ArrayPostings):
+    """
+    StreamVByte: setiap integer disimpan dalam 1 - 4 byte (little-endian),
+    dengan panjangnya (2 bit) dikumpulkan di control stream yang terpisah dari
+    data stream. Berbeda dengan VBE, panjang setiap integer diketahui tanpa
+    membaca datanya, sehingga offset semua integer dihitung sekaligus dengan
+    cumsum dan semua integer dibaca sekaligus dari window 4 byte.
+
+    Format: count | control (4 integer per byte, integer ke-i di bit 2i) |
+    data
+
+    Integer harus < 2^32.
+    """
+
+    @staticmethod
+    def pack(values):
+        count = len(values)
+        if count == 0: return pack_count(0)
+        check_range(values, 1 << 32)
+
+        lengths = np.maximum((bit_lengths(values) + 7) >> 3, 1)
+        codes = np.zeros((count + 3) // 4 * 4, dtype=np.uint8)
+        codes[:count] = lengths - 1
+        codes = codes.reshape(-1, 4) << np.arange(0, 8, 2, dtype=np.uint8)
+        control = np.bitwise_or.reduce(codes, axis=1)
+
+        offsets = np.cumsum(lengths) - lengths
+        encoded = np.zeros(int(lengths.sum()), dtype=np.uint8)
+        for j in range(4):
+            selected = lengths > j
+            encoded[offsets[selected] + j] = (values[selected] >> (8 * j)) & 255
+        return pack_count(count) + control.tobytes() + encoded.tobytes()
+
+    @staticmethod
+    def unpack(data):
+        count, start = unpack_count(data)
+        if count == 0: return np.zeros(0, dtype=np.int64)
+        encoded = np.frombuffer(data, dtype=np.uint8)
+
+        data_start = start + (count + 3) // 4
+        control = encoded[start:data_start]
+        codes = ((control[:, None] >> np.arange(0, 8, 2, dtype=np.uint8)) & 3).ravel()[:count]
+        lengths = codes.astype(np.int64) + 1
+        offsets = data_start + np.cumsum(lengths) - lengths
+        values = byte_windows(encoded, np.uint32)[offsets] & STREAMVBYTE_MASKS[codes]
+        return values.astype(np.int64)
+
+
+# Banyaknya integer per block PForDeltaPostings
+PFOR_BLOCK_SIZE = 128
+# (banyaknya integer, bit per integer) untuk setiap selector Simple-8b
+SIMPLE8B_SELECTORS = [(240, 0), (120, 0), (60, 1), (30, 2), (20, 3), (15, 4), (12, 5), (10, 6),
+                      (8, 7), (7, 8), (6, 10), (5, 12), (4, 15), (3, 20), (2, 30), (1, 60)]
+SIMPLE8B_COUNTS = np.array([n for n, _ in SIMPLE8B_SELECTORS], dtype=np.int64)
+SIMPLE8B_WIDTHS = np.array([width for _, width in SIMPLE8B_SELECTORS], dtype=np.int64)
+# mask integer StreamVByte untuk panjang 1 - 4 byte
+STREAMVBYTE_MASKS = np.array([0xff, 0xffff, 0xffffff, 0xffffffff], dtype=np.uint32)
+
+
 if __name__ == '__main__':
 
     postings_list = [34, 67, 89, 454, 2345738]
-    for Postings in [StandardPostings, VBEPostings, EliasGammaPostings]:
+    for Postings in CODECS.values():
         print(Postings.__name__)
         encoded_postings_list = Postings.encode(postings_list)
         print("byte hasil encode: ", encoded_postings_list)
         print("ukuran encoded postings: ", len(encoded_postings_list), "bytes")
         decoded_posting_list = Postings.decode(encoded_postings_list)
         print("hasil decoding: ", decoded_posting_list)
-        assert decoded_posting_list == postings_list, "hasil decoding tidak sama dengan postings original"
+        assert list(decoded_posting_list) == postings_list, "hasil decoding tidak sama dengan postings original"
         print()
+
+        buffer = bytearray(b"\xff" + encoded_postings_list + b"\xff")
+        with memoryview(buffer)[1:-1] as view:
+            assert list(Postings.decode(view)) == postings_list, "decoding dari memoryview salah"
+
+        tf_list = [1, 3, 1, 1, 200]
+        assert list(Postings.decode_tf(Postings.encode_tf(tf_list))) == tf_list, "decoding tf salah"
+
+    # versi NumPy harus bit-compatible dengan versi aslinya
+    import random
+    postings_list = sorted(random.sample(range(1, 10 ** 7), 5000))
+    assert NumpyVBEPostings.encode(postings_list) == VBEPostings.encode(postings_list), "encode NumpyVBEPostings salah"
+    assert NumpyVBEPostings.decode(VBEPostings.encode(postings_list)).tolist() == postings_list, "decode NumpyVBEPostings salah"
+    assert NumpyEliasGammaPostings.encode(postings_list) == EliasGammaPostings.encode(postings_list), "encode NumpyEliasGammaPostings salah"
+    assert NumpyEliasGammaPostings.decode(EliasGammaPostings.encode(postings_list)).tolist() == postings_list, "decode NumpyEliasGammaPostings salah"
+
+    # codec block: beberapa block dengan exception, word Simple-8b berisi 0,
+    # dan integer 4 byte
+    tf_list = [1] * 300 + [random.randrange(1, 1 << 32) for _ in range(20)] + [2] * 50
+    for Postings in [PForDeltaPostings, Simple8bPostings, StreamVBytePostings]:
+        assert Postings.decode(Postings.encode(postings_list)).tolist() == postings_list, f"decode {Postings.__name__} salah"
+        assert Postings.decode(Postings.encode([0, 1, 2])).tolist() == [0, 1, 2], f"docID 0 {Postings.__name__} salah"
+        assert Postings.decode_tf(Postings.encode_tf(tf_list)).tolist() == tf_list, f"decode tf {Postings.__name__} salah"
+        assert len(Postings.decode(Postings.encode([]))) == 0, f"postings kosong {Postings.__name__} salah"
+
+    # integer di luar rentang codec ditolak (juga dengan python -O), bukan terpotong
+    for Postings, invalid_lists in [(NumpyEliasGammaPostings, [list(range(0, 200)), list(range(200, 0, -1))]),
+                                    (PForDeltaPostings, [[1 << 32], [5, 3]]),
+                                    (Simple8bPostings, [[1 << 53], [5, 3]]),
+                                    (StreamVBytePostings, [[1 << 32], [5, 3]])]:
+        for invalid_list in invalid_lists:
+            try:
+                Postings.encode(invalid_list)
+                assert False, f"{Postings.__name__} harus menolak {invalid_list[:3]}"
+            except ValueError:
+                pass
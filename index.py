@@ -1,5 +1,253 @@
-import pickle
+import array
+import bisect
+import collections
+import contextlib
+import itertools
+import json
+import mmap
 import os
+import struct
+import sys
+import threading
+
+from compression import CODECS
+from util import RoaringBitmap, gallop
+
+class TermDictionary:
+    """
+    Representasi on-disk yang compact dari postings_dict (termID ->
+    (start_position_in_index_file, number_of_postings_in_list,
+    length_in_bytes_of_postings_list)), pengganti pickle dari python's
+    Dictionary berisi 3-tuple.
+
+    Format file .dict:
+        MAGIC (8 bytes) | panjang header (uint32) | header (JSON) | padding |
+        kolom-kolom numerik fixed-width, masing-masing align ke 8 bytes
+
+    Kolom disimpan dengan lebar terkecil ('B', 'H', 'I', atau 'Q') yang cukup
+    untuk nilai maksimumnya, terurut berdasarkan termID:
+        - term   : termID. Tidak disimpan jika termID-nya dense (berurutan,
+                   seperti di main index); cukup termID pertama di header.
+        - offset : posisi postings list di index file. Jika postings list
+                   ditulis berurutan sesuai termID, kolom ini berisi
+                   n_terms + 1 posisi sehingga panjang (dalam bytes) =
+                   offset[i + 1] - offset[i], dan kolom length tidak disimpan.
+        - count  : banyaknya docID di postings list
+        - length : panjang postings list dalam bytes (hanya jika perlu)
+        - kolom tambahan per term (extra_columns pada write), misalnya
+          tf_length, dibaca dengan extra(name, term)
+
+    Saat dibaca, file di-mmap dan setiap kolom diakses lewat memoryview,
+    sehingga lookup cukup index langsung (dense) atau binary search, tanpa
+    unpickle dan tanpa membuat object tuple untuk semua term di memori.
+    """
+    MAGIC = b"IRDICT01"
+
+    def __init__(self, metadata_file_path):
+        """Membuka (mmap) file .dict hasil TermDictionary.write(...)"""
+        with open(metadata_file_path, 'rb') as f:
+            self.dict_mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.parse(metadata_file_path)
+        except Exception:
+            self.close()
+            raise
+
+    def parse(self, metadata_file_path):
+        """Membaca header dan membuat view setiap kolom dari self.dict_mmap"""
+        self.views = []
+        self.columns = {}
+        if self.dict_mmap[:len(self.MAGIC)] != self.MAGIC:
+            raise ValueError(f"{metadata_file_path} bukan TermDictionary, lakukan indexing ulang")
+        position = len(self.MAGIC)
+        header_length, = struct.unpack_from('<I', self.dict_mmap, position)
+        position += 4
+        header = json.loads(self.dict_mmap[position:position + header_length].decode('utf-8'))
+        position = TermDictionary.align(position + header_length)
+
+        self.n_terms = header['n_terms']
+        self.byteorder = header['byteorder']
+        self.first_term = header['first_term']
+        self.meta = header['meta']
+        self.extra_columns = header.get('extra_columns', [])
+        for name, typecode, length in header['columns']:
+            size = array.array(typecode).itemsize * length
+            if header['byteorder'] == sys.byteorder:
+                view = memoryview(self.dict_mmap)[position:position + size]
+                self.views.append(view)
+                self.columns[name] = view.cast(typecode)
+                self.views.append(self.columns[name])
+            else:
+                column = array.array(typecode)
+                column.frombytes(self.dict_mmap[position:position + size])
+                column.byteswap()
+                self.columns[name] = column
+            position = TermDictionary.align(position + size)
+
+        if 'term' in self.columns:
+            self.terms = self.columns['term']
+        else:
+            self.terms = range(self.first_term, self.first_term + self.n_terms)
+
+    @staticmethod
+    def align(position):
+        return (position + 7) // 8 * 8
+
+    @staticmethod
+    def smallest_typecode(max_value):
+        """typecode array terkecil yang bisa menampung 0..max_value"""
+        for typecode in 'BHIQ':
+            if max_value < 1 << (8 * array.array(typecode).itemsize):
+                return typecode
+        raise OverflowError(max_value)
+
+    @staticmethod
+    def write(metadata_file_path, postings_dict, meta=None, extra_columns=None):
+        """
+        Menulis postings_dict (termID -> (offset, count, length)) ke file .dict
+
+        Parameters
+        ----------
+        metadata_file_path: str
+        postings_dict: Dict[int, Tuple[int, int, int]]
+        meta: dict
+            Metadata tambahan tingkat index (harus JSON-serializable)
+        extra_columns: Dict[str, Dict[int, int]]
+            Kolom tambahan, nama kolom -> (termID -> nilai integer >= 0).
+            Term yang tidak ada di sebuah kolom bernilai 0.
+        """
+        terms = sorted(postings_dict.keys())
+        entries = [postings_dict[term] for term in terms]
+        offsets = [entry[0] for entry in entries]
+        counts = [entry[1] for entry in entries]
+        lengths = [entry[2] for entry in entries]
+
+        columns = []
+        dense = len(terms) == 0 or terms[-1] - terms[0] + 1 == len(terms)
+        if not dense:
+            columns.append(('term', terms))
+        contiguous = all(offsets[i] + lengths[i] == offsets[i + 1] for i in range(len(terms) - 1))
+        if contiguous:
+            end = offsets[-1] + lengths[-1] if terms else 0
+            columns.append(('offset', offsets + [end]))
+            columns.append(('count', counts))
+        else:
+            columns.append(('offset', offsets))
+            columns.append(('count', counts))
+            columns.append(('length', lengths))
+        extra_columns = extra_columns or {}
+        for name, values in extra_columns.items():
+            columns.append((name, [values.get(term, 0) for term in terms]))
+
+        header_columns = []
+        data = []
+        for name, values in columns:
+            column = array.array(TermDictionary.smallest_typecode(max(values, default=0)), values)
+            header_columns.append((name, column.typecode, len(column)))
+            data.append(column.tobytes())
+        header = json.dumps({'n_terms': len(terms),
+                             'first_term': terms[0] if terms else 0,
+                             'byteorder': sys.byteorder,
+                             'columns': header_columns,
+                             'extra_columns': list(extra_columns),
+                             'meta': meta or {}}).encode('utf-8')
+
+        # ditulis ke file sementara lalu di-rename, sehingga crash di tengah
+        # penulisan atau reader yang membuka file ini bersamaan tidak pernah
+        # melihat file .dict yang terpotong
+        with open(metadata_file_path + '.tmp', 'wb') as f:
+            f.write(TermDictionary.MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for column in data:
+                f.write(b"\0" * (TermDictionary.align(f.tell()) - f.tell()))
+                f.write(column)
+        os.replace(metadata_file_path + '.tmp', metadata_file_path)
+
+    def close(self):
+        """Melepas semua memoryview lalu menutup mmap"""
+        for view in reversed(self.views):
+            view.release()
+        self.views = []
+        self.columns = {}
+        self.dict_mmap.close()
+
+    def position(self, term):
+        """Posisi (baris) term di kolom-kolom dictionary, atau -1 jika tidak ada"""
+        if 'term' not in self.columns:
+            position = term - self.first_term
+            return position if 0 <= position < self.n_terms else -1
+        position = bisect.bisect_left(self.terms, term)
+        if position < self.n_terms and self.terms[position] == term:
+            return position
+        return -1
+
+    def entry(self, position):
+        offsets = self.columns['offset']
+        if 'length' in self.columns:
+            length = self.columns['length'][position]
+        else:
+            length = offsets[position + 1] - offsets[position]
+        return offsets[position], self.columns['count'][position], length
+
+    def extra(self, name, term):
+        """Nilai kolom tambahan name untuk sebuah term (0 jika kolomnya tidak ada)"""
+        position = self.position(term) if type(term) is int else -1
+        if position == -1:
+            raise KeyError(term)
+        return self.columns[name][position] if name in self.columns else 0
+
+    def extra_items(self, name):
+        """Pasangan (termID, nilai) dari kolom tambahan name"""
+        return zip(self.terms, self.columns[name])
+
+    def __len__(self):
+        return self.n_terms
+
+    def __iter__(self):
+        return iter(self.terms)
+
+    def __contains__(self, term):
+        return type(term) is int and self.position(term) != -1
+
+    def __getitem__(self, term):
+        position = self.position(term) if type(term) is int else -1
+        if position == -1:
+            raise KeyError(term)
+        return self.entry(position)
+
+    def get(self, term, default=None):
+        return self[term] if term in self else default
+
+    def items(self):
+        return ((term, self.entry(position)) for position, term in enumerate(self.terms))
+
+    def __eq__(self, other):
+        if isinstance(other, (dict, TermDictionary)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+
+# Skip table berisi uint32: (last_docID, count, end) per block, ditambah
+# (tf_start, max_tf, min_dl) jika index menyimpan term frequency, lalu n_blocks
+SKIP_ITEM_SIZE = array.array('I').itemsize
+SKIP_ENTRY_LENGTH = 3
+SKIP_TF_ENTRY_LENGTH = 6
+
+# Skip table yang sudah dibaca, setiap field berisi satu nilai per block:
+# - lasts, counts, ends: docID terakhir, banyaknya docID, posisi akhir block
+# - tf_starts: posisi awal TF stream (= ends jika tanpa term frequency)
+# - max_tfs, min_dls: tf terbesar dan panjang dokumen terkecil di block, untuk
+#   upper bound skor (1 dan 0 jika tanpa term frequency)
+# Semua posisi relatif terhadap awal postings list.
+SkipTable = collections.namedtuple('SkipTable', ['lasts', 'counts', 'ends', 'tf_starts', 'max_tfs', 'min_dls'])
+
+# Postings list dengan paling sedikit BITMAP_MIN_COUNT docID yang memuat
+# paling sedikit BITMAP_DENSITY dari docID 0..docID terakhirnya disimpan
+# sebagai RoaringBitmap (lihat InvertedIndexWriter, bitmap_density)
+BITMAP_DENSITY = 1 / 16
+BITMAP_MIN_COUNT = 64
+
 
 class InvertedIndex:
     """
@@ -20,7 +268,8 @@ class InvertedIndex:
         di memori.
 
         Seperti namanya, "Dictionary" diimplementasikan sebagai python's Dictionary
-        yang memetakan term ID (integer) ke 3-tuple:
+        (saat menulis index) atau TermDictionary (saat membaca index) yang
+        memetakan term ID (integer) ke 3-tuple:
            1. start_position_in_index_file : (dalam satu bytes) posisi dimana
               postings yang bersesuaian berada di file (storage). Kita bisa
               menggunakan operasi "seek" untuk mencapainya.
@@ -40,12 +289,15 @@ class InvertedIndex:
         ----------
         index_name (str): Nama yang digunakan untuk menyimpan files yang berisi index
         postings_encoding : Lihat di compression.py, kandidatnya adalah StandardPostings,
-                        GapBasedPostings, dsb.
+                        GapBasedPostings, dsb. InvertedIndexReader memakai codec
+                        yang tercatat di metadata index (lihat
+                        InvertedIndexReader.__enter__), sehingga boleh None.
         directory (str): directory dimana file index berada
         """
 
         self.index_file_path = os.path.join(directory, index_name+'.index')
         self.metadata_file_path = os.path.join(directory, index_name+'.dict')
+        self.positions_file_path = os.path.join(directory, index_name+'.pos')
 
         self.postings_encoding = postings_encoding
         self.directory = directory
@@ -53,6 +305,10 @@ class InvertedIndex:
         self.postings_dict = {}
         self.terms = []         #Untuk keep track urutan term yang dimasukkan ke index
 
+        # Melindungi pasangan seek + read pada index_file ketika satu reader
+        # dipakai bersama oleh beberapa thread
+        self.lock = threading.Lock()
+
     def __enter__(self):
         """
         Memuat semua metadata ketika memasuki context.
@@ -61,31 +317,37 @@ class InvertedIndex:
             2. iterator untuk List yang berisi urutan term yang masuk ke
                 index saat konstruksi. ---> term_iter
 
-        Metadata disimpan ke file dengan bantuan library "pickle"
+        Metadata disimpan ke file dalam format TermDictionary
 
         Perlu memahani juga special method __enter__(..) pada Python dan juga
         konsep Context Manager di Python. Silakan pelajari link berikut:
 
         https://docs.python.org/3/reference/datamodel.html#object.__enter__
         """
-        # Membuka index file
-        self.index_file = open(self.index_file_path, 'rb+')
+        # Kita muat postings dict dan terms iterator dari file metadata, lebih
+        # dulu dari index file agar tidak ada file yang bocor jika .dict-nya
+        # tidak valid
+        self.postings_dict = TermDictionary(self.metadata_file_path)
 
-        # Kita muat postings dict dan terms iterator dari file metadata
-        with open(self.metadata_file_path, 'rb') as f:
-            self.postings_dict, self.terms = pickle.load(f)
-            self.term_iter = self.terms.__iter__()
+        # Membuka index file (read-only, metadata tidak pernah ditulis ulang oleh reader)
+        try:
+            self.index_file = open(self.index_file_path, 'rb')
+        except OSError:
+            self.postings_dict.close()
+            raise
+        self.terms = self.postings_dict.terms
+        self.term_iter = self.terms.__iter__()
 
         return self
 
     def __exit__(self, exception_type, exception_value, traceback):
-        """Menutup index_file dan menyimpan postings_dict dan terms ketika keluar context"""
+        """
+        Menutup index_file ketika keluar context. Metadata hanya disimpan oleh
+        InvertedIndexWriter, sehingga reader benar-benar read-only.
+        """
         # Menutup index file
         self.index_file.close()
-
-        # Menyimpan metadata (postings dict dan terms) ke file metadata dengan bantuan pickle
-        with open(self.metadata_file_path, 'wb') as f:
-            pickle.dump([self.postings_dict, self.terms], f)
+        self.postings_dict.close()
 
 
 class InvertedIndexReader(InvertedIndex):
@@ -93,9 +355,97 @@ class InvertedIndexReader(InvertedIndex):
     Class yang mengimplementasikan bagaimana caranya scan atau membaca secara
     efisien Inverted Index yang disimpan di sebuah file.
     """
+    def __init__(self, index_name, postings_encoding, directory='', use_mmap=False, postings_cache=None):
+        """
+        Parameters
+        ----------
+        use_mmap (bool): Jika True, index file di-mmap sehingga get_postings_list(...)
+                        memberikan slice memoryview langsung ke decoder, tanpa
+                        syscall seek/read dan tanpa copy ke bytes object baru.
+                        Beberapa process yang membaca index yang sama juga
+                        berbagi page cache OS yang sama.
+        postings_cache (LRUCache): Jika diberikan, (postings list, tf list)
+                        hasil decode disimpan di cache ini, sehingga term
+                        yang sering di-query tidak dibaca dan di-decode ulang.
+                        Cache boleh dipakai bersama oleh beberapa reader (key
+                        berisi path dan mtime index file). List yang
+                        dikembalikan tidak boleh diubah oleh pemanggil.
+        """
+        super().__init__(index_name, postings_encoding, directory)
+        self.use_mmap = use_mmap
+        self.postings_cache = postings_cache
+        self.index_mmap = None
+        self.index_view = None
+        self.positions_file = None
+        self.positions_mmap = None
+        self.positions_view = None
+
+    def __enter__(self):
+        super().__enter__()
+        # codec yang tercatat di metadata dipakai, kecuali postings_encoding
+        # adalah subclass-nya (stream-nya sama, misalnya NumpyVBEPostings
+        # untuk index VBEPostings). Index lama tanpa codec id memakai
+        # postings_encoding apa adanya.
+        codec_id = self.postings_dict.meta.get('codec')
+        if codec_id is not None:
+            if codec_id not in CODECS:
+                self.__exit__(None, None, None)
+                raise ValueError(f"{self.metadata_file_path}: codec {codec_id} tidak dikenal")
+            if self.postings_encoding is None or not issubclass(self.postings_encoding, CODECS[codec_id]):
+                self.postings_encoding = CODECS[codec_id]
+        elif self.postings_encoding is None:
+            self.__exit__(None, None, None)
+            raise ValueError(f"{self.metadata_file_path} tidak menyimpan codec, postings_encoding harus diberikan")
+        self.block_size = self.postings_dict.meta.get('block_size')
+        self.with_tf = self.postings_dict.meta.get('with_tf', False)
+        self.skip_entry_length = SKIP_TF_ENTRY_LENGTH if self.with_tf else SKIP_ENTRY_LENGTH
+        self.with_positions = self.postings_dict.meta.get('with_positions', False)
+        # index file yang ditulis ulang dengan nama yang sama (misalnya indexing
+        # ulang) punya mtime berbeda, sehingga entry cache lamanya tidak terpakai
+        self.cache_key = (self.index_file_path, os.fstat(self.index_file.fileno()).st_mtime_ns)
+        # mmap tidak bisa dibuat untuk file kosong, reader tetap memakai read()
+        if self.use_mmap and os.fstat(self.index_file.fileno()).st_size > 0:
+            self.index_mmap = mmap.mmap(self.index_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.index_view = memoryview(self.index_mmap)
+        # file posisi hanya dibuka jika index menyimpannya, boolean query tidak
+        # pernah membaca file ini
+        if self.with_positions:
+            self.positions_file = open(self.positions_file_path, 'rb')
+            if self.use_mmap and os.fstat(self.positions_file.fileno()).st_size > 0:
+                self.positions_mmap = mmap.mmap(self.positions_file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.positions_view = memoryview(self.positions_mmap)
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        if self.index_mmap is not None:
+            self.index_view.release()
+            self.index_mmap.close()
+            self.index_view = self.index_mmap = None
+        if self.positions_mmap is not None:
+            self.positions_view.release()
+            self.positions_mmap.close()
+            self.positions_view = self.positions_mmap = None
+        if self.positions_file is not None:
+            self.positions_file.close()
+            self.positions_file = None
+        super().__exit__(exception_type, exception_value, traceback)
+
     def __iter__(self):
         return self
 
+    def open(self):
+        """
+        Membuka reader tanpa with-statement, untuk reader yang long-lived:
+        metadata dimuat dan index file dibuka sekali saja, lalu reader bisa
+        melayani banyak pemanggilan get_postings_list(...) (termasuk dari
+        beberapa thread) sampai close() dipanggil.
+        """
+        return self.__enter__()
+
+    def close(self):
+        """Menutup reader yang dibuka dengan open()"""
+        self.__exit__(None, None, None)
+
     def reset(self):
         """
         Kembalikan file pointer ke awal, dan kembalikan pointer iterator
@@ -122,6 +472,11 @@ class InvertedIndexReader(InvertedIndex):
         next_term = next(self.term_iter)
         return next_term, self.get_postings_list(next_term)
 
+    def document_frequency(self, term):
+        """Banyaknya docID di postings list sebuah term, 0 jika term tidak ada"""
+        entry = self.postings_dict.get(term)
+        return 0 if entry is None else entry[1]
+
     def get_postings_list(self, term):
         """
         Kembalikan sebuah postings list (list of docIDs) untuk sebuah term.
@@ -131,28 +486,666 @@ class InvertedIndexReader(InvertedIndex):
         byte tertentu pada file (index file) dimana postings list dari
         term disimpan.
         """
+        return self.read_postings(term, read_tf=False)[0]
+
+    def get_postings_lists(self, terms):
+        """
+        Dictionary term -> postings list untuk banyak term sekaligus (term
+        yang tidak ada di index dilewati). Postings list dibaca terurut
+        berdasarkan posisinya di index file, sehingga pembacaan file berjalan
+        sekuensial ke satu arah.
+        """
+        terms = sorted((term for term in set(terms) if term in self.postings_dict),
+                       key=lambda term: self.postings_dict[term][0])
+        return {term: self.get_postings_list(term) for term in terms}
+
+    def get_postings_and_tf(self, term):
+        """
+        Kembalikan (postings list, list of term frequency) untuk sebuah term;
+        tf_list[i] adalah frekuensi term di dokumen postings_list[i]. Untuk
+        index yang tidak menyimpan term frequency, setiap tf bernilai 1.
+        """
+        return self.read_postings(term, read_tf=True)
+
+    def read_postings(self, term, read_tf):
+        if self.postings_cache is None:
+            return self.decode_postings(term, read_tf)
+        # tf selalu ikut di-decode agar satu entry cache melayani kedua method
+        key = self.cache_key + (term,)
+        postings = self.postings_cache.get(key)
+        if postings is None:
+            postings = self.decode_postings(term, read_tf=True)
+            self.postings_cache.put(key, postings)
+        return postings
+
+    def decode_postings(self, term, read_tf):
+        posisi, doc_id_length, bytes_length = self.postings_dict[term]
+        with self.buffer(posisi, bytes_length) as encoded_postings_list:
+            bitmap_length = self.postings_dict.extra('bitmap_length', term)
+            if bitmap_length > 0:
+                doc_id_list = RoaringBitmap.deserialize(encoded_postings_list[:bitmap_length]).to_list()
+                tf_list = self.decode_tf(encoded_postings_list[bitmap_length:], doc_id_length) if read_tf else None
+                return doc_id_list, tf_list
+            if self.is_blocked(term):
+                skip_table = self.parse_skip_table(encoded_postings_list)
+                blocks = zip(itertools.chain([0], skip_table.ends), skip_table.tf_starts,
+                             skip_table.ends, skip_table.counts)
+            else:
+                tf_start = bytes_length - self.postings_dict.extra('tf_length', term)
+                blocks = [(0, tf_start, bytes_length, doc_id_length)]
+
+            doc_id_list, tf_list = None, None
+            for start, tf_start, end, count in blocks:
+                block = self.postings_encoding.decode(encoded_postings_list[start:tf_start])
+                tf_block = self.decode_tf(encoded_postings_list[tf_start:end], count) if read_tf else None
+                if doc_id_list is None:
+                    doc_id_list, tf_list = block, tf_block
+                else:
+                    doc_id_list.extend(block)
+                    if read_tf: tf_list.extend(tf_block)
+            return doc_id_list, tf_list
+
+    def decode_tf(self, encoded_tf_list, count):
+        """Decode TF stream sebuah block (count buah tf)"""
+        if not self.with_tf:
+            return [1] * count
+        return self.postings_encoding.decode_tf(encoded_tf_list)
+
+    def get_postings_cursor(self, term):
+        """Kembalikan PostingsCursor untuk postings list sebuah term"""
+        return PostingsCursor(self, term)
+
+    def get_postings_bitmap(self, term):
+        """
+        Postings list sebuah term sebagai RoaringBitmap, tanpa decode ke list,
+        jika term tersebut disimpan sebagai bitmap (lihat
+        InvertedIndexWriter, bitmap_density); None jika tidak.
+        """
+        bitmap_length = self.postings_dict.extra('bitmap_length', term)
+        if bitmap_length == 0:
+            return None
+        with self.buffer(self.postings_dict[term][0], bitmap_length) as encoded_bitmap:
+            return RoaringBitmap.deserialize(encoded_bitmap)
+
+    def get_bitmap_tf(self, term):
+        """
+        List of term frequency sebuah term yang disimpan sebagai bitmap (lihat
+        get_postings_bitmap), tanpa decode bitmap-nya menjadi list docIDs
+        """
+        posisi, doc_id_length, bytes_length = self.postings_dict[term]
+        bitmap_length = self.postings_dict.extra('bitmap_length', term)
+        with self.buffer(posisi + bitmap_length, bytes_length - bitmap_length) as encoded_tf_list:
+            return self.decode_tf(encoded_tf_list, doc_id_length)
+
+    def last_doc_id(self, term):
+        """
+        docID terakhir di postings list sebuah term. Untuk postings list
+        dalam block atau bitmap, yang dibaca hanya skip table atau bitmap-nya.
+        """
+        bitmap = self.get_postings_bitmap(term)
+        if bitmap is not None:
+            return bitmap.max()
+        if self.is_blocked(term):
+            return self.read_skip_table(term).lasts[-1]
+        return self.get_postings_list(term)[-1]
+
+    def iter_postings(self, term):
+        """
+        Generator (docIDs, tf) postings list sebuah term per potongan: per
+        block untuk postings list dalam block, per container untuk bitmap
+        (docIDs berupa array int64), atau seluruh postings list sekaligus.
+        Seperti get_postings_and_tf, tf bernilai 1 jika index tidak
+        menyimpan term frequency.
+        """
+        bitmap = self.get_postings_bitmap(term)
+        if bitmap is not None:
+            tf_list = self.get_bitmap_tf(term)
+            start = 0
+            for doc_ids in bitmap.iter_chunks():
+                yield doc_ids, tf_list[start:start + len(doc_ids)]
+                start += len(doc_ids)
+        elif self.is_blocked(term):
+            for encoded_block, encoded_tf_block, _, count in (block[:4] for block in self.iter_blocks(term)):
+                yield self.postings_encoding.decode(encoded_block), self.decode_tf(encoded_tf_block, count)
+        else:
+            yield self.get_postings_and_tf(term)
+
+    def read_skip_table(self, term):
+        """
+        Membaca hanya skip table dari postings list sebuah term yang disimpan
+        dalam block (lihat parse_skip_table).
+        """
         posisi, doc_id_length, bytes_length = self.postings_dict[term]
-        self.index_file.seek(posisi)
-        doc_id_list = self.index_file.read(bytes_length)
-        doc_id_list = self.postings_encoding.decode(doc_id_list)
-        return doc_id_list
+        with self.buffer(posisi + bytes_length - SKIP_ITEM_SIZE, SKIP_ITEM_SIZE) as trailer:
+            n_blocks = array.array('I', trailer.tobytes())
+        if self.postings_dict.byteorder != sys.byteorder:
+            n_blocks.byteswap()
+        table_length = SKIP_ITEM_SIZE * (self.skip_entry_length * n_blocks[0] + 1)
+        with self.buffer(posisi + bytes_length - table_length, table_length) as table:
+            return self.parse_skip_table(table)
+
+    def iter_blocks(self, term):
+        """
+        Generator (encoded_block, encoded_tf_block, last_docID, count, max_tf,
+        min_dl) untuk setiap block dari postings list sebuah term yang disimpan
+        dalam block, tanpa decode (argumen untuk PostingsStream.add_block).
+        encoded_tf_block kosong jika index tidak menyimpan term frequency.
+        Hanya satu block yang dibaca ke memori dalam satu waktu.
+        """
+        posisi = self.postings_dict[term][0]
+        skip_table = self.read_skip_table(term)
+        start = 0
+        for last_doc_id, count, end, tf_start, max_tf, min_dl in zip(*skip_table):
+            with self.buffer(posisi + start, end - start) as encoded_block:
+                encoded_block = encoded_block.tobytes()
+            yield encoded_block[:tf_start - start], encoded_block[tf_start - start:], last_doc_id, count, max_tf, min_dl
+            start = end
+
+    def get_positions(self, term, rank):
+        """
+        Kembalikan posisi-posisi (terurut, dimulai dari 1) term di dokumen ke-rank
+        dari postings list term tersebut (lihat PostingsCursor.rank). Yang
+        dibaca dari file posisi hanya dua entry tabel offset dan posisi-posisi
+        dokumen itu saja.
+        """
+        table_start = self.positions_table_start(term)
+        if rank == 0:
+            start = 0
+            end, = self.read_positions_offsets(table_start, 1)
+        else:
+            start, end = self.read_positions_offsets(table_start + SKIP_ITEM_SIZE * (rank - 1), 2)
+        pos_start = self.postings_dict.extra('pos_start', term)
+        with self.buffer(pos_start + start, end - start, positions=True) as encoded_positions:
+            return self.postings_encoding.decode(encoded_positions)
+
+    def positions_table_start(self, term):
+        """Posisi (di file posisi) tabel offset posisi-posisi sebuah term"""
+        count = self.postings_dict[term][1]
+        return (self.postings_dict.extra('pos_start', term) + self.postings_dict.extra('pos_length', term)
+                - SKIP_ITEM_SIZE * count)
+
+    def read_positions_offsets(self, position, n):
+        """Membaca n entry uint32 tabel offset di file posisi mulai dari position"""
+        offsets = array.array('I')
+        with self.buffer(position, SKIP_ITEM_SIZE * n, positions=True) as encoded_offsets:
+            offsets.frombytes(encoded_offsets)
+        if self.postings_dict.byteorder != sys.byteorder:
+            offsets.byteswap()
+        return offsets
+
+    @contextlib.contextmanager
+    def buffer(self, position, length, positions=False):
+        """
+        Context yang memberikan isi index file (atau file posisi jika
+        positions) pada [position, position + length) sebagai memoryview:
+        slice langsung dari mmap jika use_mmap, atau hasil read() jika tidak.
+        """
+        file, file_view = ((self.positions_file, self.positions_view) if positions
+                           else (self.index_file, self.index_view))
+        if file_view is not None:
+            with file_view[position:position + length] as view:
+                yield view
+        else:
+            with self.lock:
+                file.seek(position)
+                data = file.read(length)
+            with memoryview(data) as view:
+                yield view
+
+    def is_blocked(self, term):
+        """
+        Apakah postings list sebuah term disimpan dalam block + skip table
+        (postings list yang disimpan sebagai bitmap tidak pernah di-block)
+        """
+        return (self.block_size is not None and self.postings_dict[term][1] > self.block_size
+                and self.postings_dict.extra('bitmap_length', term) == 0)
+
+    def parse_skip_table(self, encoded_postings_list):
+        """
+        Membaca skip table di akhir postings list yang disimpan dalam block.
+        encoded_postings_list cukup berisi bagian akhir postings list, asalkan
+        seluruh skip table termuat.
+
+        Returns
+        -------
+        SkipTable
+        """
+        n_blocks = array.array('I')
+        n_blocks.frombytes(encoded_postings_list[len(encoded_postings_list) - SKIP_ITEM_SIZE:])
+        if self.postings_dict.byteorder != sys.byteorder:
+            n_blocks.byteswap()
+        table_start = len(encoded_postings_list) - SKIP_ITEM_SIZE * (self.skip_entry_length * n_blocks[0] + 1)
+        skip_table = array.array('I')
+        skip_table.frombytes(encoded_postings_list[table_start:len(encoded_postings_list) - SKIP_ITEM_SIZE])
+        if self.postings_dict.byteorder != sys.byteorder:
+            skip_table.byteswap()
+        n = self.skip_entry_length
+        if self.with_tf:
+            return SkipTable(*(skip_table[field::n] for field in range(n)))
+        ends = skip_table[2::n]
+        return SkipTable(skip_table[0::n], skip_table[1::n], ends, ends,
+                         [1] * n_blocks[0], [0] * n_blocks[0])
+
+
+class PostingsCursor:
+    """
+    Cursor di atas postings list sebuah term, untuk intersection yang tidak
+    perlu decode seluruh postings list. Untuk postings list yang disimpan
+    dalam block, hanya skip table yang dibaca di awal; sebuah block baru
+    di-decode ketika docID yang dicari mungkin berada di block tersebut
+    (dilihat dari docID terakhir setiap block di skip table). TF stream
+    sebuah block juga baru di-decode ketika tf() dipanggil.
+
+    Postings list pendek dan postings list yang disimpan sebagai bitmap
+    dianggap sebagai satu block; intersect dan difference dengan bitmap
+    cukup test bit untuk setiap kandidat, sehingga bitmap baru di-decode
+    menjadi list ketika advance dipanggil. max_tfs dan min_dls (per block)
+    bisa dipakai untuk upper bound skor tanpa decode, lihat block_bounds.
+    """
+    def __init__(self, reader, term):
+        self.reader = reader
+        self.term = term
+        self.offset, self.count, length = reader.postings_dict[term]
+        self.block_index = 0
+        self.position = 0
+        self.blocks_decoded = 0
+        self.tf_block = None
+        self.doc_id = None
+        self.block_starts = None
+        self.bitmap = reader.get_postings_bitmap(term)
+        if reader.is_blocked(term):
+            self.lasts, self.counts, self.ends, self.tf_starts, self.max_tfs, self.min_dls = reader.read_skip_table(term)
+            self.block = None
+        else:
+            if self.bitmap is not None:
+                # di-decode oleh load_block ketika advance pertama kali dipanggil
+                self.block = None
+                self.lasts = [self.bitmap.max()] if self.count > 0 else []
+            else:
+                self.block = reader.get_postings_list(term)
+                self.lasts = [self.block[-1]] if self.block else []
+                self.blocks_decoded = 1
+            if reader.with_tf:
+                self.max_tfs = [reader.postings_dict.extra('max_tf', term)]
+                self.min_dls = [reader.postings_dict.extra('min_dl', term)]
+            else:
+                self.max_tfs, self.min_dls = [1], [0]
+
+    def __len__(self):
+        return self.count
+
+    def load_block(self, block_index):
+        if self.bitmap is not None:
+            self.block = self.reader.get_postings_list(self.term)
+        else:
+            start = self.ends[block_index - 1] if block_index > 0 else 0
+            with self.reader.buffer(self.offset + start, self.tf_starts[block_index] - start) as encoded_block:
+                self.block = self.reader.postings_encoding.decode(encoded_block)
+        self.tf_block = None
+        self.block_index = block_index
+        self.position = 0
+        self.blocks_decoded += 1
+
+    def tf(self):
+        """Term frequency di docID posisi cursor saat ini (setelah advance)"""
+        if self.tf_block is None:
+            if self.bitmap is not None:
+                self.tf_block = self.reader.get_bitmap_tf(self.term)
+            elif not self.reader.is_blocked(self.term):
+                self.tf_block = self.reader.get_postings_and_tf(self.term)[1]
+            else:
+                tf_start, end = self.tf_starts[self.block_index], self.ends[self.block_index]
+                with self.reader.buffer(self.offset + tf_start, end - tf_start) as encoded_tf_block:
+                    self.tf_block = self.reader.decode_tf(encoded_tf_block, self.counts[self.block_index])
+        return self.tf_block[self.position]
+
+    def rank(self):
+        """Urutan (dimulai dari 0) docID posisi cursor saat ini di seluruh postings list"""
+        if self.block_index == 0:
+            return self.position
+        if self.block_starts is None:
+            self.block_starts = list(itertools.accumulate(self.counts))
+        return self.block_starts[self.block_index - 1] + self.position
+
+    def advance(self, target):
+        """
+        Geser cursor ke docID pertama yang >= target (cursor hanya bergerak
+        maju), lalu kembalikan docID tersebut, atau None jika sudah habis.
+        docID tersebut juga disimpan di self.doc_id.
+        """
+        self.doc_id = None
+        if self.block_index >= len(self.lasts):
+            return None
+        if self.lasts[self.block_index] < target or self.block is None:
+            block_index = bisect.bisect_left(self.lasts, target, self.block_index)
+            if block_index == len(self.lasts):
+                self.block_index = block_index
+                return None
+            if block_index != self.block_index or self.block is None:
+                self.load_block(block_index)
+        self.position = bisect.bisect_left(self.block, target, self.position)
+        self.doc_id = self.block[self.position]
+        return self.doc_id
+
+    def block_bounds(self, target):
+        """
+        Tanpa menggeser cursor dan tanpa decode, kembalikan (docID terakhir,
+        max_tf, min_dl) dari block yang mungkin berisi target (block pertama
+        mulai posisi cursor yang docID terakhirnya >= target), atau None jika
+        target melewati docID terakhir postings list.
+        """
+        block_index = bisect.bisect_left(self.lasts, target, self.block_index)
+        if block_index == len(self.lasts):
+            return None
+        return self.lasts[block_index], self.max_tfs[block_index], self.min_dls[block_index]
+
+    def intersect(self, candidates):
+        """
+        Intersection postings list ini dengan candidates (sorted list of
+        docIDs, biasanya postings list terpendek). Biayanya sebanding dengan
+        panjang candidates dan banyaknya block yang perlu di-decode, bukan
+        panjang postings list ini.
+        """
+        if self.bitmap is not None:
+            return self.bitmap.intersect_sorted(candidates)
+        result = []
+        for doc_id in candidates:
+            found = self.advance(doc_id)
+            if found is None:
+                break
+            if found == doc_id:
+                result.append(doc_id)
+        return result
+
+    def difference(self, candidates):
+        """
+        candidates (sorted list of docIDs) yang tidak ada di postings list
+        ini, dengan biaya yang sama seperti intersect.
+        """
+        if self.bitmap is not None:
+            return self.bitmap.difference_sorted(candidates)
+        return [doc_id for doc_id in candidates if self.advance(doc_id) != doc_id]
+
+
+def intersect_cursors(candidates, cursors):
+    """
+    Intersection candidates (sorted list of docIDs, biasanya postings list
+    terpendek) dengan postings list semua cursors (PostingsCursor) sekaligus,
+    tanpa list perantara untuk setiap term. Setiap kandidat dicek di cursor
+    satu per satu; jika sebuah cursor melewati kandidat tersebut, kandidat
+    berikutnya langsung di-gallop (util.gallop) ke docID cursor itu, sehingga
+    kandidat yang pasti tidak cocok dilewati tanpa dicek di cursor lain.
+    """
+    result = []
+    i = 0
+    while i < len(candidates):
+        doc_id = candidates[i]
+        for cursor in cursors:
+            found = cursor.advance(doc_id)
+            if found is None:
+                return result
+            if found != doc_id:
+                i = gallop(candidates, found, i + 1)
+                break
+        else:
+            result.append(doc_id)
+            i += 1
+    return result
+
+
+class SegmentedIndexReader:
+    """
+    Reader gabungan dari beberapa segment index (InvertedIndexReader yang
+    sudah dibuka), dengan interface pembacaan yang sama seperti
+    InvertedIndexReader untuk retrieval. docIDs antar segment harus saling
+    lepas dan naik sesuai urutan segment (segment yang lebih baru berisi
+    docID yang lebih besar), sehingga postings list gabungan cukup
+    disambung sesuai urutan segment.
+    """
+    def __init__(self, readers):
+        self.readers = readers
+        self.with_positions = all(reader.with_positions for reader in readers)
+
+    def close(self):
+        """Menutup semua reader segment"""
+        for reader in self.readers:
+            reader.close()
+
+    def document_frequency(self, term):
+        return sum(reader.document_frequency(term) for reader in self.readers)
+
+    def term_readers(self, term):
+        """Reader segment-segment yang mengandung term, sesuai urutan segment"""
+        return [reader for reader in self.readers if term in reader.postings_dict]
+
+    def get_postings_list(self, term):
+        postings_list = []
+        for reader in self.term_readers(term):
+            postings_list.extend(reader.get_postings_list(term))
+        return postings_list
+
+    def get_postings_lists(self, terms):
+        # setiap segment dibaca sekuensial, lalu disambung sesuai urutan segment
+        postings_lists = {}
+        for reader in self.readers:
+            for term, postings_list in reader.get_postings_lists(terms).items():
+                postings_lists.setdefault(term, []).extend(postings_list)
+        return postings_lists
+
+    def get_postings_and_tf(self, term):
+        postings_list, tf_list = [], []
+        for reader in self.term_readers(term):
+            postings, tfs = reader.get_postings_and_tf(term)
+            postings_list.extend(postings)
+            tf_list.extend(tfs)
+        return postings_list, tf_list
+
+    def get_postings_cursor(self, term):
+        return SegmentedPostingsCursor([reader.get_postings_cursor(term) for reader in self.term_readers(term)])
+
+    def get_postings_bitmap(self, term):
+        """Gabungan (OR) bitmap setiap segment, None jika ada segment yang tidak menyimpannya sebagai bitmap"""
+        bitmap = None
+        for reader in self.term_readers(term):
+            segment_bitmap = reader.get_postings_bitmap(term)
+            if segment_bitmap is None:
+                return None
+            bitmap = segment_bitmap if bitmap is None else bitmap | segment_bitmap
+        return bitmap
+
+    def get_positions(self, term, rank):
+        for reader in self.term_readers(term):
+            count = reader.document_frequency(term)
+            if rank < count:
+                return reader.get_positions(term, rank)
+            rank -= count
+        raise IndexError(rank)
+
+
+class SegmentedPostingsCursor(PostingsCursor):
+    """
+    PostingsCursor di atas postings list sebuah term yang tersebar di
+    beberapa segment (lihat SegmentedIndexReader): cursor segment dipakai
+    satu per satu, dan pindah ke segment berikutnya ketika docID yang dicari
+    melewati docID terakhir segment saat ini.
+    """
+    def __init__(self, cursors):
+        self.cursors = cursors
+        self.segment = 0
+        self.count = sum(len(cursor) for cursor in cursors)
+        self.doc_id = None
+        self.bitmap = None
+        # untuk upper bound skor term, lihat BSBIIndex.retrieve_maxscore
+        self.max_tfs = [max_tf for cursor in cursors for max_tf in cursor.max_tfs]
+        self.min_dls = [min_dl for cursor in cursors for min_dl in cursor.min_dls]
+
+    def tf(self):
+        return self.cursors[self.segment].tf()
+
+    def rank(self):
+        return sum(len(cursor) for cursor in self.cursors[:self.segment]) + self.cursors[self.segment].rank()
+
+    def advance(self, target):
+        self.doc_id = None
+        while self.segment < len(self.cursors):
+            doc_id = self.cursors[self.segment].advance(target)
+            if doc_id is not None:
+                self.doc_id = doc_id
+                return doc_id
+            self.segment += 1
+        return None
+
+    def block_bounds(self, target):
+        for cursor in self.cursors[self.segment:]:
+            bounds = cursor.block_bounds(target)
+            if bounds is not None:
+                return bounds
+        return None
+
+    def segment_candidates(self, candidates):
+        """
+        Generator (indeks segment, cursor, bagian candidates yang mungkin ada
+        di segment tersebut) untuk candidates terurut, mulai dari segment
+        saat ini, dibagi berdasarkan docID terakhir setiap segment
+        """
+        start = 0
+        for segment in range(self.segment, len(self.cursors)):
+            cursor = self.cursors[segment]
+            if start == len(candidates):
+                return
+            if len(cursor.lasts) == 0:
+                continue
+            end = bisect.bisect_right(candidates, cursor.lasts[-1], start)
+            yield segment, cursor, candidates[start:end]
+            start = end
+
+    def intersect(self, candidates):
+        # intersect cursor setiap segment (test bit untuk segment bitmap)
+        result = []
+        for segment, cursor, segment_candidates in self.segment_candidates(candidates):
+            if len(segment_candidates) > 0:
+                self.segment = segment
+                result.extend(cursor.intersect(segment_candidates))
+        return result
+
+    def difference(self, candidates):
+        result = []
+        start = 0
+        for segment, cursor, segment_candidates in self.segment_candidates(candidates):
+            if len(segment_candidates) > 0:
+                self.segment = segment
+                result.extend(cursor.difference(segment_candidates))
+            start += len(segment_candidates)
+        return result + list(candidates[start:])
+
 
 class InvertedIndexWriter(InvertedIndex):
     """
     Class yang mengimplementasikan bagaimana caranya menulis secara
     efisien Inverted Index yang disimpan di sebuah file.
     """
+    def __init__(self, index_name, postings_encoding, directory='', block_size=None, with_tf=False,
+                 doc_length=None, with_positions=False, bitmap_density=BITMAP_DENSITY):
+        """
+        Parameters
+        ----------
+        block_size (int): Jika tidak None, postings list yang lebih panjang dari
+                        block_size disimpan sebagai block-block berisi (paling
+                        banyak) block_size docID yang masing-masing di-encode
+                        terpisah, diikuti sebuah skip table. Format per
+                        postings list:
+
+                            blocks | (last_docID, count, end[, tf_start, max_tf, min_dl]) * n_blocks | n_blocks
+
+                        (skip table uint32 semua), dengan end = posisi akhir
+                        block relatif terhadap awal postings list. Skip table
+                        ada di akhir agar block bisa ditulis secara streaming
+                        (lihat PostingsStream). Postings list yang pendek tetap
+                        disimpan apa adanya seperti tanpa block.
+        with_tf (bool): Jika True, term frequency ikut disimpan: setiap block
+                        (atau postings list pendek) diikuti TF stream hasil
+                        postings_encoding.encode_tf, skip table mendapat
+                        kolom tambahan tf_start (posisi awal TF stream block),
+                        dan panjang TF stream postings list pendek disimpan di
+                        kolom tf_length dari TermDictionary. Untuk upper bound
+                        skor (WAND), tf terbesar (max_tf) dan panjang dokumen
+                        terkecil (min_dl) juga disimpan per block di skip table
+                        dan per term di kolom max_tf dan min_dl.
+        doc_length (array): Panjang dokumen, index = docID, untuk min_dl. Jika
+                        None, min_dl selalu 0 (upper bound tetap valid, hanya
+                        kurang ketat).
+        with_positions (bool): Jika True, posisi token di setiap dokumen ikut
+                        disimpan di file terpisah (index_name.pos), sehingga
+                        query yang tidak butuh posisi tidak membaca file
+                        tersebut. Format per term di file posisi:
+
+                            positions_doc_0 | ... | positions_doc_n-1 | end * n
+
+                        dengan positions_doc_i = postings_encoding.encode dari
+                        posisi-posisi (dimulai dari 1, sehingga gap selalu
+                        > 0) term di dokumen ke-i postings list, dan end
+                        (uint32) posisi akhirnya relatif terhadap awal region
+                        term. Awal dan panjang region disimpan di kolom
+                        pos_start dan pos_length dari TermDictionary.
+        bitmap_density (float): Postings list dengan paling sedikit
+                        BITMAP_MIN_COUNT docID yang memuat paling sedikit
+                        bitmap_density dari docID 0..docID terakhirnya (term
+                        yang dense) disimpan sebagai RoaringBitmap hasil
+                        serialize, diikuti TF stream seperti postings list
+                        pendek, dan tidak pernah di-block. Panjang bitmap
+                        disimpan di kolom bitmap_length dari TermDictionary
+                        (0 untuk postings list biasa). None artinya tidak ada
+                        postings list yang disimpan sebagai bitmap.
+        """
+        super().__init__(index_name, postings_encoding, directory)
+        self.block_size = block_size
+        self.with_tf = with_tf
+        self.doc_length = doc_length
+        self.with_positions = with_positions
+        self.bitmap_density = bitmap_density
+        self.skip_entry_length = SKIP_TF_ENTRY_LENGTH if with_tf else SKIP_ENTRY_LENGTH
+        self.bitmap_lengths = {}
+        self.tf_lengths = {}
+        self.max_tfs = {}
+        self.min_dls = {}
+        self.pos_starts = {}
+        self.pos_lengths = {}
+
     def __enter__(self):
         self.index_file = open(self.index_file_path, 'wb+')
+        if self.with_positions:
+            self.positions_file = open(self.positions_file_path, 'wb+')
         return self
 
-    def append(self, term, postings_list):
+    def __exit__(self, exception_type, exception_value, traceback):
+        """Menutup index_file dan menyimpan postings_dict dan terms ketika keluar context"""
+        # Menutup index file
+        self.index_file.close()
+        if self.with_positions:
+            self.positions_file.close()
+
+        # Menyimpan metadata (postings dict, terurut berdasarkan termID) ke file metadata
+        extra_columns = {}
+        if self.with_tf:
+            extra_columns.update(tf_length=self.tf_lengths, max_tf=self.max_tfs, min_dl=self.min_dls)
+        if self.with_positions:
+            extra_columns.update(pos_start=self.pos_starts, pos_length=self.pos_lengths)
+        if len(self.bitmap_lengths) > 0:
+            extra_columns.update(bitmap_length=self.bitmap_lengths)
+        TermDictionary.write(self.metadata_file_path, self.postings_dict,
+                             {'block_size': self.block_size, 'with_tf': self.with_tf,
+                              'with_positions': self.with_positions,
+                              'codec': getattr(self.postings_encoding, 'codec_id', None)},
+                             extra_columns)
+
+    def append(self, term, postings_list, tf_list=None, positions_list=None):
         """
         Menambahkan (append) sebuah term dan juga postings_list yang terasosiasi
         ke posisi akhir index file.
 
         Method ini melakukan 3 hal:
-        1. Encode postings_list menggunakan self.postings_encoding,
+        1. Encode postings_list menggunakan self.postings_encoding (atau
+           sebagai RoaringBitmap jika postings_list dense, lihat is_dense),
         2. Menyimpan metadata dalam bentuk self.terms dan self.postings_dict.
            Ingat kembali bahwa self.postings_dict memetakan sebuah termID ke
            sebuah 3-tuple: - start_position_in_index_file
@@ -175,23 +1168,270 @@ class InvertedIndexWriter(InvertedIndex):
             term atau termID yang merupakan unique identifier dari sebuah term
         postings_list: List[Int]
             List of docIDs dimana term muncul
+        tf_list: List[Int]
+            Term frequency di setiap docID pada postings_list (wajib jika with_tf)
+        positions_list: List[List[Int]]
+            Posisi-posisi term di setiap docID pada postings_list. Wajib jika
+            with_positions, kecuali posisi term sudah ditulis dengan
+            copy_positions.
         """
+        if positions_list is not None:
+            self.write_positions(term, positions_list)
+        dense = len(postings_list) > 0 and self.is_dense(len(postings_list), postings_list[-1])
+        if not dense and self.block_size is not None and len(postings_list) > self.block_size:
+            with self.postings_stream(term) as stream:
+                stream.extend(postings_list, tf_list)
+            return
+        if dense:
+            self.append_bitmap(term, RoaringBitmap.from_sorted(postings_list), tf_list, postings_list)
+            return
         self.terms.append(term)
         encoded_postings_list = self.postings_encoding.encode(postings_list)
+        encoded_tf_list = self.encode_tf(tf_list)
         self.postings_dict[term] = (self.index_file.tell(),
                                     len(postings_list),
-                                    len(encoded_postings_list))
+                                    len(encoded_postings_list) + len(encoded_tf_list))
+        if self.with_tf:
+            self.tf_lengths[term] = len(encoded_tf_list)
+            self.max_tfs[term], self.min_dls[term] = self.score_bounds(postings_list, tf_list)
+        self.index_file.write(encoded_postings_list)
+        self.index_file.write(encoded_tf_list)
+
+    def append_bitmap(self, term, bitmap, tf_list=None, doc_ids=None):
+        """
+        Menambahkan postings list sebuah term yang sudah berupa RoaringBitmap
+        (lihat is_dense), beserta tf_list-nya, tanpa list docIDs. doc_ids
+        (opsional) adalah docIDs yang sama, untuk menghitung score bounds
+        tanpa iterasi bitmap.
+        """
+        self.terms.append(term)
+        encoded_postings_list = bitmap.serialize()
+        encoded_tf_list = self.encode_tf(tf_list)
+        self.bitmap_lengths[term] = len(encoded_postings_list)
+        self.postings_dict[term] = (self.index_file.tell(),
+                                    len(tf_list) if tf_list is not None else len(bitmap),
+                                    len(encoded_postings_list) + len(encoded_tf_list))
+        if self.with_tf:
+            self.tf_lengths[term] = len(encoded_tf_list)
+            self.max_tfs[term], self.min_dls[term] = self.score_bounds(bitmap if doc_ids is None else doc_ids, tf_list)
         self.index_file.write(encoded_postings_list)
+        self.index_file.write(encoded_tf_list)
+
+    def is_dense(self, count, last_doc_id):
+        """Apakah postings list dengan count docID dan docID terakhir last_doc_id disimpan sebagai bitmap"""
+        return (self.bitmap_density is not None and count >= BITMAP_MIN_COUNT
+                and count >= self.bitmap_density * (last_doc_id + 1))
+
+    def write_positions(self, term, positions_list):
+        """Menulis region posisi sebuah term ke file posisi (lihat with_positions)"""
+        self.pos_starts[term] = self.positions_file.tell()
+        ends = array.array('I')
+        end = 0
+        for positions in positions_list:
+            encoded_positions = self.postings_encoding.encode(positions)
+            self.positions_file.write(encoded_positions)
+            end += len(encoded_positions)
+            ends.append(end)
+        self.positions_file.write(ends.tobytes())
+        self.pos_lengths[term] = end + len(ends) * SKIP_ITEM_SIZE
+
+    def copy_positions(self, term, sources, dropped_ranks=None):
+        """
+        Menulis region posisi sebuah term hasil penggabungan region posisi
+        term tersebut di sources (list of InvertedIndexReader, sesuai urutan
+        docID-nya) tanpa decode: posisi setiap dokumen di-encode mandiri,
+        sehingga cukup disalin apa adanya, dan hanya tabel offset yang digeser.
+
+        dropped_ranks (jika tidak None) berisi, untuk setiap source, himpunan
+        rank (lihat PostingsCursor.rank) dokumen yang postings-nya dibuang
+        (dokumen terhapus); posisi dokumen-dokumen tersebut tidak ikut ditulis.
+        """
+        if dropped_ranks is None:
+            dropped_ranks = [()] * len(sources)
+        self.pos_starts[term] = self.positions_file.tell()
+        end = 0
+        for index, dropped in zip(sources, dropped_ranks):
+            table_start = index.positions_table_start(term)
+            lists_start = index.postings_dict.extra('pos_start', term)
+            if len(dropped) == 0:
+                with index.buffer(lists_start, table_start - lists_start, positions=True) as encoded_positions:
+                    self.positions_file.write(encoded_positions)
+                end += table_start - lists_start
+                continue
+            ends = index.read_positions_offsets(table_start, index.postings_dict[term][1])
+            for rank, (start, stop) in enumerate(zip(itertools.chain([0], ends), ends)):
+                if rank not in dropped:
+                    with index.buffer(lists_start + start, stop - start, positions=True) as encoded_positions:
+                        self.positions_file.write(encoded_positions)
+                    end += stop - start
+        count = 0
+        base = 0
+        for index, dropped in zip(sources, dropped_ranks):
+            ends = index.read_positions_offsets(index.positions_table_start(term), index.postings_dict[term][1])
+            if len(dropped) == 0:
+                self.positions_file.write(array.array('I', (base + offset for offset in ends)).tobytes())
+                count += len(ends)
+                base += ends[-1] if len(ends) > 0 else 0
+                continue
+            kept_ends = array.array('I')
+            for rank, (start, stop) in enumerate(zip(itertools.chain([0], ends), ends)):
+                if rank not in dropped:
+                    base += stop - start
+                    kept_ends.append(base)
+            self.positions_file.write(kept_ends.tobytes())
+            count += len(kept_ends)
+        self.pos_lengths[term] = end + count * SKIP_ITEM_SIZE
+
+    def encode_tf(self, tf_list):
+        """TF stream dari tf_list, kosong jika index tidak menyimpan term frequency"""
+        return self.postings_encoding.encode_tf(tf_list) if self.with_tf else b""
+
+    def score_bounds(self, doc_ids, tf_list):
+        """(max_tf, min_dl) dari docIDs dan tf-nya, untuk upper bound skor"""
+        if not self.with_tf:
+            return 1, 0
+        if self.doc_length is None:
+            return max(tf_list), 0
+        return max(tf_list), min(self.doc_length[doc_id] for doc_id in doc_ids)
+
+    @contextlib.contextmanager
+    def postings_stream(self, term):
+        """
+        Context untuk menulis postings list sebuah term secara bertahap dalam
+        format block (hanya untuk block_size tidak None). Term dan metadatanya
+        dicatat ketika context selesai, kecuali jika tidak ada docID yang
+        ditulis (misalnya semua docID-nya terhapus, lihat BSBIIndex.merge).
+        Jika docID yang ditulis ternyata tidak lebih dari block_size,
+        postings list (paling banyak block_size docID) ditulis ulang tanpa
+        block lewat append, sesuai InvertedIndexReader.is_blocked. Postings
+        list yang dense harus diputuskan sebelum streaming dan ditulis dengan
+        append_bitmap (lihat BSBIIndex.merge); stream selalu ditulis dalam
+        block.
+        """
+        stream = PostingsStream(self)
+        yield stream
+        stream.flush()
+        if stream.count <= self.block_size:
+            doc_ids, tf_list = stream.decode()
+            self.index_file.seek(stream.start)
+            self.index_file.truncate()
+            if stream.count > 0:
+                self.append(term, doc_ids, tf_list)
+            return
+        stream.close()
+        self.terms.append(term)
+        self.postings_dict[term] = (stream.start, stream.count, stream.end)
+        if self.with_tf:
+            self.max_tfs[term], self.min_dls[term] = stream.max_tf, stream.min_dl
+
+
+class PostingsStream:
+    """
+    Menulis sebuah postings list dalam format block langsung ke index file
+    milik InvertedIndexWriter, tanpa perlu memegang seluruh postings list di
+    memori: yang ditahan hanyalah docID (beserta tf-nya jika with_tf) yang
+    belum memenuhi satu block dan skip table. Block yang sudah di-encode
+    (misalnya dari intermediate index saat merging) bisa disalin apa adanya
+    lewat add_block, tanpa decode dan encode ulang, karena setiap block
+    di-encode secara mandiri.
+
+    docID yang ditulis harus terurut naik dan lebih besar dari docID yang
+    sudah ditulis sebelumnya.
+    """
+    def __init__(self, writer):
+        self.writer = writer
+        self.start = writer.index_file.tell()
+        self.skip_table = array.array('I')
+        self.pending = []
+        self.pending_tf = []
+        self.count = 0
+        self.end = 0
+        self.max_tf = 0
+        self.min_dl = None
+
+    def extend(self, doc_ids, tf_list=None):
+        """Menambahkan docIDs (dan tf-nya), block penuh langsung di-encode dan ditulis"""
+        block_size = self.writer.block_size
+        self.pending.extend(doc_ids)
+        if self.writer.with_tf:
+            self.pending_tf.extend(tf_list)
+        if len(self.pending) >= block_size:
+            full = len(self.pending) - len(self.pending) % block_size
+            for start in range(0, full, block_size):
+                block = self.pending[start:start + block_size]
+                tf_block = self.pending_tf[start:start + block_size]
+                self.write_block(self.writer.postings_encoding.encode(block), self.writer.encode_tf(tf_block),
+                                 block[-1], block_size, *self.writer.score_bounds(block, tf_block))
+            del self.pending[:full]
+            del self.pending_tf[:full]
+
+    def add_block(self, encoded_block, encoded_tf_block, last_doc_id, count, max_tf=1, min_dl=0):
+        """
+        Menambahkan sebuah block (beserta TF stream dan entry skip table-nya,
+        lihat InvertedIndexReader.iter_blocks) yang sudah di-encode dengan
+        postings_encoding yang sama. Block penuh disalin apa adanya, block
+        yang lebih kecil digabung dengan docID lain agar tidak banyak block
+        kecil.
+        """
+        if count < self.writer.block_size:
+            tf_list = self.writer.postings_encoding.decode_tf(encoded_tf_block) if self.writer.with_tf else None
+            self.extend(self.writer.postings_encoding.decode(encoded_block), tf_list)
+            return
+        self.flush()
+        self.write_block(encoded_block, encoded_tf_block, last_doc_id, count, max_tf, min_dl)
+
+    def flush(self):
+        if len(self.pending) > 0:
+            self.write_block(self.writer.postings_encoding.encode(self.pending), self.writer.encode_tf(self.pending_tf),
+                             self.pending[-1], len(self.pending), *self.writer.score_bounds(self.pending, self.pending_tf))
+            self.pending = []
+            self.pending_tf = []
+
+    def write_block(self, encoded_block, encoded_tf_block, last_doc_id, count, max_tf, min_dl):
+        self.writer.index_file.write(encoded_block)
+        self.writer.index_file.write(encoded_tf_block)
+        tf_start = self.end + len(encoded_block)
+        self.end = tf_start + len(encoded_tf_block)
+        self.count += count
+        self.skip_table.extend((last_doc_id, count, self.end))
+        if self.writer.with_tf:
+            self.skip_table.extend((tf_start, max_tf, min_dl))
+            self.max_tf = max(self.max_tf, max_tf)
+            self.min_dl = min_dl if self.min_dl is None else min(self.min_dl, min_dl)
+
+    def decode(self):
+        """(docIDs, tf) dari semua block yang sudah ditulis"""
+        self.writer.index_file.seek(self.start)
+        data = self.writer.index_file.read(self.end)
+        doc_ids, tf_list = [], []
+        entry_length = self.writer.skip_entry_length
+        start = 0
+        for i in range(0, len(self.skip_table), entry_length):
+            end = self.skip_table[i + 2]
+            tf_start = self.skip_table[i + 3] if self.writer.with_tf else end
+            doc_ids.extend(self.writer.postings_encoding.decode(data[start:tf_start]))
+            if self.writer.with_tf:
+                tf_list.extend(self.writer.postings_encoding.decode_tf(data[tf_start:end]))
+            start = end
+        return doc_ids, (tf_list if self.writer.with_tf else None)
+
+    def close(self):
+        """Menulis sisa docID dan skip table di akhir postings list"""
+        self.flush()
+        self.skip_table.append(len(self.skip_table) // self.writer.skip_entry_length)
+        self.writer.index_file.write(self.skip_table.tobytes())
+        self.end += len(self.skip_table) * SKIP_ITEM_SIZE
 
 if __name__ == "__main__":
-    try:
-        os.mkdir("tmp")
-    except:
-        pass
+    import tempfile
+
+    # file-file test ditulis di directory sementara, bukan di working tree
+    test_directory = tempfile.TemporaryDirectory()
+    tmp = test_directory.name
 
     from compression import StandardPostings, VBEPostings, EliasGammaPostings
 
-    with InvertedIndexWriter('test-standard', postings_encoding=StandardPostings, directory='./tmp/') as index:
+    with InvertedIndexWriter('test-standard', postings_encoding=StandardPostings, directory=tmp) as index:
         index.append(1, [2, 3, 4, 8, 10])
         index.append(2, [3, 4, 5])
         index.index_file.seek(0)
@@ -208,7 +1448,7 @@ if __name__ == "__main__":
         assert StandardPostings.decode(index.index_file.read(index.postings_dict[1][2])) == [2, 3, 4, 8, 10], "posisi postings salah"
         assert StandardPostings.decode(index.index_file.read(index.postings_dict[2][2])) == [3, 4, 5], "posisi postings salah"
 
-    with InvertedIndexWriter('test-vbe', postings_encoding=VBEPostings, directory='./tmp/') as index:
+    with InvertedIndexWriter('test-vbe', postings_encoding=VBEPostings, directory=tmp) as index:
         index.append(1, [2, 3, 4, 8, 10])
         index.append(2, [3, 4, 5])
         index.index_file.seek(0)
@@ -225,7 +1465,7 @@ if __name__ == "__main__":
         assert VBEPostings.decode(index.index_file.read(index.postings_dict[1][2])) == [2, 3, 4, 8, 10], "terdapat kesalahan"
         assert VBEPostings.decode(index.index_file.read(index.postings_dict[2][2])) == [3, 4, 5], "terdapat kesalahan"
 
-    with InvertedIndexWriter('test-eliasgamma', postings_encoding=EliasGammaPostings, directory='./tmp/') as index:
+    with InvertedIndexWriter('test-eliasgamma', postings_encoding=EliasGammaPostings, directory=tmp) as index:
         index.append(1, [2, 3, 4, 8, 10])
         index.append(2, [3, 4, 5])
         index.index_file.seek(0)
@@ -243,8 +1483,8 @@ if __name__ == "__main__":
         assert EliasGammaPostings.decode(index.index_file.read(index.postings_dict[2][2])) == [3, 4, 5], "terdapat kesalahan"
 
 
-    with InvertedIndexReader('test-standard', postings_encoding=StandardPostings, directory='./tmp/') as index:
-        assert index.terms == [1,2], "terms salah"
+    with InvertedIndexReader('test-standard', postings_encoding=StandardPostings, directory=tmp) as index:
+        assert list(index.terms) == [1,2], "terms salah"
         assert index.postings_dict == {1: (0, 5, len(StandardPostings.encode([2,3,4,8,10]))),
                                        2: (len(StandardPostings.encode([2,3,4,8,10])), 3,
                                            len(StandardPostings.encode([3,4,5])))}, "postings dictionary salah"
@@ -258,8 +1498,8 @@ if __name__ == "__main__":
         index.reset()
         assert next(index) == (1, [2,3,4,8,10])
 
-    with InvertedIndexReader('test-vbe', postings_encoding=VBEPostings, directory='./tmp/') as index:
-        assert index.terms == [1,2], "terms salah"
+    with InvertedIndexReader('test-vbe', postings_encoding=VBEPostings, directory=tmp) as index:
+        assert list(index.terms) == [1,2], "terms salah"
         assert index.postings_dict == {1: (0, 5, len(VBEPostings.encode([2,3,4,8,10]))),
                                        2: (len(VBEPostings.encode([2,3,4,8,10])), 3,
                                            len(VBEPostings.encode([3,4,5])))}, "postings dictionary salah"
@@ -273,8 +1513,8 @@ if __name__ == "__main__":
         index.reset()
         assert next(index) == (1, [2,3,4,8,10])
 
-    with InvertedIndexReader('test-eliasgamma', postings_encoding=EliasGammaPostings, directory='./tmp/') as index:
-        assert index.terms == [1,2], "terms salah"
+    with InvertedIndexReader('test-eliasgamma', postings_encoding=EliasGammaPostings, directory=tmp) as index:
+        assert list(index.terms) == [1,2], "terms salah"
         assert index.postings_dict == {1: (0, 5, len(EliasGammaPostings.encode([2,3,4,8,10]))),
                                        2: (len(EliasGammaPostings.encode([2,3,4,8,10])), 3,
                                            len(EliasGammaPostings.encode([3,4,5])))}, "postings dictionary salah"
@@ -288,3 +1528,241 @@ if __name__ == "__main__":
         index.reset()
         assert next(index) == (1, [2,3,4,8,10])
 
+    reader = InvertedIndexReader('test-vbe', postings_encoding=VBEPostings, directory=tmp).open()
+    metadata_mtime = os.stat(reader.metadata_file_path).st_mtime_ns
+    for _ in range(3):
+        assert reader.get_postings_list(1) == [2, 3, 4, 8, 10]
+        assert reader.get_postings_list(2) == [3, 4, 5]
+    reader.close()
+    assert os.stat(reader.metadata_file_path).st_mtime_ns == metadata_mtime, "reader tidak boleh menulis metadata"
+
+    for Postings, index_name in [(StandardPostings, 'test-standard'), (VBEPostings, 'test-vbe'),
+                                 (EliasGammaPostings, 'test-eliasgamma')]:
+        with InvertedIndexReader(index_name, postings_encoding=Postings, directory=tmp, use_mmap=True) as index:
+            assert index.index_mmap is not None, "index file harus di-mmap"
+            assert index.get_postings_list(2) == [3, 4, 5]
+            assert index.get_postings_list(1) == [2, 3, 4, 8, 10]
+            index.reset()
+            assert list(index) == [(1, [2, 3, 4, 8, 10]), (2, [3, 4, 5])]
+
+    # TermDictionary: termID sparse dan postings list yang tidak ditulis berurutan
+    TermDictionary.write(os.path.join(tmp, 'test-termdict.dict'), {70000: (9, 2, 4), 5: (0, 1, 9), 9: (13, 300, 1)})
+    dictionary = TermDictionary(os.path.join(tmp, 'test-termdict.dict'))
+    assert list(dictionary) == [5, 9, 70000], "terms TermDictionary salah"
+    assert 'length' in dictionary.columns, "kolom length harus disimpan"
+    assert dictionary[70000] == (9, 2, 4) and dictionary[5] == (0, 1, 9) and dictionary[9] == (13, 300, 1)
+    assert 6 not in dictionary and dictionary.get(6) is None
+    dictionary.close()
+    assert not os.path.exists(os.path.join(tmp, 'test-termdict.dict.tmp')), ".dict harus ditulis lewat rename"
+    with open(os.path.join(tmp, 'test-rusak.dict'), 'wb') as f:
+        f.write(b"bukan dict")
+    with open(os.path.join(tmp, 'test-rusak.index'), 'wb') as f:
+        pass
+    try:
+        InvertedIndexReader('test-rusak', postings_encoding=VBEPostings, directory=tmp).open()
+        assert False, ".dict yang tidak valid harus ditolak"
+    except ValueError:
+        pass
+
+    # postings list dalam block + skip table (postings_list ini dense, sehingga
+    # bitmap dimatikan)
+    postings_list = list(range(1, 2000, 3))
+    for Postings in [StandardPostings, VBEPostings, EliasGammaPostings]:
+        with InvertedIndexWriter('test-blocks', postings_encoding=Postings, directory=tmp, block_size=64,
+                                 bitmap_density=None) as index:
+            index.append(1, postings_list)
+            index.append(2, [5, 7])
+        for use_mmap in [False, True]:
+            with InvertedIndexReader('test-blocks', postings_encoding=Postings, directory=tmp, use_mmap=use_mmap) as index:
+                assert list(index.get_postings_list(1)) == postings_list, "decoding block salah"
+                assert list(index.get_postings_list(2)) == [5, 7]
+                cursor = index.get_postings_cursor(1)
+                assert len(cursor.lasts) == 11 and cursor.blocks_decoded == 0, "skip table salah"
+                assert cursor.intersect([4, 5, 1000, 1999, 5000]) == [4, 1000, 1999], "intersection block salah"
+                assert cursor.blocks_decoded == 3, "block yang tidak dibutuhkan tidak boleh di-decode"
+                assert index.get_postings_cursor(2).intersect([1, 5, 6, 7, 8]) == [5, 7]
+                assert index.get_postings_cursor(1).difference([4, 5, 1000, 5000]) == [5, 5000], "difference salah"
+                assert intersect_cursors([4, 5, 7, 1000, 5000], [index.get_postings_cursor(1),
+                                                                 index.get_postings_cursor(2)]) == [7], \
+                    "intersect_cursors salah"
+
+    # streaming: block penuh disalin apa adanya, sisa docID digabung
+    with InvertedIndexWriter('test-stream', postings_encoding=VBEPostings, directory=tmp, block_size=64,
+                             bitmap_density=None) as index:
+        with index.postings_stream(1) as stream:
+            stream.add_block(VBEPostings.encode(list(range(64))), b"", 63, 64)
+            stream.extend([100, 101])
+            stream.add_block(VBEPostings.encode([200, 201]), b"", 201, 2)
+            stream.extend(range(300, 400))
+    with InvertedIndexReader('test-stream', postings_encoding=VBEPostings, directory=tmp) as index:
+        expected = list(range(64)) + [100, 101, 200, 201] + list(range(300, 400))
+        assert list(index.get_postings_list(1)) == expected, "streaming block salah"
+        assert list(index.read_skip_table(1).counts) == [64, 64, 40], "block tidak terisi penuh"
+        assert [block[2] for block in index.iter_blocks(1)] == [63, 359, 399]
+
+    # stream yang hanya berisi <= block_size docID ditulis ulang tanpa block
+    with InvertedIndexWriter('test-stream', postings_encoding=VBEPostings, directory=tmp,
+                             block_size=64, with_tf=True) as index:
+        with index.postings_stream(1) as stream:
+            stream.add_block(VBEPostings.encode(list(range(64))), VBEPostings.encode_tf([2] * 64), 63, 64, 2, 0)
+        with index.postings_stream(2) as stream:
+            pass
+        index.append(3, [5, 7], [3, 1])
+    with InvertedIndexReader('test-stream', postings_encoding=VBEPostings, directory=tmp) as index:
+        assert list(index.terms) == [1, 3], "term tanpa docID tidak boleh dicatat"
+        assert [list(x) for x in index.get_postings_and_tf(1)] == [list(range(64)), [2] * 64], "stream pendek salah"
+        assert [list(x) for x in index.get_postings_and_tf(3)] == [[5, 7], [3, 1]]
+
+    # term frequency: postings list pendek dan dalam block
+    tf_list = [doc_id % 5 + 1 for doc_id in postings_list]
+    for Postings in [StandardPostings, VBEPostings, EliasGammaPostings]:
+        with InvertedIndexWriter('test-tf', postings_encoding=Postings, directory=tmp,
+                                 block_size=64, with_tf=True, bitmap_density=None) as index:
+            index.append(1, postings_list, tf_list)
+            index.append(2, [5, 7], [3, 1])
+        with InvertedIndexReader('test-tf', postings_encoding=Postings, directory=tmp) as index:
+            postings, tfs = index.get_postings_and_tf(1)
+            assert list(postings) == postings_list and list(tfs) == tf_list, "decoding tf salah"
+            assert list(index.get_postings_list(2)) == [5, 7]
+            assert [list(x) for x in index.get_postings_and_tf(2)] == [[5, 7], [3, 1]]
+            cursor = index.get_postings_cursor(1)
+            assert cursor.advance(1000) == 1000 and cursor.tf() == 1000 % 5 + 1, "tf cursor salah"
+            cursor = index.get_postings_cursor(2)
+            assert cursor.advance(6) == 7 and cursor.tf() == 1
+
+    # postings cache: decode sekali, lalu dilayani dari cache
+    from util import LRUCache
+    cache = LRUCache(max_bytes=1 << 20)
+    with InvertedIndexReader('test-tf', postings_encoding=EliasGammaPostings, directory=tmp,
+                             postings_cache=cache) as index:
+        assert list(index.get_postings_list(1)) == postings_list
+        assert [list(x) for x in index.get_postings_and_tf(1)] == [postings_list, tf_list], "postings dari cache salah"
+        assert [list(x) for x in index.get_postings_and_tf(2)] == [[5, 7], [3, 1]]
+        assert (cache.hits, cache.misses, len(cache)) == (1, 2, 2), "postings cache salah"
+
+    # upper bound skor: max_tf dan min_dl per block dan per term
+    doc_length = array.array('I', [doc_id % 7 + 10 for doc_id in range(2000)])
+    with InvertedIndexWriter('test-tf', postings_encoding=VBEPostings, directory=tmp,
+                             block_size=64, with_tf=True, doc_length=doc_length, bitmap_density=None) as index:
+        index.append(1, postings_list, tf_list)
+        index.append(2, [5, 7], [3, 1])
+    with InvertedIndexReader('test-tf', postings_encoding=VBEPostings, directory=tmp) as index:
+        skip_table = index.read_skip_table(1)
+        for block in range(len(skip_table.lasts)):
+            block_docs = postings_list[block * 64:(block + 1) * 64]
+            assert skip_table.max_tfs[block] == max(tf_list[block * 64:(block + 1) * 64]), "max_tf block salah"
+            assert skip_table.min_dls[block] == min(doc_length[doc_id] for doc_id in block_docs), "min_dl block salah"
+        assert index.postings_dict.extra('max_tf', 1) == 5 and index.postings_dict.extra('min_dl', 1) == 10
+        assert index.postings_dict.extra('max_tf', 2) == 3 and index.postings_dict.extra('min_dl', 2) == 10
+        cursor = index.get_postings_cursor(1)
+        assert cursor.block_bounds(1000)[0] == postings_list[(postings_list.index(1000) // 64 + 1) * 64 - 1]
+        assert cursor.block_bounds(5000) is None
+
+    # posisi: file .pos terpisah, dibaca per dokumen lewat rank cursor
+    positions_list = [[i * 3 + doc_id % 3 + 1 for i in range(tf)] for doc_id, tf in zip(postings_list, tf_list)]
+    for Postings in [StandardPostings, VBEPostings, EliasGammaPostings]:
+        with InvertedIndexWriter('test-pos', postings_encoding=Postings, directory=tmp,
+                                 block_size=64, with_tf=True, with_positions=True) as index:
+            index.append(1, postings_list, tf_list, positions_list)
+            index.append(2, [5, 7], [3, 1], [[1, 4, 9], [2]])
+        with InvertedIndexWriter('test-pos-2', postings_encoding=Postings, directory=tmp,
+                                 block_size=64, with_tf=True, with_positions=True) as index:
+            index.append(2, [3000, 3001], [1, 2], [[6], [2, 8]])
+        for use_mmap in [False, True]:
+            with InvertedIndexReader('test-pos', postings_encoding=Postings, directory=tmp, use_mmap=use_mmap) as index:
+                assert index.with_positions and index.get_postings_list(2) == [5, 7]
+                cursor = index.get_postings_cursor(1)
+                assert cursor.advance(1000) == 1000 and cursor.rank() == postings_list.index(1000), "rank cursor salah"
+                assert list(index.get_positions(1, cursor.rank())) == positions_list[cursor.rank()], "posisi salah"
+                assert [list(index.get_positions(2, rank)) for rank in range(2)] == [[1, 4, 9], [2]]
+        with InvertedIndexWriter('test-pos-merged', postings_encoding=Postings, directory=tmp,
+                                 with_tf=True, with_positions=True) as merged_index:
+            with InvertedIndexReader('test-pos', postings_encoding=Postings, directory=tmp) as index, \
+                 InvertedIndexReader('test-pos-2', postings_encoding=Postings, directory=tmp) as index_2:
+                merged_index.copy_positions(2, [index, index_2])
+                merged_index.append(2, [5, 7, 3000, 3001], [3, 1, 1, 2])
+        with InvertedIndexReader('test-pos-merged', postings_encoding=Postings, directory=tmp) as index:
+            assert [list(index.get_positions(2, rank)) for rank in range(4)] == [[1, 4, 9], [2], [6], [2, 8]], \
+                "penggabungan posisi salah"
+
+    # beberapa segment: postings list, cursor, dan posisi digabung sesuai urutan segment
+    with InvertedIndexWriter('test-segment-2', postings_encoding=EliasGammaPostings, directory=tmp,
+                             block_size=64, with_tf=True, with_positions=True, bitmap_density=None) as index:
+        index.append(2, [3000, 3001], [1, 2], [[6], [2, 8]])
+        index.append(3, list(range(2000, 2200)), [1] * 200, [[1]] * 200)
+    segments = SegmentedIndexReader([InvertedIndexReader(index_name, postings_encoding=EliasGammaPostings,
+                                                         directory=tmp).open()
+                                     for index_name in ['test-pos', 'test-segment-2']])
+    assert segments.document_frequency(1) == len(postings_list) and segments.document_frequency(2) == 4
+    assert segments.document_frequency(4) == 0
+    assert segments.get_postings_and_tf(2) == ([5, 7, 3000, 3001], [3, 1, 1, 2]), "postings list segment salah"
+    cursor = segments.get_postings_cursor(2)
+    assert cursor.intersect([1, 7, 2999, 3001]) == [7, 3001] and cursor.tf() == 2, "cursor segment salah"
+    assert list(segments.get_positions(2, cursor.rank())) == [2, 8]
+    cursor = segments.get_postings_cursor(3)
+    assert cursor.block_bounds(100) == (2063, 1, 0) and len(cursor) == 200
+    postings_lists = segments.get_postings_lists([3, 2, 4, 2])
+    assert sorted(postings_lists) == [2, 3] and postings_lists[2] == [5, 7, 3000, 3001], "get_postings_lists salah"
+    assert postings_lists[3] == list(range(2000, 2200))
+    segments.close()
+
+    # posisi dokumen yang terhapus tidak ikut disalin
+    with InvertedIndexWriter('test-pos-merged', postings_encoding=EliasGammaPostings, directory=tmp,
+                             with_tf=True, with_positions=True) as merged_index:
+        with InvertedIndexReader('test-pos', postings_encoding=EliasGammaPostings, directory=tmp) as index, \
+             InvertedIndexReader('test-pos-2', postings_encoding=EliasGammaPostings, directory=tmp) as index_2:
+            merged_index.append(2, [5, 3001], [3, 2])
+            merged_index.copy_positions(2, [index, index_2], [{1}, {0}])
+    with InvertedIndexReader('test-pos-merged', postings_encoding=EliasGammaPostings, directory=tmp) as index:
+        assert [list(index.get_positions(2, rank)) for rank in range(2)] == [[1, 4, 9], [2, 8]], \
+            "posisi dokumen terhapus salah"
+
+    # term yang dense disimpan sebagai bitmap, term lain tetap memakai codec
+    dense_list = list(range(0, 3000, 2))
+    dense_tf = [doc_id % 4 + 1 for doc_id in dense_list]
+    with InvertedIndexWriter('test-bitmap', postings_encoding=VBEPostings, directory=tmp,
+                             block_size=64, with_tf=True) as index:
+        index.append(1, dense_list, dense_tf)
+        index.append(2, [5, 7, 2999], [3, 1, 2])
+        index.append_bitmap(3, RoaringBitmap.from_sorted_chunks(dense_list[start:start + 64]
+                                                                for start in range(0, len(dense_list), 64)), dense_tf)
+        index.append(4, list(range(0, 300000, 1000)), [1] * 300)
+        # stream selalu ditulis dalam block, dense atau tidak ditentukan sebelum streaming
+        with index.postings_stream(5) as stream:
+            stream.extend(dense_list, dense_tf)
+    for use_mmap in [False, True]:
+        with InvertedIndexReader('test-bitmap', postings_encoding=VBEPostings, directory=tmp,
+                                 use_mmap=use_mmap) as index:
+            assert index.postings_dict.extra('bitmap_length', 1) > 0 and index.postings_dict.extra('bitmap_length', 3) > 0
+            assert index.get_postings_bitmap(2) is None and index.get_postings_bitmap(4) is None, "term sparse salah"
+            assert not index.is_blocked(1) and index.is_blocked(4)
+            assert [list(x) for x in index.get_postings_and_tf(1)] == [dense_list, dense_tf], "decoding bitmap salah"
+            assert index.get_postings_and_tf(3) == (dense_list, dense_tf), "append_bitmap salah"
+            assert index.is_blocked(5) and index.get_postings_list(5) == dense_list, "stream harus ditulis dalam block"
+            assert [index.last_doc_id(term) for term in [1, 2, 4, 5]] == [2998, 2999, 299000, 2998], "last_doc_id salah"
+            for term in [1, 2, 4, 5]:
+                chunks = list(index.iter_postings(term))
+                assert [doc_id for doc_ids, _ in chunks for doc_id in doc_ids] == index.get_postings_list(term)
+                assert [tf for _, tfs in chunks for tf in tfs] == list(index.get_postings_and_tf(term)[1])
+            bitmap = index.get_postings_bitmap(1)
+            assert len(bitmap) == len(dense_list) and (bitmap & index.get_postings_bitmap(3)).to_list() == dense_list
+            cursor = index.get_postings_cursor(1)
+            assert cursor.intersect([1, 4, 7, 2998, 5000]) == [4, 2998], "intersection bitmap salah"
+            assert cursor.difference([1, 4, 7, 2998, 5000]) == [1, 7, 5000], "difference bitmap salah"
+            assert cursor.blocks_decoded == 0 and cursor.block_bounds(5000) is None, "bitmap tidak boleh di-decode"
+            assert cursor.block_bounds(1001) == (2998, 3, 0)
+            cursor = index.get_postings_cursor(1)
+            assert cursor.advance(1001) == 1002 and cursor.tf() == 1002 % 4 + 1 and cursor.rank() == 501
+            assert cursor.blocks_decoded == 1
+    with InvertedIndexWriter('test-segment-2', postings_encoding=VBEPostings, directory=tmp, with_tf=True) as index:
+        index.append(1, list(range(3000, 3200)), [1] * 200)
+    segments = SegmentedIndexReader([InvertedIndexReader(index_name, postings_encoding=None, directory=tmp).open()
+                                     for index_name in ['test-bitmap', 'test-segment-2']])
+    assert segments.get_postings_bitmap(1).to_list() == dense_list + list(range(3000, 3200)), "bitmap segment salah"
+    assert segments.get_postings_bitmap(2) is None and segments.get_postings_bitmap(5) is None
+    cursor = segments.get_postings_cursor(1)
+    assert cursor.intersect([2, 3, 3100]) == [2, 3100] and cursor.cursors[0].blocks_decoded == 0
+    assert segments.get_postings_cursor(1).difference([2, 3, 2999, 3100, 3200, 4000]) == [3, 2999, 3200, 4000]
+    assert segments.get_postings_cursor(2).difference([5, 6, 3001]) == [6, 3001], "difference segment salah"
+    segments.close()
+    test_directory.cleanup()
@@ -0,0 +1,300 @@
+import argparse
+import ast
+import contextlib
+import cProfile
+import functools
+import inspect
+import json
+import os
+import runpy
+import sys
+import threading
+import time
+import tracemalloc
+
+import bsbi
+import compression
+import index
+import util
+
+# Banyaknya baris alokasi terbesar yang dicatat di report jika tracemalloc aktif
+TRACEMALLOC_TOP = 10
+
+
+class Profiler:
+    """
+    Kumpulan timer (banyaknya pemanggilan dan total waktu) dan counter
+    bernama, thread-safe. Timer bersifat inklusif: waktu "clean" sudah
+    termasuk waktu "stem" dan "tokenize" di dalamnya.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timers = {}
+        self.counters = {}
+
+    def add(self, name, seconds):
+        """Mencatat satu pemanggilan timer name yang berlangsung seconds detik"""
+        with self.lock:
+            timer = self.timers.get(name)
+            if timer is None:
+                self.timers[name] = [1, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+
+    def count(self, name, n=1):
+        """Menambahkan n ke counter name"""
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """Context untuk mengukur sebuah bagian kode secara manual sebagai timer name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def reset(self):
+        with self.lock:
+            self.timers.clear()
+            self.counters.clear()
+
+    def report(self):
+        """
+        Returns
+        -------
+        dict
+            {'timers': {name: {'calls', 'seconds', 'mean_us'}}, 'counters': {name: n}},
+            timer terurut dari total waktu terbesar
+        """
+        with self.lock:
+            timers = sorted(self.timers.items(), key=lambda item: -item[1][1])
+            return {'timers': {name: {'calls': calls, 'seconds': seconds, 'mean_us': seconds / calls * 1e6}
+                               for name, (calls, seconds) in timers},
+                    'counters': dict(sorted(self.counters.items()))}
+
+
+# Profiler global yang diisi oleh hook-hook di HOOKS
+PROFILER = Profiler()
+
+
+def count_length(args, result):
+    return len(result)
+
+
+def count_postings(args, result):
+    return len(result[0]) if result[0] is not None else 0
+
+
+def count_buffer_bytes(args, result):
+    # InvertedIndexReader.buffer(self, position, length, ...)
+    return args[2]
+
+
+# Hot path yang diukur: (object pemilik, nama atribut, nama timer, counter).
+# counter adalah None atau (satuan, fungsi (args, hasil) -> n), yang
+# menambahkan n ke counter "<nama timer>.<satuan>" setiap pemanggilan. Codec
+# diukur per class, sehingga decode setiap codec punya timer sendiri.
+HOOKS = [
+    (bsbi.Cleaner, 'clean_and_tokenize', 'clean', ('tokens', count_length)),
+    (bsbi.TextNormalizer, 'normalize_text', 'clean.normalize', None),
+    (bsbi.Cleaner, 'stem', 'clean.stem', None),
+    (bsbi.Cleaner.stemmer, 'stem', 'clean.stem.sastrawi', None),
+    (bsbi.Cleaner.stop_word_remover, 'remove', 'clean.stopwords', None),
+    (bsbi, 'word_tokenize', 'clean.tokenize', None),
+    (util.IdMap, '__getitem__', 'idmap.lookup', None),
+    (bsbi.BSBIIndex, 'index', 'index', None),
+    (bsbi.BSBIIndex, 'parse_block', 'index.parse_block', ('pairs', count_length)),
+    (bsbi.BSBIIndex, 'invert_write', 'index.invert_write', None),
+    (bsbi.BSBIIndex, 'merge_intermediate_indices', 'index.merge', None),
+    (bsbi.BSBIIndex, 'merge', 'merge.step', None),
+    (bsbi.BSBIIndex, 'merge_segments', 'merge.segments', None),
+    (bsbi.BSBIIndex, 'update', 'update', None),
+    (bsbi.BSBIIndex, 'retrieve', 'retrieve.and', None),
+    (bsbi.BSBIIndex, 'retrieve_many', 'retrieve.many', ('queries', count_length)),
+    (bsbi.BSBIIndex, 'retrieve_boolean', 'retrieve.boolean', None),
+    (bsbi.BSBIIndex, 'retrieve_phrase', 'retrieve.phrase', None),
+    (bsbi.BSBIIndex, 'retrieve_proximity', 'retrieve.proximity', None),
+    (bsbi.BSBIIndex, 'retrieve_tfidf', 'retrieve.tfidf', None),
+    (bsbi.BSBIIndex, 'retrieve_bm25', 'retrieve.bm25', None),
+    (bsbi.BSBIIndex, 'retrieve_maxscore', 'retrieve.maxscore', None),
+    (index.InvertedIndexReader, 'buffer', 'postings.read', ('bytes', count_buffer_bytes)),
+    (index.InvertedIndexReader, 'decode_postings', 'postings.decode', ('postings', count_postings)),
+    (index.InvertedIndexReader, 'get_positions', 'postings.positions', None),
+    (index.PostingsCursor, 'intersect', 'intersect', ('docs', count_length)),
+    (bsbi, 'intersect_cursors', 'intersect.cursors', ('docs', count_length)),
+    (bsbi, 'intersect_many', 'intersect.many', ('docs', count_length)),
+    (util, 'sorted_intersect', 'intersect.sorted', ('docs', count_length)),
+    (util.RoaringBitmap, 'intersect_sorted', 'intersect.bitmap', ('docs', count_length)),
+] + [(codec, method, f'codec.{codec.__name__}.{method}', ('values', count_length))
+     for codec in compression.CODECS.values() for method in ['decode', 'decode_tf']]
+
+# (object pemilik, nama atribut, atribut asli) dari hook yang sedang terpasang
+installed = []
+
+
+def timed(name, function, count):
+    """Membungkus function agar setiap pemanggilannya dicatat di PROFILER"""
+    if inspect.isgeneratorfunction(getattr(function, '__wrapped__', None)):
+        # context manager (misalnya InvertedIndexReader.buffer): yang diukur
+        # adalah waktu masuk ke context
+        @functools.wraps(function)
+        @contextlib.contextmanager
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            with function(*args, **kwargs) as value:
+                PROFILER.add(name, time.perf_counter() - start)
+                if count is not None:
+                    PROFILER.count(f"{name}.{count[0]}", count[1](args, value))
+                yield value
+        return wrapper
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        PROFILER.add(name, time.perf_counter() - start)
+        if count is not None:
+            PROFILER.count(f"{name}.{count[0]}", count[1](args, result))
+        return result
+    return wrapper
+
+
+def enable():
+    """
+    Memasang hook di semua hot path pada HOOKS. Selama tidak di-enable, kode
+    index dan retrieval tidak diubah sama sekali, sehingga instrumentasi
+    tidak menambah overhead. Hanya process ini yang diukur: pekerjaan di
+    worker process (index(processes=...)) tidak tercatat.
+    """
+    if installed:
+        return
+    # atribut asli diambil dulu semuanya, karena codec turunan (misalnya
+    # NumpyVBEPostings.decode_tf) mewarisi method dari class yang juga di-hook
+    originals = [(owner, attribute, inspect.getattr_static(owner, attribute), name, count)
+                 for owner, attribute, name, count in HOOKS]
+    for owner, attribute, original, name, count in originals:
+        if isinstance(owner, type) and isinstance(original, staticmethod):
+            wrapper = staticmethod(timed(name, original.__func__, count))
+        elif isinstance(owner, type) and isinstance(original, classmethod):
+            wrapper = classmethod(timed(name, original.__func__, count))
+        elif isinstance(owner, type) or inspect.ismodule(owner):
+            wrapper = timed(name, original, count)
+        else:
+            wrapper = timed(name, getattr(owner, attribute), count)
+        installed.append((owner, attribute, vars(owner).get(attribute)))
+        setattr(owner, attribute, wrapper)
+
+
+def disable():
+    """Melepas semua hook yang dipasang oleh enable()"""
+    while installed:
+        owner, attribute, original = installed.pop()
+        if original is None:
+            delattr(owner, attribute)
+        else:
+            setattr(owner, attribute, original)
+
+
+@contextlib.contextmanager
+def profile(report_path=None, cprofile_path=None, trace_memory=False):
+    """
+    Context yang mengaktifkan instrumentasi (PROFILER dikosongkan dahulu),
+    opsional dengan cProfile dan / atau tracemalloc. Yang diberikan adalah
+    dictionary report, yang terisi setelah context selesai: isi
+    PROFILER.report(), wall_seconds, dan jika trace_memory, penggunaan memori
+    (current / peak bytes dan TRACEMALLOC_TOP baris alokasi terbesar).
+
+    Parameters
+    ----------
+    report_path: str
+        Jika diberikan, report ditulis ke file ini sebagai JSON
+    cprofile_path: str
+        Jika diberikan, statistik cProfile ditulis ke file ini (format pstats)
+    trace_memory: bool
+        Apakah alokasi memori dilacak dengan tracemalloc
+    """
+    report = {}
+    PROFILER.reset()
+    profiler = cProfile.Profile() if cprofile_path is not None else None
+    if trace_memory:
+        tracemalloc.start()
+    enable()
+    if profiler is not None:
+        profiler.enable()
+    start = time.perf_counter()
+    try:
+        yield report
+    finally:
+        wall_seconds = time.perf_counter() - start
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(cprofile_path)
+        disable()
+        report.update(PROFILER.report())
+        report['wall_seconds'] = wall_seconds
+        if trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics('lineno')[:TRACEMALLOC_TOP]
+            tracemalloc.stop()
+            report['memory'] = {'current_bytes': current, 'peak_bytes': peak,
+                                'top': [{'location': str(stat.traceback), 'bytes': stat.size, 'count': stat.count}
+                                        for stat in top]}
+        if report_path is not None:
+            with open(report_path, 'w') as f:
+                json.dump(report, f, indent=2)
+
+
+def print_report(report, file=sys.stderr):
+    """Mencetak report dari profile(...) dalam bentuk tabel"""
+    print(f"wall time {report['wall_seconds']:.3f}s", file=file)
+    print(f"{'timer':<40} {'calls':>10} {'seconds':>10} {'mean us':>10}", file=file)
+    for name, timer in report['timers'].items():
+        print(f"{name:<40} {timer['calls']:>10} {timer['seconds']:>10.4f} {timer['mean_us']:>10.1f}", file=file)
+    for name, n in report['counters'].items():
+        print(f"{name:<40} {n:>10}", file=file)
+    if 'memory' in report:
+        print(f"memory peak {report['memory']['peak_bytes'] / 1024 / 1024:.1f} MB", file=file)
+        for stat in report['memory']['top']:
+            print(f"  {stat['bytes'] / 1024:10.1f} KB  {stat['location']}", file=file)
+
+
+def run_script(path):
+    """
+    Menjalankan script seperti python path. Jika script adalah module yang
+    di-hook (misalnya bsbi.py), hanya blok if __name__ == "__main__" yang
+    dijalankan, di namespace module yang sudah di-import, agar class yang
+    dipakai adalah class yang sudah di-hook (bukan definisi ulang).
+    """
+    for module in [bsbi, compression, index, util]:
+        if os.path.abspath(module.__file__) == os.path.abspath(path):
+            break
+    else:
+        runpy.run_path(path, run_name='__main__')
+        return
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    body = [statement for node in tree.body
+            if isinstance(node, ast.If) and isinstance(node.test, ast.Compare)
+            and isinstance(node.test.left, ast.Name) and node.test.left.id == '__name__'
+            for statement in node.body]
+    exec(compile(ast.Module(body, type_ignores=[]), path, 'exec'), dict(vars(module), __name__='__main__'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description="Menjalankan sebuah script (misalnya bsbi.py atau search.py) dengan instrumentasi",
+        usage="python profiling.py [--report REPORT] [--cprofile CPROFILE] [--tracemalloc] script [args ...]")
+    parser.add_argument('--report', help="file report (JSON)")
+    parser.add_argument('--cprofile', help="file output cProfile (pstats)")
+    parser.add_argument('--tracemalloc', action='store_true', help="lacak alokasi memori dengan tracemalloc")
+    parser.add_argument('script')
+    parser.add_argument('args', nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    sys.argv = [args.script] + args.args
+    with profile(args.report, args.cprofile, args.tracemalloc) as report:
+        run_script(args.script)
+    print_report(report)
@@ -0,0 +1,354 @@
+import collections
+import functools
+import operator
+import re
+
+from util import sorted_intersect
+
+# Token query boolean: kurung, atau kata yang dipisahkan spasi / kurung
+QUERY_TOKEN = re.compile(r"[()]|[^\s()]+")
+# Operator (huruf besar, seperti Lucene, agar kata biasa "and" / "or" tetap term)
+AND, OR, NOT = "AND", "OR", "NOT"
+OPERATORS = {AND, OR, NOT, "(", ")"}
+
+# Node query boolean. Term berisi kata (hasil parse_query), lalu termID
+# (None jika term tidak ada di index) setelah analyze. operands berupa tuple.
+Term = collections.namedtuple('Term', ['term'])
+And = collections.namedtuple('And', ['operands'])
+Or = collections.namedtuple('Or', ['operands'])
+Not = collections.namedtuple('Not', ['operand'])
+
+
+def is_boolean_query(query):
+    """
+    Apakah query memakai operator boolean atau kurung (bukan sekadar AND
+    implisit) dan sesuai grammar parse_query. Query dengan operator yang
+    tidak bisa di-parse, misalnya "jantung (sehat" atau "olahraga :)",
+    dianggap query biasa (AND implisit dari kata-katanya).
+    """
+    if not any(token in OPERATORS for token in QUERY_TOKEN.findall(query)):
+        return False
+    try:
+        parse_query(query)
+    except ValueError:
+        return False
+    return True
+
+
+def parse_query(query):
+    """
+    Parse query boolean dengan grammar berikut (prioritas NOT > AND > OR,
+    kata yang berurutan tanpa operator di-AND-kan):
+
+        query  := and_query (OR and_query)*
+        and_query := unary ([AND] unary)*
+        unary  := NOT unary | "(" query ")" | kata
+
+    contoh: "jantung (olahraga OR lari) NOT rokok"
+
+    Returns
+    -------
+    Term, And, Or, atau Not, None jika query kosong
+
+    Raises
+    ------
+    ValueError jika query tidak sesuai grammar (misalnya kurung tidak
+    seimbang atau operator tanpa operand)
+    """
+    tokens = QUERY_TOKEN.findall(query)
+    if len(tokens) == 0:
+        return None
+    node, position = parse_or(tokens, 0)
+    if position < len(tokens):
+        raise ValueError(f"query tidak valid: token '{tokens[position]}' tidak diharapkan")
+    return node
+
+
+def parse_or(tokens, position):
+    operands = []
+    while True:
+        node, position = parse_and(tokens, position)
+        operands.append(node)
+        if position == len(tokens) or tokens[position] != OR:
+            break
+        position += 1
+    return (operands[0] if len(operands) == 1 else Or(tuple(operands))), position
+
+
+def parse_and(tokens, position):
+    operands = []
+    while True:
+        node, position = parse_unary(tokens, position)
+        operands.append(node)
+        if position < len(tokens) and tokens[position] == AND:
+            position += 1
+        elif position == len(tokens) or tokens[position] in (OR, ")"):
+            break
+    return (operands[0] if len(operands) == 1 else And(tuple(operands))), position
+
+
+def parse_unary(tokens, position):
+    if position == len(tokens):
+        raise ValueError("query tidak valid: operand tidak ditemukan di akhir query")
+    token = tokens[position]
+    if token == NOT:
+        node, position = parse_unary(tokens, position + 1)
+        return Not(node), position
+    if token == "(":
+        node, position = parse_or(tokens, position + 1)
+        if position == len(tokens) or tokens[position] != ")":
+            raise ValueError("query tidak valid: kurung tidak ditutup")
+        return node, position + 1
+    if token in OPERATORS:
+        raise ValueError(f"query tidak valid: operand tidak ditemukan sebelum '{token}'")
+    return Term(token), position + 1
+
+
+def analyze(node, analyzer):
+    """
+    Mengganti setiap Term(kata) dengan hasil analyzer(kata), yaitu list
+    term (misalnya termID hasil pre-processing yang sama dengan indexing):
+    satu term menjadi Term, beberapa term menjadi And, dan kata yang tidak
+    menghasilkan term (misalnya stopword) dibuang dari operator induknya.
+
+    Returns
+    -------
+    node hasil analyze, None jika seluruh query terbuang
+    """
+    if node is None:
+        return None
+    if isinstance(node, Term):
+        terms = [Term(term) for term in analyzer(node.term)]
+        if len(terms) == 0:
+            return None
+        return terms[0] if len(terms) == 1 else And(tuple(terms))
+    if isinstance(node, Not):
+        operand = analyze(node.operand, analyzer)
+        return None if operand is None else Not(operand)
+    operands = tuple(operand for operand in (analyze(operand, analyzer) for operand in node.operands)
+                     if operand is not None)
+    if len(operands) == 0:
+        return None
+    return type(node)(operands)
+
+
+def normalize(node):
+    """
+    Bentuk normal query: And dan Or bersarang diratakan, operand duplikat
+    dibuang, NOT NOT x menjadi x, dan NOT (a OR b) di dalam And menjadi
+    NOT a, NOT b (sehingga setiap NOT di And cukup dievaluasi sebagai
+    selisih himpunan). Operand diurutkan secara deterministik, sehingga
+    query yang ekuivalen dengan cara ini punya bentuk normal yang sama
+    (dipakai sebagai key result cache).
+    """
+    if node is None or isinstance(node, Term):
+        return node
+    if isinstance(node, Not):
+        operand = normalize(node.operand)
+        return operand.operand if isinstance(operand, Not) else Not(operand)
+    operands = set()
+    for operand in map(normalize, node.operands):
+        if type(operand) is type(node):
+            operands.update(operand.operands)
+        elif isinstance(node, And) and isinstance(operand, Not) and isinstance(operand.operand, Or):
+            operands.update(Not(negated) for negated in operand.operand.operands)
+        else:
+            operands.add(operand)
+    if len(operands) == 1:
+        return operands.pop()
+    return type(node)(tuple(sorted(operands, key=repr)))
+
+
+class QueryEvaluator:
+    """
+    Mengevaluasi query boolean (hasil normalize) terhadap sebuah reader
+    index (InvertedIndexReader atau SegmentedIndexReader) dengan rencana
+    berbasis biaya, memakai document frequency dari postings_dict sebagai
+    perkiraan ukuran hasil setiap node (lihat cost):
+
+        - operand And dievaluasi dari yang terkecil, dan operand berikutnya
+          hanya dicek untuk kandidat hasil sementara (lewat skip table
+          PostingsCursor atau test bit RoaringBitmap), sehingga postings
+          list yang besar tidak perlu di-decode penuh;
+        - NOT di dalam And dievaluasi sebagai selisih himpunan terhadap
+          hasil sementara, bukan sebagai komplemen seluruh collection;
+        - begitu hasil sementara kosong, sisa operand tidak disentuh sama
+          sekali (tidak ada postings yang dibaca dari disk);
+        - operand Or (di bawah And) hanya dicek untuk kandidat yang belum
+          cocok dengan operand Or sebelumnya.
+
+    NOT tanpa operand positif (misalnya query "NOT rokok") dievaluasi
+    terhadap universe, yaitu semua docID di collection.
+    """
+    def __init__(self, reader, universe):
+        """
+        Parameters
+        ----------
+        reader: InvertedIndexReader atau SegmentedIndexReader (sudah dibuka)
+        universe: range
+            Semua docID di collection, terurut
+        """
+        self.reader = reader
+        self.universe = universe
+        self.bitmaps = {}
+
+    def cost(self, node):
+        """Perkiraan (batas atas) banyaknya docID hasil node, dari document frequency"""
+        if isinstance(node, Term):
+            return 0 if node.term is None else self.reader.document_frequency(node.term)
+        if isinstance(node, Not):
+            return len(self.universe) - self.cost(node.operand)
+        if isinstance(node, And):
+            positives = [self.cost(operand) for operand in node.operands if not isinstance(operand, Not)]
+            return min(positives, default=len(self.universe))
+        return min(len(self.universe), sum(self.cost(operand) for operand in node.operands))
+
+    def bitmap(self, term):
+        """RoaringBitmap postings list term (None jika bukan term yang dense)"""
+        if term not in self.bitmaps:
+            self.bitmaps[term] = self.reader.get_postings_bitmap(term)
+        return self.bitmaps[term]
+
+    def is_dense(self, node):
+        return isinstance(node, Term) and node.term is not None and self.bitmap(node.term) is not None
+
+    def evaluate(self, node, candidates=None):
+        """
+        docIDs (sorted list) hasil node, dibatasi pada candidates (sorted
+        list of docIDs) jika diberikan.
+        """
+        if isinstance(node, Term):
+            return self.evaluate_term(node.term, candidates)
+        if isinstance(node, Not):
+            return self.evaluate_and((node,), candidates)
+        if isinstance(node, And):
+            return self.evaluate_and(node.operands, candidates)
+        return self.evaluate_or(node.operands, candidates)
+
+    def evaluate_term(self, term, candidates):
+        if term is None:
+            return []
+        bitmap = self.bitmap(term)
+        if candidates is None:
+            return bitmap.to_list() if bitmap is not None else self.reader.get_postings_list(term)
+        if bitmap is not None:
+            return bitmap.intersect_sorted(candidates)
+        if self.reader.document_frequency(term) <= len(candidates):
+            # postings list lebih pendek dari kandidat: merge linear
+            return sorted_intersect(self.reader.get_postings_list(term), candidates)
+        return self.reader.get_postings_cursor(term).intersect(candidates)
+
+    def evaluate_and(self, operands, candidates):
+        positives = sorted((operand for operand in operands if not isinstance(operand, Not)), key=self.cost)
+        # NOT dengan operand terbesar dulu, karena paling banyak membuang kandidat
+        negatives = sorted((operand.operand for operand in operands if isinstance(operand, Not)),
+                           key=self.cost, reverse=True)
+        result = candidates
+        if result is None and len(positives) > 0 and self.is_dense(positives[0]):
+            # term-term dense di-AND-kan per word sebelum menjadi list
+            dense = [operand for operand in positives if self.is_dense(operand)]
+            positives = [operand for operand in positives if not self.is_dense(operand)]
+            result = functools.reduce(operator.and_, (self.bitmap(operand.term) for operand in dense)).to_list()
+        for operand in positives:
+            if result is not None and len(result) == 0:
+                return []
+            result = self.evaluate(operand, result)
+        if result is None:
+            result = self.universe
+        for operand in negatives:
+            if len(result) == 0:
+                return []
+            result = self.difference(operand, result)
+        return list(result)
+
+    def evaluate_or(self, operands, candidates):
+        operands = sorted(operands, key=self.cost, reverse=True)
+        if candidates is None:
+            if all(self.is_dense(operand) for operand in operands):
+                return functools.reduce(operator.or_, (self.bitmap(operand.term) for operand in operands)).to_list()
+            matched = set()
+            for operand in operands:
+                matched.update(self.evaluate(operand))
+            return sorted(matched)
+        # setiap operand hanya dicek untuk kandidat yang belum cocok
+        result, remaining = [], candidates
+        for operand in operands:
+            if len(remaining) == 0:
+                break
+            found = self.evaluate(operand, remaining)
+            if len(found) > 0:
+                result.extend(found)
+                found = set(found)
+                remaining = [doc_id for doc_id in remaining if doc_id not in found]
+        return sorted(result)
+
+    def difference(self, node, candidates):
+        """candidates (sorted list of docIDs) yang bukan hasil node"""
+        if isinstance(node, Term):
+            if node.term is None:
+                return candidates
+            bitmap = self.bitmap(node.term)
+            if bitmap is not None:
+                return bitmap.difference_sorted(candidates)
+            return self.reader.get_postings_cursor(node.term).difference(candidates)
+        matched = set(self.evaluate(node, candidates))
+        return [doc_id for doc_id in candidates if doc_id not in matched]
+
+
+if __name__ == '__main__':
+    assert parse_query("a b OR c") == Or((And((Term("a"), Term("b"))), Term("c"))), "parse salah"
+    assert parse_query("a AND (b OR NOT c)") == And((Term("a"), Or((Term("b"), Not(Term("c")))))), "parse salah"
+    assert parse_query("NOT NOT a") == Not(Not(Term("a"))) and parse_query("  ") is None
+    assert parse_query("a and b") == And((Term("a"), Term("and"), Term("b"))), "operator harus huruf besar"
+    for invalid in ["(a OR b", "a OR", "AND a", "a )", "()", "NOT"]:
+        try:
+            parse_query(invalid)
+            assert False, f"query {invalid} harus ditolak"
+        except ValueError:
+            pass
+    assert is_boolean_query("a OR b") and is_boolean_query("(a)") and not is_boolean_query("a b")
+    for invalid in ["olahraga :)", "jantung (sehat", "penyakit jantung OR", "AND"]:
+        assert not is_boolean_query(invalid), f"query {invalid} yang tidak valid harus menjadi AND implisit"
+
+    analyzer = {"a": [1], "b": [2], "c": [3], "dan": [], "ab": [1, 2]}.__getitem__
+    assert analyze(parse_query("a dan (dan OR NOT dan) b"), analyzer) == And((Term(1), Term(2))), "analyze salah"
+    assert analyze(parse_query("ab OR c"), analyzer) == Or((And((Term(1), Term(2))), Term(3)))
+    assert normalize(parse_query("(b a) a NOT (c OR d) NOT NOT e")) == \
+        And((Not(Term("c")), Not(Term("d")), Term("a"), Term("b"), Term("e"))), "normalize salah"
+    assert normalize(parse_query("a OR (b OR a)")) == normalize(parse_query("b OR a")), "normalize salah"
+
+    import tempfile
+    from compression import VBEPostings
+    from index import InvertedIndexReader, InvertedIndexWriter
+    test_directory = tempfile.TemporaryDirectory()
+    postings_lists = {1: list(range(0, 1000, 2)), 2: list(range(0, 1000, 3)), 3: [3, 6, 7, 500, 999],
+                      4: list(range(0, 1000, 5))}
+    with InvertedIndexWriter('test-query', postings_encoding=VBEPostings, directory=test_directory.name, block_size=16,
+                             bitmap_density=1 / 4) as index:
+        for term, postings_list in postings_lists.items():
+            index.append(term, postings_list)
+    sets = {term: set(postings_list) for term, postings_list in postings_lists.items()}
+    universe = range(1000)
+    with InvertedIndexReader('test-query', postings_encoding=None, directory=test_directory.name) as index:
+        assert index.get_postings_bitmap(1) is not None and index.get_postings_bitmap(2) is not None
+        assert index.get_postings_bitmap(4) is None, "term 4 harus disimpan dalam block"
+        evaluator = QueryEvaluator(index, universe)
+        words = {"a": [1], "b": [2], "c": [3], "d": [4], "x": [None]}.__getitem__
+        expected = {
+            "a b": sets[1] & sets[2],
+            "a OR c": sets[1] | sets[3],
+            "a NOT b": sets[1] - sets[2],
+            "NOT a": set(universe) - sets[1],
+            "d (c OR b) NOT a": sets[4] & (sets[3] | sets[2]) - sets[1],
+            "d NOT (a OR c)": sets[4] - sets[1] - sets[3],
+            "(a OR b) (c OR d)": (sets[1] | sets[2]) & (sets[3] | sets[4]),
+            "x OR c": sets[3],
+            "a x": set(),
+            "NOT x d": sets[4],
+            "NOT (a b)": set(universe) - (sets[1] & sets[2]),
+        }
+        for query, result in expected.items():
+            node = normalize(analyze(parse_query(query), words))
+            assert evaluator.evaluate(node) == sorted(result), f"hasil query {query} salah"
+        assert evaluator.cost(normalize(analyze(parse_query("c a"), words))) == 5, "cost salah"
+    test_directory.cleanup()
@@ -9,12 +9,20 @@ BSBI_instance = BSBIIndex(data_dir = 'collection',
                           postings_encoding = EliasGammaPostings,
                           output_dir = 'index')
 BSBI_instance.load()
+BSBI_instance.open_searcher()
 
 # queries = ["olahraga", "tumor", "hidup sehat"]
 queries = ["olahraga jantung teratur sehat hidup"]
-for query in queries:
+# semua query dievaluasi sekaligus, postings list term yang sama hanya dibaca sekali
+results = BSBI_instance.retrieve_many(queries)
+for query, result in zip(queries, results):
     print("Query  : ", query)
     print("Results:")
-    for doc in sorted(BSBI_instance.retrieve(query)):
+    for doc in sorted(result):
         print(doc)
-    print()
\ No newline at end of file
+    print("Results (BM25, top 10):")
+    for (score, doc) in BSBI_instance.retrieve_bm25(query, k = 10):
+        print(f"{doc:30} {score:>.3f}")
+    print()
+
+BSBI_instance.close_searcher()
@@ -0,0 +1,414 @@
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import json
+import math
+import multiprocessing
+import signal
+import time
+import urllib.parse
+
+from bsbi import BSBIIndex
+from compression import CODECS
+from query import parse_query
+
+# Banyaknya latency request terakhir yang dipakai untuk menghitung p50 / p99
+LATENCY_WINDOW = 10000
+# Query boolean yang datang dalam rentang BATCH_DELAY detik digabung menjadi
+# satu pemanggilan retrieve_many, paling banyak MAX_BATCH_SIZE query
+BATCH_DELAY = 0.002
+MAX_BATCH_SIZE = 64
+# Batas ukuran body request (bytes)
+MAX_BODY_SIZE = 1024 * 1024
+
+QUERY_MODES = ['and', 'phrase', 'proximity', 'tfidf', 'bm25', 'maxscore']
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+# BSBIIndex yang dipakai search(...) di process ini: di-load sekali oleh
+# main process (worker thread) atau oleh setiap worker process
+index = None
+
+
+def load_index(data_dir, output_dir, encoding, index_kwargs):
+    """Memuat index sekali untuk process ini dan membuka searcher-nya"""
+    global index
+    index = BSBIIndex(data_dir=data_dir, output_dir=output_dir,
+                      postings_encoding=CODECS[encoding], **index_kwargs)
+    index.load()
+    index.open_searcher()
+
+
+def search(mode, query, k, window):
+    """
+    Menjalankan sebuah query di index process ini. Dipanggil di worker pool,
+    sehingga parsing query dan decoding postings tidak memblokir event loop.
+
+    Returns
+    -------
+    List[str] untuk mode and, phrase, dan proximity, atau List[[skor, dokumen]]
+    untuk mode ranked (tfidf, bm25, maxscore)
+    """
+    if mode == 'and':
+        return index.retrieve(query)
+    if mode == 'phrase':
+        return index.retrieve_phrase(query)
+    if mode == 'proximity':
+        return index.retrieve_proximity(query, window)
+    return [[score, doc] for score, doc in getattr(index, 'retrieve_' + mode)(query, k)]
+
+
+def search_many(queries):
+    """retrieve_many(...) di index process ini (lihat search)"""
+    return index.retrieve_many(queries)
+
+
+class LatencyStats:
+    """
+    Latency (detik) dari LATENCY_WINDOW request terakhir, untuk melaporkan
+    percentile p50 / p99, beserta banyaknya request sejak server berjalan.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.latencies = collections.deque(maxlen=window)
+        self.requests = 0
+
+    def add(self, latency):
+        self.latencies.append(latency)
+        self.requests += 1
+
+    def percentile(self, p):
+        """Percentile ke-p (nearest rank) dalam milidetik, 0.0 jika belum ada request"""
+        if len(self.latencies) == 0:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[max(0, math.ceil(p / 100 * len(latencies)) - 1)] * 1000
+
+    def summary(self):
+        return {'requests': self.requests, 'p50_ms': self.percentile(50), 'p99_ms': self.percentile(99)}
+
+
+class QueryBatcher:
+    """
+    Menggabungkan query boolean dari request-request yang datang bersamaan
+    menjadi satu pemanggilan run(queries) (misalnya retrieve_many di worker
+    pool), sehingga term yang sama di query-query tersebut hanya dibaca dan
+    di-decode sekali. Batch dikirim setelah delay detik sejak query pertama,
+    atau begitu berisi max_size query.
+    """
+
+    def __init__(self, run, delay=BATCH_DELAY, max_size=MAX_BATCH_SIZE):
+        self.run = run
+        self.delay = delay
+        self.max_size = max_size
+        self.pending = []
+        self.timer = None
+        # referensi ke task batch yang sedang berjalan, agar tidak di-garbage collect
+        self.tasks = set()
+        self.batches = 0
+        self.queries = 0
+
+    async def submit(self, query):
+        """Hasil query, setelah batch tempat query tersebut selesai dievaluasi"""
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((query, future))
+        if len(self.pending) >= self.max_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.delay, self.flush)
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if len(batch) > 0:
+            task = asyncio.ensure_future(self.run_batch(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run_batch(self, batch):
+        self.batches += 1
+        self.queries += len(batch)
+        try:
+            results = await self.run([query for query, _ in batch])
+        except Exception as exception:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exception)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {'batches': self.batches, 'queries': self.queries,
+                'avg_batch_size': self.queries / self.batches if self.batches else 0.0}
+
+
+class SearchServer:
+    """
+    Server HTTP/JSON (asyncio, tanpa dependency tambahan) di depan BSBIIndex
+    yang di-load sekali. Setiap query dijalankan di worker pool (thread atau
+    process) sehingga event loop tetap bisa menerima request lain.
+
+    Endpoint:
+        GET  /search?q=...&mode=and&k=10&window=5
+             {"query": ..., "mode": ..., "results": [...]}
+        POST /search dengan body {"queries": [...], "mode": "and", "k": 10}
+             {"mode": ..., "results": [[...], ...]}, satu hasil per query
+        GET  /stats
+             latency p50 / p99, statistik batching (dan cache index jika
+             index di-load di process server)
+
+    mode adalah salah satu QUERY_MODES; k untuk mode ranked dan window untuk
+    mode proximity. Query boolean (mode and) dari GET /search yang datang
+    bersamaan digabung dengan QueryBatcher.
+    """
+
+    def __init__(self, executor, batch_delay=BATCH_DELAY, max_batch_size=MAX_BATCH_SIZE):
+        self.executor = executor
+        self.batcher = QueryBatcher(self.run_many, batch_delay, max_batch_size)
+        self.latency = LatencyStats()
+
+    async def run_in_pool(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, function, *args)
+
+    async def run_many(self, queries):
+        return await self.run_in_pool(search_many, queries)
+
+    async def handle_connection(self, reader, writer):
+        """Melayani request-request HTTP/1.1 (keep-alive) dari sebuah koneksi"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    await self.write_response(writer, 400, {'error': 'request line tidak valid'}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection == 'keep-alive' or (version == 'HTTP/1.1' and connection != 'close')
+
+                try:
+                    length = self.content_length(headers)
+                except ValueError as exception:
+                    await self.write_response(writer, 400, {'error': str(exception)}, False)
+                    break
+                if length > MAX_BODY_SIZE:
+                    await self.write_response(writer, 413, {'error': 'body terlalu besar'}, False)
+                    break
+                body = await reader.readexactly(length) if length > 0 else b''
+
+                start = time.perf_counter()
+                status, payload = await self.dispatch(method, target, body)
+                await self.write_response(writer, status, payload, keep_alive)
+                self.latency.add(time.perf_counter() - start)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # server dihentikan ketika koneksi (keep-alive) masih terbuka
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def content_length(headers):
+        """Panjang body dari header Content-Length (0 jika tidak ada), ValueError jika bukan bilangan bulat >= 0"""
+        value = headers.get('content-length', '0')
+        if not (value.isascii() and value.isdigit()):
+            raise ValueError(f"Content-Length tidak valid: {value!r}")
+        return int(value)
+
+    async def write_response(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def dispatch(self, method, target, body):
+        """(status HTTP, payload JSON) untuk sebuah request"""
+        url = urllib.parse.urlsplit(target)
+        try:
+            if url.path == '/search' and method == 'GET':
+                params = dict(urllib.parse.parse_qsl(url.query))
+                if 'q' not in params:
+                    raise ValueError("parameter q wajib diisi")
+                mode, k, window = self.query_options(params)
+                return 200, {'query': params['q'], 'mode': mode,
+                             'results': await self.search(params['q'], mode, k, window)}
+            if url.path == '/search' and method == 'POST':
+                request = json.loads(body or b'{}')
+                queries = request.get('queries') if isinstance(request, dict) else None
+                if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+                    raise ValueError("body harus berisi queries: list of str")
+                mode, k, window = self.query_options(request)
+                if mode == 'and':
+                    for query in queries:
+                        parse_query(query)
+                    results = await self.run_many(queries)
+                else:
+                    results = await asyncio.gather(*[self.run_in_pool(search, mode, query, k, window)
+                                                     for query in queries])
+                return 200, {'mode': mode, 'results': results}
+            if url.path == '/stats' and method == 'GET':
+                return 200, self.stats()
+            if url.path in ('/search', '/stats'):
+                return 405, {'error': f"method {method} tidak didukung untuk {url.path}"}
+            return 404, {'error': f"{url.path} tidak ditemukan"}
+        except ValueError as exception:
+            # termasuk JSON yang tidak valid (json.JSONDecodeError)
+            return 400, {'error': str(exception)}
+        except Exception as exception:
+            return 500, {'error': f"{type(exception).__name__}: {exception}"}
+
+    @staticmethod
+    def query_options(params):
+        """(mode, k, window) dari parameter request, ValueError jika tidak valid"""
+        mode = params.get('mode', 'and')
+        if mode not in QUERY_MODES:
+            raise ValueError(f"mode harus salah satu dari {', '.join(QUERY_MODES)}")
+        k, window = int(params.get('k', 10)), int(params.get('window', 5))
+        if k < 0 or window < 0:
+            raise ValueError("k dan window tidak boleh negatif")
+        return mode, k, window
+
+    async def search(self, query, mode, k, window):
+        if mode == 'and':
+            # query boolean yang tidak valid ditolak di sini (400), walaupun
+            # BSBIIndex.retrieve memperlakukannya sebagai AND implisit
+            parse_query(query)
+            return await self.batcher.submit(query)
+        return await self.run_in_pool(search, mode, query, k, window)
+
+    def stats(self):
+        stats = {'latency': self.latency.summary(), 'batching': self.batcher.stats()}
+        # cache index hanya terlihat jika index di-load di process ini (worker thread)
+        if index is not None:
+            stats['cache'] = index.cache_stats()
+        return stats
+
+
+async def serve(host, port, executor, batch_delay=BATCH_DELAY, max_batch_size=MAX_BATCH_SIZE):
+    """Menjalankan SearchServer sampai menerima SIGINT / SIGTERM"""
+    search_server = SearchServer(executor, batch_delay, max_batch_size)
+    server = await asyncio.start_server(search_server.handle_connection, host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Melayani query di http://{address[0]}:{address[1]}/search")
+
+    stop = asyncio.Event()
+    for signal_number in (signal.SIGINT, signal.SIGTERM):
+        # tidak tersedia di Windows, di sana Ctrl+C menghentikan asyncio.run
+        with contextlib.suppress(NotImplementedError):
+            asyncio.get_running_loop().add_signal_handler(signal_number, stop.set)
+    await stop.wait()
+    # koneksi yang masih terbuka dihentikan ketika asyncio.run selesai
+    server.close()
+
+
+async def self_test():
+    """Self-test LatencyStats, QueryBatcher, dan validasi request SearchServer (tanpa index)"""
+    latency = LatencyStats(window=100)
+    assert latency.percentile(50) == 0.0, "percentile tanpa request harus 0.0"
+    for millis in range(200, 0, -1):
+        latency.add(millis / 1000)
+    assert latency.requests == 200 and len(latency.latencies) == 100, "window LatencyStats salah"
+    # window berisi 100 request terakhir: 100 ms, 99 ms, ..., 1 ms
+    assert math.isclose(latency.percentile(50), 50) and math.isclose(latency.percentile(99), 99)
+    assert math.isclose(latency.percentile(100), 100) and math.isclose(latency.percentile(0), 1)
+
+    batches = []
+    async def run(queries):
+        batches.append(queries)
+        if 'gagal' in queries:
+            raise RuntimeError("batch gagal")
+        return [query.upper() for query in queries]
+
+    # batch penuh dikirim tanpa menunggu delay
+    batcher = QueryBatcher(run, delay=60, max_size=3)
+    results = await asyncio.wait_for(asyncio.gather(*[batcher.submit(query) for query in "abc"]), timeout=5)
+    assert results == ['A', 'B', 'C'] and batches == [['a', 'b', 'c']], "flush max_size salah"
+    # batch yang belum penuh dikirim setelah delay
+    batcher = QueryBatcher(run, delay=0.01, max_size=64)
+    assert await asyncio.gather(batcher.submit('d'), batcher.submit('e')) == ['D', 'E']
+    assert batches[-1] == ['d', 'e'] and batcher.stats()['avg_batch_size'] == 2, "flush delay salah"
+    # exception batch diteruskan ke semua query di batch tersebut
+    outcomes = await asyncio.gather(batcher.submit('f'), batcher.submit('gagal'), return_exceptions=True)
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes), "exception harus diteruskan ke semua query"
+
+    search_server = SearchServer(executor=None)
+    server = await asyncio.start_server(search_server.handle_connection, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    async def request(raw):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(raw)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout=5)
+        writer.close()
+        return response
+    try:
+        assert (await request(b"GET /stats HTTP/1.1\r\nConnection: close\r\n\r\n")).startswith(b"HTTP/1.1 200")
+        for length in [b"abc", b"-5", b"1e3", b""]:
+            response = await request(b"POST /search HTTP/1.1\r\nContent-Length: " + length + b"\r\n\r\n{}")
+            assert response.startswith(b"HTTP/1.1 400"), f"Content-Length {length} harus ditolak dengan 400"
+        response = await request(b"POST /search HTTP/1.1\r\nContent-Length: 99999999\r\n\r\n")
+        assert response.startswith(b"HTTP/1.1 413"), "body yang terlalu besar harus ditolak dengan 413"
+        response = await request(b"GET /search?q=(a HTTP/1.1\r\nConnection: close\r\n\r\n")
+        assert response.startswith(b"HTTP/1.1 400"), "query boolean yang tidak valid harus ditolak dengan 400"
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Server HTTP/JSON untuk query ke index BSBIIndex")
+    parser.add_argument('--data-dir', default='collection')
+    parser.add_argument('--output-dir', default='index')
+    parser.add_argument('--encoding', default='eliasgamma', choices=sorted(CODECS),
+                        help="codec index yang tidak menyimpan codec id (index lama)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=4, help="banyaknya worker thread / process")
+    parser.add_argument('--processes', action='store_true',
+                        help="worker berupa process (setiap process me-load index sendiri), bukan thread")
+    parser.add_argument('--batch-delay', type=float, default=BATCH_DELAY)
+    parser.add_argument('--max-batch-size', type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument('--result-cache', type=int, default=0, help="kapasitas result cache index (0: tanpa)")
+    parser.add_argument('--self-test', action='store_true', help="jalankan self-test lalu keluar")
+    args = parser.parse_args()
+
+    if args.self_test:
+        asyncio.run(self_test())
+        raise SystemExit
+
+    index_args = (args.data_dir, args.output_dir, args.encoding, {'result_cache_capacity': args.result_cache})
+    if args.processes:
+        # spawn, bukan fork: worker tidak boleh mewarisi socket dan event loop server
+        executor = concurrent.futures.ProcessPoolExecutor(args.workers, mp_context=multiprocessing.get_context('spawn'),
+                                                          initializer=load_index, initargs=index_args)
+    else:
+        load_index(*index_args)
+        executor = concurrent.futures.ThreadPoolExecutor(args.workers)
+    with executor:
+        try:
+            asyncio.run(serve(args.host, args.port, executor, args.batch_delay, args.max_batch_size))
+        except KeyboardInterrupt:
+            pass
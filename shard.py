@@ -0,0 +1,324 @@
+import argparse
+import collections
+import concurrent.futures
+import heapq
+import itertools
+import json
+import os
+import random
+import tempfile
+import time
+
+from bsbi import BSBIIndex
+from compression import CODECS, VBEPostings
+import server
+
+# Batas waktu (detik) menunggu hasil sebuah shard untuk satu query; shard yang
+# belum menjawab dilewati dan dilaporkan di ShardedResults.failed_shards
+SHARD_TIMEOUT = 10.0
+
+# results: hasil gabungan dari shard-shard yang menjawab, failed_shards: id
+# shard yang timeout atau worker process-nya mati
+ShardedResults = collections.namedtuple('ShardedResults', ['results', 'failed_shards'])
+
+
+def build_shard(data_dir, output_dir, postings_encoding, shard, index_kwargs, memory_budget):
+    """Worker ShardedIndex.index: membangun satu shard sebagai BSBIIndex lengkap di output_dir"""
+    os.makedirs(output_dir, exist_ok=True)
+    shard_index = BSBIIndex(data_dir=data_dir, output_dir=output_dir, postings_encoding=postings_encoding,
+                            shard=shard, **index_kwargs)
+    shard_index.index(memory_budget=memory_budget)
+    return shard_index.n_docs
+
+
+class ShardedIndex:
+    """
+    Index yang dipartisi per dokumen menjadi n_shards shard. Setiap shard
+    adalah BSBIIndex lengkap (term_id_map, doc_id_map, .index, .dict
+    sendiri) di output_dir/shard-<shard_id> yang hanya berisi dokumen-dokumen
+    yang BSBIIndex.in_shard(...) untuk shard tersebut.
+
+    Query dijalankan scatter-gather: coordinator mengirim query ke worker
+    process setiap shard (yang me-load shard-nya sekali, lihat
+    server.load_index), lalu menggabungkan hasilnya. Hasil boolean (and,
+    phrase, proximity) digabung dengan menyambung hasil setiap shard sesuai
+    urutan shard, hasil ranked digabung dengan heap merge top-k. Coordinator
+    hanya memakai submit(...) dari executor setiap shard, sehingga worker
+    process bisa diganti dengan shard di node lain tanpa mengubah merge-nya.
+
+    Skor ranked (tfidf, bm25, maxscore) dihitung dengan statistik collection
+    shard masing-masing (N, df, rata-rata panjang dokumen). Karena dokumen
+    dibagi rata secara acak (CRC32), statistiknya mendekati statistik
+    global, tetapi skor tidak persis sama dengan index tunggal.
+
+    Attributes
+    ----------
+    data_dir(str): Path ke data
+    output_dir(str): Path ke directory shard-shard dan manifest shards.json
+    postings_encoding: Codec setiap shard, lihat compression.py
+    n_shards(int): Banyaknya shard
+    timeout(float): Batas waktu (detik) hasil setiap shard untuk satu query,
+                    None artinya tanpa batas
+    allow_partial_results(bool): Jika False, search melempar TimeoutError
+                    ketika ada shard yang gagal, bukan mengembalikan hasil
+                    sebagian
+    index_kwargs(dict): Argumen tambahan BSBIIndex untuk setiap shard
+                    (block_size, with_positions, use_mmap, dsb.)
+    executors(List[Executor]): Worker satu process per shard, None sebelum
+                    open_searcher()
+    """
+    def __init__(self, data_dir, output_dir, postings_encoding, n_shards=None, timeout=SHARD_TIMEOUT,
+                 allow_partial_results=True, **index_kwargs):
+        self.data_dir = data_dir
+        self.output_dir = output_dir
+        self.postings_encoding = postings_encoding
+        self.n_shards = n_shards
+        self.timeout = timeout
+        self.allow_partial_results = allow_partial_results
+        self.index_kwargs = index_kwargs
+        self.executors = None
+
+    def shard_dir(self, shard_id):
+        """Output directory shard shard_id"""
+        return os.path.join(self.output_dir, f'shard-{shard_id}')
+
+    def save(self):
+        """Menyimpan manifest shards.json (banyaknya shard dan codec)"""
+        with open(os.path.join(self.output_dir, 'shards.json'), 'w') as f:
+            json.dump({'n_shards': self.n_shards, 'codec': self.postings_encoding.codec_id}, f)
+
+    def load(self):
+        """Memuat manifest shards.json dari output directory"""
+        with open(os.path.join(self.output_dir, 'shards.json')) as f:
+            manifest = json.load(f)
+        self.n_shards = manifest['n_shards']
+        self.postings_encoding = CODECS.get(manifest['codec'], self.postings_encoding)
+
+    def index(self, processes=None, memory_budget=None):
+        """
+        Membangun semua shard secara paralel, satu process per shard (paling
+        banyak processes process, None artinya os.cpu_count()). Setiap shard
+        di-index dengan BSBIIndex.index (atau SPIMI jika memory_budget tidak
+        None).
+
+        Returns
+        -------
+        List[int]
+            Banyaknya dokumen di setiap shard
+        """
+        if self.n_shards is None:
+            self.n_shards = os.cpu_count()
+        os.makedirs(self.output_dir, exist_ok=True)
+        # searcher yang terbuka menunjuk ke shard-shard lama
+        self.close_searcher()
+        with concurrent.futures.ProcessPoolExecutor(max_workers=min(processes or os.cpu_count(), self.n_shards)) as executor:
+            jobs = [executor.submit(build_shard, self.data_dir, self.shard_dir(shard_id), self.postings_encoding,
+                                    (shard_id, self.n_shards), self.index_kwargs, memory_budget)
+                    for shard_id in range(self.n_shards)]
+            doc_counts = [job.result() for job in jobs]
+        self.save()
+        return doc_counts
+
+    def open_searcher(self):
+        """Menjalankan worker process setiap shard, yang me-load shard-nya sekali"""
+        if self.executors is None:
+            self.executors = [self.start_shard(shard_id) for shard_id in range(self.n_shards)]
+
+    def start_shard(self, shard_id):
+        """Executor satu process yang me-load shard shard_id"""
+        index_kwargs = dict(self.index_kwargs, shard=(shard_id, self.n_shards))
+        return concurrent.futures.ProcessPoolExecutor(
+            1, initializer=server.load_index,
+            initargs=(self.data_dir, self.shard_dir(shard_id), self.postings_encoding.codec_id, index_kwargs))
+
+    def restart_shard(self, shard_id):
+        """Mengganti worker shard shard_id yang process-nya mati"""
+        self.executors[shard_id].shutdown(wait=False)
+        self.executors[shard_id] = self.start_shard(shard_id)
+
+    def submit(self, shard_id, fn, *args):
+        """Mengirim fn(*args) ke worker shard shard_id, yang dijalankan ulang jika sudah mati"""
+        try:
+            return self.executors[shard_id].submit(fn, *args)
+        except concurrent.futures.BrokenExecutor:
+            self.restart_shard(shard_id)
+            return self.executors[shard_id].submit(fn, *args)
+
+    def close_searcher(self):
+        """Menghentikan worker process semua shard"""
+        if self.executors is not None:
+            for executor in self.executors:
+                executor.shutdown(wait=False, cancel_futures=True)
+            self.executors = None
+
+    def __enter__(self):
+        self.load()
+        self.open_searcher()
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.close_searcher()
+
+    def scatter(self, fn, *args):
+        """
+        Menjalankan fn(*args) di worker setiap shard dan menunggu hasilnya
+        paling lama self.timeout detik sejak query dikirim.
+
+        Exception dari query itu sendiri (misalnya query phrase ke index
+        tanpa posisi) dilempar ulang, karena shard lain akan gagal dengan
+        cara yang sama. Worker process yang mati diganti dengan process baru untuk
+        query berikutnya.
+
+        Returns
+        -------
+        ShardedResults
+            results berisi hasil per shard (None untuk shard yang gagal)
+        """
+        self.open_searcher()
+        futures = [self.submit(shard_id, fn, *args) for shard_id in range(self.n_shards)]
+        concurrent.futures.wait(futures, timeout=self.timeout)
+        results = [None] * self.n_shards
+        failed_shards = []
+        for shard_id, future in enumerate(futures):
+            if not future.done():
+                # yang masih mengantri dibatalkan; yang sedang berjalan dibiarkan selesai
+                future.cancel()
+                failed_shards.append(shard_id)
+            elif isinstance(future.exception(), concurrent.futures.BrokenExecutor):
+                self.restart_shard(shard_id)
+                failed_shards.append(shard_id)
+            else:
+                results[shard_id] = future.result()
+        if failed_shards and not self.allow_partial_results:
+            raise TimeoutError(f"shard {failed_shards} tidak menjawab dalam {self.timeout} detik")
+        return ShardedResults(results, failed_shards)
+
+    def search(self, mode, query, k=10, window=5):
+        """
+        Scatter-gather sebuah query dengan mode salah satu dari
+        server.QUERY_MODES ke semua shard.
+
+        Returns
+        -------
+        ShardedResults
+            results berupa List[str] untuk mode and, phrase, dan proximity
+            (hasil setiap shard, terurut sesuai docID lokalnya, disambung
+            sesuai urutan shard), atau List[(skor, dokumen)] top-k untuk mode
+            ranked
+        """
+        if mode not in server.QUERY_MODES:
+            raise ValueError(f"mode harus salah satu dari {server.QUERY_MODES}")
+        shard_results, failed_shards = self.scatter(server.search, mode, query, k, window)
+        shard_results = [result for result in shard_results if result is not None]
+        if mode in ('and', 'phrase', 'proximity'):
+            return ShardedResults(list(itertools.chain.from_iterable(shard_results)), failed_shards)
+        # hasil setiap shard sudah terurut menurun berdasarkan skor
+        merged = heapq.merge(*shard_results, key=lambda result: result[0], reverse=True)
+        return ShardedResults([(score, doc) for score, doc in itertools.islice(merged, k)], failed_shards)
+
+    def retrieve(self, query):
+        """BSBIIndex.retrieve di semua shard (lihat search)"""
+        return self.search('and', query).results
+
+    def retrieve_phrase(self, query):
+        """BSBIIndex.retrieve_phrase di semua shard (lihat search)"""
+        return self.search('phrase', query).results
+
+    def retrieve_proximity(self, query, window):
+        """BSBIIndex.retrieve_proximity di semua shard (lihat search)"""
+        return self.search('proximity', query, window=window).results
+
+    def retrieve_tfidf(self, query, k=10):
+        """Top-k BSBIIndex.retrieve_tfidf dari semua shard (lihat search)"""
+        return self.search('tfidf', query, k).results
+
+    def retrieve_bm25(self, query, k=10):
+        """Top-k BSBIIndex.retrieve_bm25 dari semua shard (lihat search)"""
+        return self.search('bm25', query, k).results
+
+    def retrieve_maxscore(self, query, k=10):
+        """Top-k BSBIIndex.retrieve_maxscore dari semua shard (lihat search)"""
+        return self.search('maxscore', query, k).results
+
+
+def self_test():
+    """
+    Self-test ShardedIndex dengan 2 shard di collection sementara: hasil
+    boolean sama dengan index tunggal, hasil ranked digabung terurut dan
+    dipotong k, dan shard yang timeout dilaporkan di failed_shards
+    """
+    words = ["jantung", "sehat", "olahraga", "lari", "tidur", "sayur", "buah", "rokok"]
+    generator = random.Random(0)
+    with tempfile.TemporaryDirectory() as test_directory:
+        data_dir = os.path.join(test_directory, 'collection')
+        for block in range(3):
+            os.makedirs(os.path.join(data_dir, str(block)))
+            for doc in range(10):
+                with open(os.path.join(data_dir, str(block), f'{block}-{doc}.txt'), 'w') as f:
+                    f.write(' '.join(generator.choices(words, k=generator.randint(2, 8))))
+        single_index = BSBIIndex(data_dir=data_dir, output_dir=os.path.join(test_directory, 'single'),
+                                 postings_encoding=VBEPostings)
+        os.makedirs(single_index.output_dir)
+        single_index.index()
+        sharded_dir = os.path.join(test_directory, 'sharded')
+        doc_counts = ShardedIndex(data_dir, sharded_dir, VBEPostings, n_shards=2).index(processes=2)
+        assert sum(doc_counts) == single_index.n_docs and min(doc_counts) > 0, "pembagian dokumen ke shard salah"
+
+        # codec dan banyaknya shard dibaca dari manifest shards.json
+        with ShardedIndex(data_dir, sharded_dir, CODECS['standard']) as sharded_index:
+            assert sharded_index.n_shards == 2 and sharded_index.postings_encoding is VBEPostings
+            for query in ["jantung", "sehat olahraga", "lari OR tidur", "buah NOT rokok", "tidak ada"]:
+                results = sharded_index.retrieve(query)
+                assert len(results) == len(set(results)), f"hasil query {query} tidak boleh duplikat"
+                assert sorted(results) == sorted(single_index.retrieve(query)), f"hasil query {query} salah"
+            for mode in ['tfidf', 'bm25', 'maxscore']:
+                results, failed_shards = sharded_index.search(mode, "jantung sehat", 3)
+                scores = [score for score, _ in results]
+                assert failed_shards == [] and len(results) == 3, f"hasil {mode} harus dipotong k"
+                assert scores == sorted(scores, reverse=True), f"hasil {mode} harus terurut menurun"
+                shard_results = sharded_index.scatter(server.search, mode, "jantung sehat", 100, 5).results
+                assert scores == heapq.nlargest(3, [score for result in shard_results for score, _ in result])
+
+            sharded_index.timeout = 0.2
+            results, failed_shards = sharded_index.scatter(time.sleep, 1)
+            assert failed_shards == [0, 1] and results == [None, None], "shard yang timeout harus dilaporkan"
+            sharded_index.allow_partial_results = False
+            try:
+                sharded_index.scatter(time.sleep, 1)
+                assert False, "timeout tanpa allow_partial_results harus melempar TimeoutError"
+            except TimeoutError:
+                pass
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Indexing dan query index BSBIIndex yang dipartisi per dokumen")
+    parser.add_argument('queries', nargs='*')
+    parser.add_argument('--data-dir', default='collection')
+    parser.add_argument('--output-dir', default='index_sharded')
+    parser.add_argument('--encoding', default='eliasgamma', choices=sorted(CODECS))
+    parser.add_argument('--shards', type=int, default=os.cpu_count())
+    parser.add_argument('--index', action='store_true', help="bangun ulang semua shard sebelum query")
+    parser.add_argument('--mode', default='and', choices=server.QUERY_MODES)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--timeout', type=float, default=SHARD_TIMEOUT)
+    parser.add_argument('--self-test', action='store_true', help="jalankan self-test lalu keluar")
+    args = parser.parse_args()
+
+    if args.self_test:
+        self_test()
+        raise SystemExit
+
+    sharded_index = ShardedIndex(args.data_dir, args.output_dir, CODECS[args.encoding],
+                                 args.shards, timeout=args.timeout)
+    if args.index:
+        start = time.time()
+        doc_counts = sharded_index.index()
+        print(f"Indexing time: {(time.time()-start):.5f} seconds, documents per shard: {doc_counts}")
+    with sharded_index:
+        for query in args.queries:
+            results, failed_shards = sharded_index.search(args.mode, query, args.k)
+            print("Query  : ", query)
+            print("Results:" if not failed_shards else f"Results (tanpa shard {failed_shards}):")
+            for result in results:
+                print(result if isinstance(result, str) else f"{result[1]:30} {result[0]:>.3f}")
+            print()
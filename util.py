@@ -1,3 +1,25 @@
+import array
+import bisect
+import heapq
+import itertools
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+# intersect_many memakai kernel NumPy jika list terpendek berisi paling
+# sedikit INTERSECT_VECTOR_MIN integer, dan total panjang python's list yang
+# perlu disalin ke NumPy tidak lebih dari INTERSECT_MAX_SKEW kali panjang list
+# terpendek (array.array dan numpy array tidak perlu disalin)
+INTERSECT_VECTOR_MIN = 64
+INTERSECT_MAX_SKEW = 32
+
 class IdMap:
     """
     Ingat kembali di kuliah, bahwa secara praktis, sebuah dokumen dan
@@ -5,34 +27,138 @@ class IdMap:
     karena itu, kita perlu maintain mapping antara string term (atau
     dokumen) ke integer yang bersesuaian, dan sebaliknya. Kelas IdMap ini
     akan melakukan hal tersebut.
+
+    Format file (IdMap.save / IdMap.load):
+        MAGIC (8 bytes) | panjang header (uint32) | header (JSON) | padding |
+        offsets | table | pool, masing-masing align ke 8 bytes
+
+    File hasil save di-mmap saat load, sehingga load tidak perlu membangun
+    ulang apa pun. Struktur di memori baru disalin (menjadi bytearray /
+    array / dict) ketika ada string baru yang ditambahkan.
     """
+    MAGIC = b"IRIDMAP1"
+    # Hash table di file berisi paling banyak MAX_LOAD_FACTOR slot terisi
+    MAX_LOAD_FACTOR = 0.5
 
     def __init__(self, one_indexed = False):
         """
-        Mapping dari string (term atau nama dokumen) ke id disimpan dalam
-        python's dictionary; cukup efisien. Mapping sebaliknya disimpan dalam
-        python's list.
+        Semua string (term atau nama dokumen) disimpan berurutan sesuai id
+        sebagai UTF-8 di satu string pool yang contiguous, dengan array
+        offsets sehingga string ber-id i adalah pool[offsets[i]:offsets[i + 1]].
+
+        Selama IdMap bisa diubah (indexing), mapping string -> id memakai
+        python's dictionary str_to_id, karena lookup ini dilakukan untuk
+        setiap token. Hash table open addressing (linear probing, hash crc32
+        dari UTF-8 string, berisi id + 1 per slot, 0 artinya slot kosong)
+        hanya dibangun oleh save(...), sehingga IdMap hasil load bisa langsung
+        di-mmap dan di-lookup tanpa membangun dictionary.
 
         contoh:
-            str_to_id["halo"] ---> 8
-            str_to_id["/collection/dir0/gamma.txt"] ---> 54
+            self["halo"] ---> 8
+            self["/collection/dir0/gamma.txt"] ---> 54
+
+            self[8] ---> "halo"
+            self[54] ---> "/collection/dir0/gamma.txt"
 
-            id_to_str[8] ---> "halo"
-            id_to_str[54] ---> "/collection/dir0/gamma.txt"
+        Jika one_indexed, id 0 dipakai oleh string kosong "" sebagai
+        placeholder, sehingga string lain mendapat id mulai dari 1.
         """
+        self.pool = bytearray()
+        self.offsets = array.array('Q', [0])
         self.str_to_id = {}
-        self.id_to_str = []
+        # hash table hasil load (read-only), None selama str_to_id dipakai
+        self.table = None
+        # mmap file hasil load, None jika pool / offsets bisa diubah
+        self.mapped = None
         if(one_indexed):
-            self.str_to_id[""] = 0
-            self.id_to_str.append(0)
+            self.__get_id("")
 
     def __len__(self):
         """Mengembalikan banyaknya term (atau dokumen) yang disimpan di IdMap."""
-        return len(self.id_to_str)
+        return len(self.offsets) - 1
+
+    def __contains__(self, s):
+        """
+        Mengecek apakah string s sudah ada di IdMap, tanpa meng-assign id baru.
+        Tanpa method ini, operator `in` akan melakukan iterasi lewat __getitem__.
+        """
+        if type(s) is not str:
+            return False
+        if self.table is None:
+            return s in self.str_to_id
+        return self.table[self.find(s.encode('utf-8'))] != 0
+
+    def __getstate__(self):
+        # mmap tidak bisa di-pickle (misalnya saat dikirim ke worker process)
+        return {'pool': bytes(self.pool), 'offsets': bytes(self.offsets)}
+
+    def __setstate__(self, state):
+        self.pool = bytearray(state['pool'])
+        self.offsets = array.array('Q', state['offsets'])
+        self.table = None
+        self.mapped = None
+        self.str_to_id = self.build_str_to_id()
+
+    def build_str_to_id(self):
+        """
+        Dictionary string -> id dari pool. Untuk string yang di-renew, id
+        terbaru (yang terbesar) yang dipakai.
+        """
+        return {self.__get_str(i): i for i in range(len(self))}
+
+    def find(self, data):
+        """
+        Slot hash table (hasil load) untuk string data (UTF-8): slot yang
+        berisi id data, atau slot kosong jika data tidak ada
+        """
+        mask = len(self.table) - 1
+        slot = zlib.crc32(data) & mask
+        while True:
+            entry = self.table[slot]
+            if entry == 0 or self.pool[self.offsets[entry - 1]:self.offsets[entry]] == data:
+                return slot
+            slot = (slot + 1) & mask
+
+    def build_table(self):
+        """Hash table untuk save(...), berisi id setiap string di str_to_id"""
+        size = 8
+        while len(self.str_to_id) > size * IdMap.MAX_LOAD_FACTOR:
+            size *= 2
+        table = array.array('I', bytes(4 * size))
+        mask = size - 1
+        for s, i in self.str_to_id.items():
+            slot = zlib.crc32(s.encode('utf-8')) & mask
+            while table[slot] != 0:
+                slot = (slot + 1) & mask
+            table[slot] = i + 1
+        return table
+
+    def append(self, s):
+        """Menambahkan string s ke pool dengan id baru"""
+        if self.table is not None:
+            self.make_writable()
+        new_id = len(self.offsets) - 1
+        self.pool += s.encode('utf-8')
+        self.offsets.append(len(self.pool))
+        self.str_to_id[s] = new_id
+        return new_id
+
+    def make_writable(self):
+        """
+        Menyalin pool dan offsets hasil mmap ke memori agar bisa diubah, dan
+        mengganti hash table dengan str_to_id. mmap tidak di-close eksplisit:
+        memoryview lama yang mungkin masih dipakai thread lain tetap valid
+        sampai tidak direferensikan lagi.
+        """
+        self.pool = bytearray(self.pool)
+        self.offsets = array.array('Q', bytes(self.offsets))
+        self.str_to_id = self.build_str_to_id()
+        self.table = None
+        self.mapped = None
 
     def __get_str(self, i):
         """Mengembalikan string yang terasosiasi dengan index i."""
-        return self.id_to_str[i]
+        return str(self.pool[self.offsets[i]:self.offsets[i + 1]], 'utf-8')
 
     def __get_id(self, s):
         """
@@ -40,10 +166,21 @@ class IdMap:
         Jika s tidak ada pada IdMap, lalu assign sebuah integer id baru dan kembalikan
         integer id baru tersebut.
         """
-        if s not in self.str_to_id:
-            self.str_to_id[s] = len(self.id_to_str)
-            self.id_to_str.append(s)
-        return self.str_to_id[s]
+        if self.table is None:
+            i = self.str_to_id.get(s)
+            return self.append(s) if i is None else i
+        entry = self.table[self.find(s.encode('utf-8'))]
+        if entry == 0:
+            return self.append(s)
+        return entry - 1
+
+    def renew(self, s):
+        """
+        Assign integer id baru untuk string s yang sudah ada (misalnya dokumen
+        yang isinya berubah). Id lama tetap memetakan ke s, tetapi s sekarang
+        memetakan ke id baru.
+        """
+        return self.append(s)
 
     def __getitem__(self, key):
         """
@@ -66,11 +203,569 @@ class IdMap:
         else:
             raise TypeError
 
+    def save(self, path):
+        """
+        Menyimpan IdMap ke path, termasuk hash table-nya. File ditulis ke file
+        sementara lalu di-rename, sehingga IdMap lain yang sedang me-mmap path
+        tetap membaca isi file yang lama.
+        """
+        table = self.table if self.table is not None else self.build_table()
+        columns = [('offsets', 'Q', self.offsets), ('table', 'I', table), ('pool', 'B', self.pool)]
+        header = json.dumps({'byteorder': sys.byteorder,
+                             'columns': [(name, typecode, len(column)) for name, typecode, column in columns]})
+        header = header.encode('utf-8')
+        with open(path + '.tmp', 'wb') as f:
+            f.write(IdMap.MAGIC)
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            for _, _, column in columns:
+                f.write(b"\0" * (-f.tell() % 8))
+                f.write(column)
+        os.replace(path + '.tmp', path)
+
+    @staticmethod
+    def load(path):
+        """Memuat (mmap) IdMap yang disimpan oleh IdMap.save"""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(IdMap.MAGIC)] != IdMap.MAGIC:
+            mapped.close()
+            raise ValueError(f"{path} bukan IdMap, lakukan indexing ulang")
+        position = len(IdMap.MAGIC)
+        header_length, = struct.unpack_from('<I', mapped, position)
+        position += 4
+        header = json.loads(mapped[position:position + header_length].decode('utf-8'))
+        position += header_length
+
+        id_map = IdMap()
+        id_map.mapped = mapped
+        id_map.str_to_id = None
+        for name, typecode, length in header['columns']:
+            position += -position % 8
+            size = array.array(typecode).itemsize * length
+            column = memoryview(mapped)[position:position + size].cast(typecode)
+            if header['byteorder'] != sys.byteorder and typecode != 'B':
+                column = array.array(typecode, column.tobytes())
+                column.byteswap()
+            setattr(id_map, name, column)
+            position += size
+        return id_map
+
+class LRUCache:
+    """
+    Cache key -> value dengan kapasitas terbatas (banyaknya entry dan/atau
+    total ukuran value dalam bytes). Jika cache penuh, entry yang paling lama
+    tidak diakses (Least Recently Used) dibuang.
+
+    Cache ini juga menghitung banyaknya hit dan miss, sehingga efektivitas
+    cache bisa dipantau lewat hit_rate() atau stats(). Aman dipakai bersama
+    oleh beberapa thread.
+    """
+
+    def __init__(self, capacity=None, max_bytes=None, sizeof=sys.getsizeof):
+        """
+        Parameters
+        ----------
+        capacity: int
+            Banyaknya entry maksimum yang disimpan di cache, None artinya
+            tidak dibatasi
+        max_bytes: int
+            Total ukuran value maksimum (menurut sizeof), None artinya tidak
+            dibatasi. Value yang lebih besar dari max_bytes tidak disimpan.
+        sizeof: Callable
+            Fungsi value -> ukuran dalam bytes
+        """
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.items = OrderedDict()
+        self.sizes = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def get(self, key, default=None):
+        """
+        Mengembalikan value untuk key (dan menandai key sebagai baru saja
+        diakses), atau default jika key tidak ada di cache.
+        """
+        with self.lock:
+            if key in self.items:
+                self.hits += 1
+                self.items.move_to_end(key)
+                return self.items[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Menyimpan key -> value, lalu buang entry LRU jika melebihi kapasitas."""
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self.lock:
+            self.discard(key)
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+            self.items[key] = value
+            self.sizes[key] = size
+            self.size += size
+            while ((self.capacity is not None and len(self.items) > self.capacity)
+                   or (self.max_bytes is not None and self.size > self.max_bytes)):
+                self.discard(next(iter(self.items)))
+
+    def discard(self, key):
+        """Membuang entry key (jika ada); lock harus sudah dipegang"""
+        if key in self.items:
+            del self.items[key]
+            self.size -= self.sizes.pop(key)
+
+    def snapshot(self):
+        """
+        Salinan semua pasangan (key, value), urut dari LRU ke MRU, diambil
+        sambil memegang lock sehingga aman dari get / put di thread lain
+        """
+        with self.lock:
+            return list(self.items.items())
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+            self.sizes.clear()
+            self.size = 0
+
+    def hit_rate(self):
+        """Proporsi akses get(...) yang hit, 0.0 jika belum pernah diakses."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        """Statistik cache: hits, misses, hit_rate, entries, dan bytes"""
+        return {'hits': self.hits, 'misses': self.misses, 'hit_rate': self.hit_rate(),
+                'entries': len(self.items), 'bytes': self.size}
+
+class DocIdBitmap:
+    """
+    Himpunan docID (misalnya docID yang sudah dihapus) sebagai bitmap,
+    1 bit per docID: bit ke-(docID % 8) dari byte ke-(docID // 8). Cek
+    keanggotaan cukup satu operasi bit, dan ukuran file-nya hanya N / 8 bytes.
+    List docID terurut (to_list) di-cache sampai docID baru ditambahkan.
+    """
+
+    def __init__(self, data=b""):
+        self.bits = bytearray(data)
+        self.count = sum(bin(byte).count("1") for byte in self.bits)
+        self.doc_ids = None
+
+    def __len__(self):
+        """Banyaknya docID di bitmap"""
+        return self.count
+
+    def __contains__(self, doc_id):
+        index = doc_id >> 3
+        return index < len(self.bits) and (self.bits[index] >> (doc_id & 7)) & 1 == 1
+
+    def __iter__(self):
+        """docID-docID di bitmap, terurut naik"""
+        return iter(self.to_list())
+
+    def to_list(self):
+        """
+        docID-docID di bitmap sebagai sorted list, dihitung sekali (NumPy)
+        lalu di-cache sampai add(...) berikutnya. List yang dikembalikan
+        tidak boleh diubah.
+        """
+        doc_ids = self.doc_ids
+        if doc_ids is None:
+            bits = np.unpackbits(np.frombuffer(bytes(self.bits), dtype=np.uint8), bitorder='little')
+            doc_ids = self.doc_ids = np.flatnonzero(bits).tolist()
+        return doc_ids
+
+    def add(self, doc_id):
+        """Menambahkan doc_id, mengembalikan False jika doc_id sudah ada"""
+        if doc_id in self:
+            return False
+        index = doc_id >> 3
+        if index >= len(self.bits):
+            self.bits.extend(bytes(index + 1 - len(self.bits)))
+        self.bits[index] |= 1 << (doc_id & 7)
+        self.count += 1
+        self.doc_ids = None
+        return True
+
+    def save(self, path):
+        """Menyimpan seluruh bitmap ke file"""
+        with open(path, 'wb') as f:
+            f.write(self.bits)
+
+    def save_bit(self, path, doc_id):
+        """
+        Menyimpan hanya byte yang berisi bit doc_id ke file hasil save(...),
+        sehingga penambahan satu docID tidak perlu menulis ulang seluruh bitmap.
+        """
+        index = doc_id >> 3
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            f.seek(index)
+            f.write(self.bits[index:index + 1])
+
+    @staticmethod
+    def load(path):
+        """Memuat bitmap hasil save(...), atau bitmap kosong jika file tidak ada"""
+        if not os.path.exists(path):
+            return DocIdBitmap()
+        with open(path, 'rb') as f:
+            return DocIdBitmap(f.read())
+
+class RoaringBitmap:
+    """
+    Himpunan docID terkompresi ala Roaring bitmap, untuk postings list term
+    yang dense. docID dikelompokkan berdasarkan 16 bit atasnya (key), dan 16
+    bit bawahnya disimpan di sebuah container per key:
+        - array container : uint16 terurut, jika isinya paling banyak
+                            ARRAY_CONTAINER_MAX
+        - bitmap container: BITMAP_WORDS word uint64 (2^16 bit), bit ke-i
+                            menandai 16 bit bawah bernilai i
+
+    AND / OR / AND NOT (operator &, |, -) dikerjakan per container dengan
+    key yang sama: bitmap dengan bitmap memakai operasi bitwise per word,
+    array dengan bitmap memakai test bit, dan array dengan array memakai
+    operasi himpunan NumPy. Irisan dan selisih dengan sorted list of docIDs
+    (intersect_sorted, difference_sorted) juga cukup test bit per docID.
+
+    Format serialize (little-endian):
+        n_containers (uint32) | key (uint16) * n | cardinality - 1 (uint16) * n |
+        container * n
+    dengan container berupa cardinality buah uint16 (array container) atau
+    BITMAP_WORDS uint64 (bitmap container); jenisnya ditentukan dari
+    cardinality, seperti format Roaring.
+    """
+    ARRAY_CONTAINER_MAX = 4096
+    BITMAP_WORDS = 1 << 10
+    ARRAY_DTYPE = np.dtype('<u2')
+    BITMAP_DTYPE = np.dtype('<u8')
+
+    def __init__(self, keys=(), containers=()):
+        self.keys = list(keys)
+        self.containers = list(containers)
+
+    @staticmethod
+    def from_sorted(doc_ids):
+        """RoaringBitmap dari docIDs (terurut naik, tanpa duplikat)"""
+        values = np.asarray(doc_ids, dtype=np.int64)
+        if len(values) == 0:
+            return RoaringBitmap()
+        high = values >> 16
+        bounds = [0] + (np.flatnonzero(np.diff(high)) + 1).tolist() + [len(values)]
+        low = (values & 0xFFFF).astype(RoaringBitmap.ARRAY_DTYPE)
+        return RoaringBitmap([int(high[start]) for start in bounds[:-1]],
+                             [RoaringBitmap.normalize(low[start:end]) for start, end in zip(bounds, bounds[1:])])
+
+    @staticmethod
+    def from_sorted_chunks(chunks):
+        """
+        RoaringBitmap dari potongan-potongan docIDs (setiap potongan terurut
+        naik dan lebih besar dari potongan sebelumnya), misalnya block-block
+        postings list. Selain hasilnya, yang ditahan hanyalah 16 bit bawah
+        docIDs untuk key yang sedang dibangun, bukan seluruh docIDs.
+        """
+        bitmap = RoaringBitmap()
+        key, pending = None, []
+        for doc_ids in chunks:
+            values = np.asarray(doc_ids, dtype=np.int64)
+            if len(values) == 0:
+                continue
+            high = values >> 16
+            bounds = [0] + (np.flatnonzero(np.diff(high)) + 1).tolist() + [len(values)]
+            for start, end in zip(bounds, bounds[1:]):
+                if int(high[start]) != key:
+                    bitmap.append_container(key, pending)
+                    key, pending = int(high[start]), []
+                pending.append((values[start:end] & 0xFFFF).astype(RoaringBitmap.ARRAY_DTYPE))
+        bitmap.append_container(key, pending)
+        return bitmap
+
+    def append_container(self, key, lows):
+        """Menambahkan container dari potongan-potongan 16 bit bawah (terurut) untuk key terbesar"""
+        if len(lows) > 0:
+            self.keys.append(key)
+            self.containers.append(RoaringBitmap.normalize(np.concatenate(lows)))
+
+    @staticmethod
+    def is_bitmap(container):
+        return container.dtype == RoaringBitmap.BITMAP_DTYPE
+
+    @staticmethod
+    def cardinality(container):
+        if RoaringBitmap.is_bitmap(container):
+            return int(np.count_nonzero(np.unpackbits(container.view(np.uint8))))
+        return len(container)
+
+    @staticmethod
+    def to_bitmap(container):
+        """Container sebagai bitmap container"""
+        if RoaringBitmap.is_bitmap(container):
+            return container
+        bits = np.zeros(RoaringBitmap.BITMAP_WORDS * 64, dtype=np.uint8)
+        bits[container] = 1
+        return np.packbits(bits, bitorder='little').view(RoaringBitmap.BITMAP_DTYPE)
+
+    @staticmethod
+    def to_array(container):
+        """Container sebagai array container (uint16 terurut)"""
+        if not RoaringBitmap.is_bitmap(container):
+            return container
+        bits = np.unpackbits(container.view(np.uint8), bitorder='little')
+        return np.flatnonzero(bits).astype(RoaringBitmap.ARRAY_DTYPE)
+
+    @staticmethod
+    def normalize(container):
+        """Container dengan jenis yang sesuai cardinality-nya, None jika kosong"""
+        cardinality = RoaringBitmap.cardinality(container)
+        if cardinality == 0:
+            return None
+        if cardinality <= RoaringBitmap.ARRAY_CONTAINER_MAX:
+            return RoaringBitmap.to_array(container)
+        return RoaringBitmap.to_bitmap(container)
+
+    @staticmethod
+    def test_bits(words, low):
+        """Mask apakah setiap nilai 16 bit low ada di bitmap container words"""
+        low = low.astype(np.uint64)
+        return ((words[low >> np.uint64(6)] >> (low & np.uint64(63))) & np.uint64(1)).astype(bool)
+
+    @staticmethod
+    def and_containers(a, b):
+        if RoaringBitmap.is_bitmap(a) and RoaringBitmap.is_bitmap(b):
+            return RoaringBitmap.normalize(a & b)
+        if RoaringBitmap.is_bitmap(a):
+            a, b = b, a
+        if RoaringBitmap.is_bitmap(b):
+            return RoaringBitmap.normalize(a[RoaringBitmap.test_bits(b, a)])
+        return RoaringBitmap.normalize(np.intersect1d(a, b, assume_unique=True))
+
+    @staticmethod
+    def or_containers(a, b):
+        if not RoaringBitmap.is_bitmap(a) and not RoaringBitmap.is_bitmap(b):
+            return RoaringBitmap.normalize(np.union1d(a, b).astype(RoaringBitmap.ARRAY_DTYPE))
+        return RoaringBitmap.to_bitmap(a) | RoaringBitmap.to_bitmap(b)
+
+    @staticmethod
+    def andnot_containers(a, b):
+        if RoaringBitmap.is_bitmap(a):
+            return RoaringBitmap.normalize(a & ~RoaringBitmap.to_bitmap(b))
+        if RoaringBitmap.is_bitmap(b):
+            return RoaringBitmap.normalize(a[~RoaringBitmap.test_bits(b, a)])
+        return RoaringBitmap.normalize(np.setdiff1d(a, b, assume_unique=True).astype(RoaringBitmap.ARRAY_DTYPE))
+
+    def __and__(self, other):
+        others = dict(zip(other.keys, other.containers))
+        keys, containers = [], []
+        for key, container in zip(self.keys, self.containers):
+            if key in others:
+                result = RoaringBitmap.and_containers(container, others[key])
+                if result is not None:
+                    keys.append(key)
+                    containers.append(result)
+        return RoaringBitmap(keys, containers)
+
+    def __or__(self, other):
+        merged = dict(zip(self.keys, self.containers))
+        for key, container in zip(other.keys, other.containers):
+            merged[key] = RoaringBitmap.or_containers(merged[key], container) if key in merged else container
+        keys = sorted(merged)
+        return RoaringBitmap(keys, [merged[key] for key in keys])
+
+    def __sub__(self, other):
+        others = dict(zip(other.keys, other.containers))
+        keys, containers = [], []
+        for key, container in zip(self.keys, self.containers):
+            result = RoaringBitmap.andnot_containers(container, others[key]) if key in others else container
+            if result is not None:
+                keys.append(key)
+                containers.append(result)
+        return RoaringBitmap(keys, containers)
+
+    def __len__(self):
+        return sum(RoaringBitmap.cardinality(container) for container in self.containers)
+
+    def __contains__(self, doc_id):
+        return len(self.intersect_sorted([doc_id])) == 1
+
+    def __iter__(self):
+        # per container, tanpa membuat list seluruh docID
+        return itertools.chain.from_iterable(chunk.tolist() for chunk in self.iter_chunks())
+
+    def iter_chunks(self):
+        """Generator docID-docID setiap container (array int64, terurut naik)"""
+        for key, container in zip(self.keys, self.containers):
+            yield (key << 16) + RoaringBitmap.to_array(container).astype(np.int64)
+
+    def max(self):
+        """docID terbesar di bitmap, None jika kosong"""
+        if len(self.keys) == 0:
+            return None
+        return (self.keys[-1] << 16) + int(RoaringBitmap.to_array(self.containers[-1])[-1])
+
+    def to_list(self):
+        """docID-docID di bitmap, terurut naik"""
+        return np.concatenate([np.zeros(0, dtype=np.int64)] + list(self.iter_chunks())).tolist()
+
+    def contains_sorted(self, doc_ids):
+        """(docIDs sebagai array, mask keanggotaan setiap docID) untuk docIDs terurut naik"""
+        values = np.asarray(doc_ids, dtype=np.int64)
+        mask = np.zeros(len(values), dtype=bool)
+        starts = np.searchsorted(values, [key << 16 for key in self.keys]).tolist()
+        ends = np.searchsorted(values, [(key + 1) << 16 for key in self.keys]).tolist()
+        for container, start, end in zip(self.containers, starts, ends):
+            if start == end:
+                continue
+            low = (values[start:end] & 0xFFFF).astype(RoaringBitmap.ARRAY_DTYPE)
+            if RoaringBitmap.is_bitmap(container):
+                mask[start:end] = RoaringBitmap.test_bits(container, low)
+            else:
+                positions = np.minimum(np.searchsorted(container, low), len(container) - 1)
+                mask[start:end] = container[positions] == low
+        return values, mask
+
+    def intersect_sorted(self, doc_ids):
+        """docIDs (list terurut naik) yang ada di bitmap, sebagai list terurut"""
+        values, mask = self.contains_sorted(doc_ids)
+        return values[mask].tolist()
+
+    def difference_sorted(self, doc_ids):
+        """docIDs (list terurut naik) yang tidak ada di bitmap, sebagai list terurut"""
+        values, mask = self.contains_sorted(doc_ids)
+        return values[~mask].tolist()
+
+    def serialize(self):
+        """Bitmap dalam format serialize (lihat docstring class)"""
+        cardinalities = [RoaringBitmap.cardinality(container) - 1 for container in self.containers]
+        header = [np.array([len(self.keys)], dtype='<u4'),
+                  np.array(self.keys, dtype=RoaringBitmap.ARRAY_DTYPE),
+                  np.array(cardinalities, dtype=RoaringBitmap.ARRAY_DTYPE)]
+        return b"".join([column.tobytes() for column in header] + [container.tobytes() for container in self.containers])
+
+    @staticmethod
+    def deserialize(data):
+        """
+        RoaringBitmap dari hasil serialize(). data (misalnya memoryview dari
+        mmap) disalin sekali, sehingga bitmap tidak menahan buffer aslinya.
+        """
+        data = bytes(data)
+        n_containers = int(np.frombuffer(data, dtype='<u4', count=1)[0])
+        keys = np.frombuffer(data, dtype=RoaringBitmap.ARRAY_DTYPE, count=n_containers, offset=4).tolist()
+        cardinalities = np.frombuffer(data, dtype=RoaringBitmap.ARRAY_DTYPE, count=n_containers,
+                                      offset=4 + 2 * n_containers).astype(np.int64) + 1
+        position = 4 + 4 * n_containers
+        containers = []
+        for cardinality in cardinalities.tolist():
+            if cardinality <= RoaringBitmap.ARRAY_CONTAINER_MAX:
+                containers.append(np.frombuffer(data, dtype=RoaringBitmap.ARRAY_DTYPE, count=cardinality,
+                                                offset=position))
+                position += 2 * cardinality
+            else:
+                containers.append(np.frombuffer(data, dtype=RoaringBitmap.BITMAP_DTYPE,
+                                                count=RoaringBitmap.BITMAP_WORDS, offset=position))
+                position += 8 * RoaringBitmap.BITMAP_WORDS
+        return RoaringBitmap(keys, containers)
+
+def gallop(values, target, low=0):
+    """
+    Posisi pertama di values (sorted) mulai dari low yang nilainya >= target,
+    dengan exponential (galloping) search: rentang pencarian dilipatgandakan
+    dari low sampai melewati target, lalu bisect di rentang terakhir. Biayanya
+    O(log d) dengan d jarak posisi hasil dari low, sehingga murah untuk
+    lompatan yang dekat maupun jauh.
+    """
+    high, step = low, 1
+    while high < len(values) and values[high] < target:
+        low = high + 1
+        high += step
+        step <<= 1
+    return bisect.bisect_left(values, target, low, min(high, len(values)))
+
+def is_integer_sequence(values):
+    """Apakah values berisi integer sehingga bisa diproses dengan NumPy tanpa salin per elemen"""
+    if isinstance(values, np.ndarray):
+        return values.dtype.kind in 'iu'
+    if isinstance(values, array.array):
+        return values.typecode in 'bBhHiIlLqQ'
+    return len(values) > 0 and type(values[0]) is int
+
+def intersect_many(lists):
+    """
+    Intersection semua sorted lists sekaligus, tanpa list perantara untuk
+    setiap pasangan. Setiap docID dari list terpendek (paling jarang) dicari
+    di list-list lain, dari yang terpendek, dengan gallop yang hanya bergerak
+    maju; jika sebuah list melewati docID tersebut, kandidat dari list
+    terpendek langsung di-gallop ke nilai itu. Biayanya O(m log n) untuk m
+    panjang list terpendek dan n panjang list lainnya.
+
+    Untuk input integer yang besar dan tidak terlalu timpang (lihat
+    INTERSECT_VECTOR_MIN dan INTERSECT_MAX_SKEW), dipakai kernel NumPy:
+    searchsorted semua kandidat sekaligus di setiap list lain. list bisa
+    berupa list, array.array, atau numpy array; array dibaca lewat buffer
+    protocol tanpa diubah menjadi list.
+
+    Parameters
+    ----------
+    lists: List[Sequence[Comparable]]
+
+    Returns
+    -------
+    List[Comparable]
+        intersection yang sudah terurut
+    """
+    if len(lists) == 0:
+        return []
+    lists = sorted(lists, key=len)
+    if len(lists[0]) == 0:
+        return []
+    if len(lists) == 1:
+        return list(lists[0])
+    copied = sum(len(values) for values in lists if isinstance(values, list))
+    if (len(lists[0]) >= INTERSECT_VECTOR_MIN and copied <= INTERSECT_MAX_SKEW * len(lists[0])
+            and all(is_integer_sequence(values) for values in lists)):
+        result = np.asarray(lists[0], dtype=np.int64)
+        for values in lists[1:]:
+            values = np.asarray(values, dtype=np.int64)
+            positions = np.searchsorted(values, result)
+            found = positions < len(values)
+            found[found] = values[positions[found]] == result[found]
+            result = result[found]
+            if len(result) == 0:
+                break
+        return result.tolist()
+
+    rarest, others = lists[0], lists[1:]
+    positions = [0] * len(others)
+    result = []
+    i = 0
+    while i < len(rarest):
+        candidate = rarest[i]
+        for k, values in enumerate(others):
+            position = gallop(values, candidate, positions[k])
+            positions[k] = position
+            if position == len(values):
+                return result
+            if values[position] != candidate:
+                # kandidat berikutnya minimal values[position]
+                i = gallop(rarest, values[position], i + 1)
+                break
+        else:
+            result.append(candidate)
+            i += 1
+    return result
+
 def sorted_intersect(list1, list2):
     """
     Intersects two (ascending) sorted lists and returns the sorted result
     Melakukan Intersection dua (ascending) sorted lists dan mengembalikan hasilnya
-    yang juga terurut.
+    yang juga terurut. Lihat intersect_many.
 
     Parameters
     ----------
@@ -83,18 +778,57 @@ def sorted_intersect(list1, list2):
     List[Comparable]
         intersection yang sudah terurut
     """
-    return_list = []
-    pos1 = pos2 = 0
-    while pos1 < len(list1) and pos2 < len(list2):
-        if list1[pos1] == list2[pos2]:
-            return_list.append(list1[pos1])
-            pos1 += 1
-            pos2 += 1
-        elif list1[pos1] < list2[pos2]:
-            pos1 += 1
-        else:
-            pos2 += 1
-    return return_list
+    return intersect_many([list1, list2])
+
+def phrase_match(positions_lists):
+    """
+    Apakah ada posisi p sehingga term ke-i sebuah frase muncul di posisi p + i,
+    untuk semua i.
+
+    Parameters
+    ----------
+    positions_lists: List[List[int]]
+        Posisi-posisi (terurut) setiap term frase di sebuah dokumen, sesuai
+        urutan term di frase.
+
+    Returns
+    -------
+    bool
+    """
+    starts = set(positions_lists[0])
+    for offset, positions in enumerate(positions_lists[1:], 1):
+        starts.intersection_update(position - offset for position in positions)
+        if len(starts) == 0:
+            return False
+    return True
+
+def minimum_window(positions_lists):
+    """
+    Panjang jendela terkecil (posisi terakhir - posisi pertama) yang memuat
+    paling sedikit satu posisi dari setiap list, dengan menggeser posisi
+    terkecil satu per satu (heap) seperti k-way merge.
+
+    Parameters
+    ----------
+    positions_lists: List[List[int]]
+        List-list posisi yang masing-masing terurut dan tidak kosong.
+
+    Returns
+    -------
+    int
+    """
+    heap = [(positions[0], i, 0) for i, positions in enumerate(positions_lists)]
+    heapq.heapify(heap)
+    largest = max(position for position, _, _ in heap)
+    best = largest - heap[0][0]
+    while True:
+        position, i, j = heapq.heappop(heap)
+        best = min(best, largest - position)
+        if j + 1 == len(positions_lists[i]) or best == 0:
+            return best
+        next_position = positions_lists[i][j + 1]
+        largest = max(largest, next_position)
+        heapq.heappush(heap, (next_position, i, j + 1))
 
 if __name__ == '__main__':
 
@@ -105,13 +839,121 @@ if __name__ == '__main__':
     assert term_id_map[0] == "halo", "term_id salah"
     assert term_id_map["selamat"] == 2, "term_id salah"
     assert term_id_map["pagi"] == 3, "term_id salah"
+    assert "pagi" in term_id_map and "malam" not in term_id_map, "__contains__ salah"
+    assert len(term_id_map) == 4, "__contains__ tidak boleh menambah term"
 
     docs = ["/collection/0/data0.txt",
             "/collection/0/data10.txt",
             "/collection/1/data53.txt"]
     doc_id_map = IdMap()
     assert [doc_id_map[docname] for docname in docs] == [0, 1, 2], "docs_id salah"
+    assert doc_id_map.renew(docs[1]) == 3 and doc_id_map[docs[1]] == 3, "renew salah"
+    assert doc_id_map[1] == docs[1] and len(doc_id_map) == 4, "renew salah"
+
+    import pickle
+    import tempfile
+    words = [f"kata{i}" for i in range(1000)] + ["ünïcödé", ""]
+    id_map = IdMap(one_indexed=True)
+    assert [id_map[word] for word in words] == list(range(1, len(words))) + [0], "one_indexed salah"
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "terms.dict")
+        id_map.save(path)
+        IdMap.load(path).save(path)
+        loaded = IdMap.load(path)
+        assert loaded.mapped is not None and len(loaded) == len(id_map), "load salah"
+        assert all(loaded[word] == id_map[word] and loaded[id_map[word]] == word for word in words), "load salah"
+        assert "kata1000" not in loaded and loaded.mapped is not None, "__contains__ tidak boleh menyalin mmap"
+        assert loaded["kata1000"] == len(words) and loaded.mapped is None, "tambah string setelah load salah"
+        assert loaded.renew("kata5") == len(words) + 1 and loaded[6] == "kata5", "renew setelah load salah"
+        loaded.save(path)
+        assert IdMap.load(path)["kata5"] == len(words) + 1, "save ulang salah"
+        copied = pickle.loads(pickle.dumps(IdMap.load(path)))
+        assert copied["kata1000"] == len(words) and copied["baru"] == len(words) + 2, "pickle salah"
 
     assert sorted_intersect([1, 2, 3], [2, 3]) == [2, 3], "sorted_intersect salah"
     assert sorted_intersect([4, 5], [1, 4, 7]) == [4], "sorted_intersect salah"
     assert sorted_intersect([], []) == [], "sorted_intersect salah"
+    assert [gallop([1, 3, 5, 7, 9, 11], target, 1) for target in [0, 3, 4, 11, 12]] == [1, 1, 2, 5, 6], "gallop salah"
+    assert intersect_many([[1, 5, 9, 13], [0, 5, 6, 9, 13, 20], [5, 9, 13]]) == [5, 9, 13], "intersect_many salah"
+    assert intersect_many([[2, 4], [1, 3]]) == [] and intersect_many([[1, 3]]) == [1, 3] and intersect_many([]) == []
+    large = [array.array('I', range(0, 10000, step)) for step in [2, 3, 5]]
+    assert intersect_many(large) == list(range(0, 10000, 30)), "kernel NumPy intersect_many salah"
+    assert intersect_many([list(range(0, 10000, 7)), large[0]]) == list(range(0, 10000, 14))
+
+    assert phrase_match([[1, 5, 9], [2, 7], [3, 11]]), "phrase_match salah"
+    assert not phrase_match([[1, 5], [3, 7], [4]]), "phrase_match salah"
+    assert phrase_match([[2, 4], [3, 5], [4]]), "phrase_match salah"
+    assert minimum_window([[1, 20], [10, 25], [18]]) == 7, "minimum_window salah"
+    assert minimum_window([[4], [4, 9]]) == 0, "minimum_window salah"
+
+    deleted = DocIdBitmap()
+    assert deleted.add(9) and deleted.add(2) and not deleted.add(9), "DocIdBitmap salah"
+    assert 9 in deleted and 2 in deleted and 3 not in deleted and 1000 not in deleted, "DocIdBitmap salah"
+    assert list(deleted) == [2, 9] and len(deleted) == 2, "DocIdBitmap salah"
+    assert deleted.to_list() is deleted.to_list() and deleted.add(0) and deleted.to_list() == [0, 2, 9], \
+        "cache to_list DocIdBitmap salah"
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        deleted.save(os.path.join(tmp, "test.deleted"))
+        deleted.add(30)
+        deleted.save_bit(os.path.join(tmp, "test.deleted"), 30)
+        assert list(DocIdBitmap.load(os.path.join(tmp, "test.deleted"))) == [0, 2, 9, 30], "penyimpanan DocIdBitmap salah"
+        assert len(DocIdBitmap.load(os.path.join(tmp, "tidak-ada.deleted"))) == 0
+
+    dense = list(range(0, 200000, 3))
+    sparse = [1, 3, 6, 70000, 70001, 199998]
+    bitmap = RoaringBitmap.from_sorted(dense)
+    assert bitmap.keys == [0, 1, 2, 3] and all(RoaringBitmap.is_bitmap(c) for c in bitmap.containers[:3]), \
+        "container RoaringBitmap salah"
+    assert bitmap.to_list() == dense and len(bitmap) == len(dense), "RoaringBitmap salah"
+    assert RoaringBitmap.deserialize(memoryview(bitmap.serialize())).to_list() == dense, "serialize RoaringBitmap salah"
+    chunked = RoaringBitmap.from_sorted_chunks(dense[start:start + 1000] for start in range(0, len(dense), 1000))
+    assert chunked.keys == bitmap.keys and chunked.to_list() == dense, "from_sorted_chunks salah"
+    assert list(chunked) == dense and chunked.max() == dense[-1] and RoaringBitmap().max() is None, "iterasi bitmap salah"
+    other = RoaringBitmap.from_sorted(sparse)
+    assert not RoaringBitmap.is_bitmap(other.containers[0]) and 6 in other and 7 not in other
+    assert (bitmap & other).to_list() == [3, 6, 199998], "AND RoaringBitmap salah"
+    assert (bitmap | other).to_list() == sorted(set(dense) | set(sparse)), "OR RoaringBitmap salah"
+    assert (other - bitmap).to_list() == [1, 70000, 70001] and len(bitmap - bitmap) == 0, "AND NOT RoaringBitmap salah"
+    assert bitmap.intersect_sorted(sparse) == [3, 6, 199998] and bitmap.difference_sorted(sparse) == [1, 70000, 70001]
+
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1, "LRUCache salah"
+    cache.put("c", 3)
+    assert "b" not in cache and "a" in cache and "c" in cache, "eviction LRUCache salah"
+    assert cache.get("b") is None, "LRUCache salah"
+    assert cache.hit_rate() == 0.5, "hit rate LRUCache salah"
+    assert cache.snapshot() == [("a", 1), ("c", 3)], "snapshot LRUCache salah"
+
+    # snapshot selama thread lain melakukan get / put
+    cache = LRUCache(1000)
+    stop = threading.Event()
+    def worker():
+        i = 0
+        while not stop.is_set():
+            cache.put(i % 2000, i)
+            cache.get((i * 7) % 2000)
+            i += 1
+    thread = threading.Thread(target=worker)
+    thread.start()
+    try:
+        for _ in range(200):
+            assert len(cache.snapshot()) <= 1000
+    finally:
+        stop.set()
+        thread.join()
+
+    cache = LRUCache(max_bytes=10, sizeof=len)
+    cache.put("a", "xxxx")
+    cache.put("b", "yyyy")
+    cache.get("a")
+    cache.put("c", "zzzz")
+    assert list(cache.items) == ["a", "c"] and cache.size == 8, "eviction berdasarkan ukuran salah"
+    cache.put("a", "x")
+    assert cache.size == 5, "ukuran entry yang diganti salah"
+    cache.put("d", "w" * 11)
+    assert "d" not in cache and len(cache) == 2, "value yang lebih besar dari max_bytes tidak boleh disimpan"
+    cache.clear()
+    assert cache.stats() == {'hits': 1, 'misses': 0, 'hit_rate': 1.0, 'entries': 0, 'bytes': 0}